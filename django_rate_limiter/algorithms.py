@@ -6,16 +6,142 @@ rate limiting algorithms including sliding window, token bucket,
 and fixed window approaches.
 """
 
+import atexit
+import copy
+import hashlib
+import math
+import random
+import threading
 import time
+import uuid
+import weakref
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional, Tuple
-
-from .backends import BaseBackend, get_backend
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from datetime import timezone as dt_timezone
+from datetime import tzinfo
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from django.utils.module_loading import import_string
+
+from .backends import (
+    BaseBackend,
+    _as_count,
+    _gcra_step,
+    _with_headroom,
+    get_backend,
+)
 from .exceptions import RateLimitExceeded
 
+try:
+    from zoneinfo import ZoneInfo
+
+    ZONEINFO_AVAILABLE = True
+except ImportError:
+    ZONEINFO_AVAILABLE = False
+
+# A check split into backend updates and a function turning their results
+# into (is_allowed, metadata); see BaseRateLimiter._prepare
+_Prepared = Tuple[
+    List[Tuple[str, Callable[[Any], Any], Optional[int]]],
+    Callable[[List[Any]], Tuple[bool, Dict[str, Any]]],
+]
+
+
+def _emission_interval(limit: int, window: int) -> float:
+    """Return the spacing of a steady ``limit`` requests per ``window``."""
+    if limit < 1:
+        raise ValueError(f"Rate-spaced limits must be at least 1, got {limit}")
+    return window / limit
+
+
+class DenyCache:
+    """
+    Bounded in-process cache of denied limiter keys.
+
+    A denied key is remembered until its ``retry_after`` passes, and later
+    checks of it are denied locally without touching the backend. A cached
+    denial only applies to requests costing at least as much as the denied
+    one. At most ``max_size`` keys are kept, evicting the least recently
+    denied first. ``discard_denials`` forgets a key in every deny cache of
+    the process.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self.hits = 0
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        _deny_caches.add(self)
+
+    def get(self, key: str, cost: int = 1) -> Optional[Dict[str, Any]]:
+        """Return the metadata of a cached denial of key, if still denied."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, denied_cost, metadata = entry
+            if expires <= now:
+                del self._entries[key]
+                return None
+            if cost < denied_cost:
+                return None
+            self.hits += 1
+
+        return {
+            **metadata,
+            "remaining": 0,
+            "retry_after": max(1, math.ceil(expires - now)),
+            "deny_cached": True,
+        }
+
+    def add(self, key: str, cost: int, metadata: Dict[str, Any]) -> None:
+        """Remember a denial of key until its retry_after passes."""
+        retry_after = metadata.get("retry_after")
+        if not retry_after or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (time.time() + retry_after, cost, metadata)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Forget every cached denial."""
+        with self._lock:
+            self._entries.clear()
+
+    def discard(self, key: str) -> None:
+        """Forget the cached denials of a limiter key for every limit."""
+        with self._lock:
+            for cached in [k for k in self._entries if k.rpartition(":")[0] == key]:
+                del self._entries[cached]
+
+
+_deny_caches: "weakref.WeakSet[DenyCache]" = weakref.WeakSet()
+
+
+def discard_denials(key: str) -> None:
+    """Forget the cached denials of a limiter key in every deny cache."""
+    for deny_cache in list(_deny_caches):
+        deny_cache.discard(key)
+
 
 class BaseRateLimiter(ABC):
-    """Abstract base class for rate limiters."""
+    """
+    Abstract base class for rate limiters.
+
+    ``enforce`` consults ``deny_cache`` when one is set, so clients denied
+    recently are rejected without a backend call. Denials caused by a
+    contended backend lock are not cached. Limiters whose denials can end
+    before ``retry_after`` set ``deny_cacheable`` to False.
+    """
+
+    deny_cache: Optional[DenyCache] = None
+    deny_cacheable = True
 
     def __init__(
         self, backend: Optional[BaseBackend] = None, key_prefix: str = "rate_limit"
@@ -33,7 +159,13 @@ class BaseRateLimiter(ABC):
 
     @abstractmethod
     def is_allowed(
-        self, identifier: str, limit: int, window: int, scope: str = ""
+        self,
+        identifier: str,
+        limit: int,
+        window: int,
+        scope: str = "",
+        *,
+        cost: int = 1,
     ) -> Tuple[bool, Dict[str, Any]]:
         """
         Check if a request is allowed.
@@ -43,6 +175,7 @@ class BaseRateLimiter(ABC):
             limit: Maximum number of requests allowed
             window: Time window in seconds
             scope: Optional scope for grouping (e.g., endpoint name)
+            cost: Units of the limit the request consumes
 
         Returns:
             Tuple of (is_allowed, metadata)
@@ -50,7 +183,13 @@ class BaseRateLimiter(ABC):
         pass
 
     def enforce(
-        self, identifier: str, limit: int, window: int, scope: str = ""
+        self,
+        identifier: str,
+        limit: int,
+        window: int,
+        scope: str = "",
+        *,
+        cost: int = 1,
     ) -> Dict[str, Any]:
         """
         Enforce rate limiting, raising exception if limit exceeded.
@@ -60,6 +199,7 @@ class BaseRateLimiter(ABC):
             limit: Maximum number of requests allowed
             window: Time window in seconds
             scope: Optional scope for grouping
+            cost: Units of the limit the request consumes
 
         Returns:
             Metadata about the rate limiting
@@ -67,7 +207,10 @@ class BaseRateLimiter(ABC):
         Raises:
             RateLimitExceeded: If rate limit is exceeded
         """
-        allowed, metadata = self.is_allowed(identifier, limit, window, scope)
+        self._check_cost(cost)
+        allowed, metadata = self._is_allowed_cached(
+            identifier, limit, window, scope, cost
+        )
         if not allowed:
             raise RateLimitExceeded(
                 f"Rate limit exceeded for {identifier}",
@@ -77,19 +220,461 @@ class BaseRateLimiter(ABC):
             )
         return metadata
 
+    def _is_allowed_cached(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Check a request, answering from the deny cache when possible."""
+        if self.deny_cache is None or not self.deny_cacheable:
+            return self.is_allowed(identifier, limit, window, scope, cost=cost)
+
+        cache_key = f"{self._get_key(identifier, scope)}:{limit}/{window}"
+        metadata = self.deny_cache.get(cache_key, cost)
+        if metadata is not None:
+            return False, metadata
+
+        self.backend.take_contention()
+        allowed, metadata = self.is_allowed(identifier, limit, window, scope, cost=cost)
+        # A backend that gave up on a lock never looked at the client's state
+        if not allowed and not self.backend.take_contention():
+            self.deny_cache.add(cache_key, cost, metadata)
+        return allowed, metadata
+
+    def release(
+        self,
+        identifier: str,
+        lease_id: Optional[str],
+        window: Optional[int] = None,
+        scope: str = "",
+    ) -> None:
+        """
+        Release what an allowed request holds once it has finished.
+
+        Only limiters that track in-flight work hold anything between
+        ``is_allowed`` and the end of the request; for the others this is a
+        no-op.
+
+        Args:
+            identifier: Unique identifier for the client
+            lease_id: The ``lease_id`` from the allowed request's metadata
+            window: Time window in seconds the request was checked with
+            scope: Optional scope for grouping
+        """
+
+    def is_allowed_many(
+        self,
+        checks: Sequence[Tuple[Any, ...]],
+        all_or_nothing: bool = False,
+    ) -> List[Tuple[bool, Dict[str, Any]]]:
+        """
+        Check several requests against the backend in one round trip.
+
+        Each check is a tuple of ``(identifier, limit, window[, scope[,
+        cost]])``. Checks are evaluated in order, so repeated keys see the
+        earlier checks' consumption, and all state is read and written in a
+        single atomic batch where the backend supports it.
+
+        Args:
+            checks: The checks to evaluate
+            all_or_nothing: Admit the batch only if every check is allowed;
+                otherwise nothing is consumed and every check is denied
+
+        Returns:
+            List of (is_allowed, metadata), one per check
+
+        Raises:
+            ValueError: If ``all_or_nothing`` is set for checks that can't run
+                in one batch and whose consumption can't be released
+        """
+        normalized = [self._normalize_check(check) for check in checks]
+        prepared = [self._prepare(*check) for check in normalized]
+        finishers = []
+        updates: List[Tuple[str, Callable[[Any], Any], Optional[int]]] = []
+        spans = []
+        for item in prepared:
+            if item is None:
+                if all_or_nothing and type(self).release is BaseRateLimiter.release:
+                    # Checked one by one, the allowed checks would stay charged
+                    raise ValueError(
+                        f"{self.__class__.__name__} can't check this batch "
+                        "all or nothing"
+                    )
+                return self._is_allowed_each(normalized, all_or_nothing)
+            check_updates, finish = item
+            finishers.append(finish)
+            spans.append((len(updates), len(updates) + len(check_updates)))
+            updates.extend(check_updates)
+
+        outcomes: List[Tuple[bool, Dict[str, Any]]] = []
+
+        def commit(results: List[Any]) -> bool:
+            outcomes[:] = [
+                finish(results[start:end])
+                for finish, (start, end) in zip(finishers, spans)
+            ]
+            return not all_or_nothing or all(allowed for allowed, _ in outcomes)
+
+        results = self.backend.atomic_update_many(updates, commit)
+        if not outcomes:
+            # The backend gave up before running the updaters
+            commit(results)
+        if all_or_nothing and not all(allowed for allowed, _ in outcomes):
+            return self._reject_all(outcomes)
+        return outcomes
+
+    def _normalize_check(self, check: Tuple[Any, ...]) -> Tuple[Any, ...]:
+        """Fill in the default scope and cost of a batch check."""
+        identifier, limit, window, *rest = check
+        scope = rest[0] if len(rest) > 0 else ""
+        cost = rest[1] if len(rest) > 1 else 1
+        self._check_cost(cost)
+        return identifier, limit, window, scope, cost
+
+    @staticmethod
+    def _check_cost(cost: int) -> None:
+        """Reject costs that would leave the limit untouched or refund it."""
+        if cost < 1:
+            raise ValueError(f"Request cost must be at least 1, got {cost}")
+
+    def _is_allowed_each(
+        self, checks: List[Tuple[Any, ...]], all_or_nothing: bool
+    ) -> List[Tuple[bool, Dict[str, Any]]]:
+        """Evaluate batch checks one by one for limiters that can't batch."""
+        outcomes = []
+        for identifier, limit, window, scope, cost in checks:
+            outcomes.append(
+                self.is_allowed(identifier, limit, window, scope, cost=cost)
+            )
+            if all_or_nothing and not outcomes[-1][0]:
+                break
+
+        if all_or_nothing and not all(allowed for allowed, _ in outcomes):
+            # Only held resources can be handed back
+            for (identifier, _, window, scope, _), (allowed, metadata) in zip(
+                checks, outcomes
+            ):
+                if allowed:
+                    self.release(identifier, metadata.get("lease_id"), window, scope)
+            return self._reject_all(
+                outcomes + [(False, {})] * (len(checks) - len(outcomes))
+            )
+        return outcomes
+
+    def _reject_all(
+        self, outcomes: List[Tuple[bool, Dict[str, Any]]]
+    ) -> List[Tuple[bool, Dict[str, Any]]]:
+        """Deny a whole batch, retrying after its slowest denied check."""
+        retry_after = max(
+            (
+                metadata.get("retry_after", 1)
+                for allowed, metadata in outcomes
+                if not allowed
+            ),
+            default=1,
+        )
+        return [
+            (
+                False,
+                {
+                    **metadata,
+                    "remaining": 0,
+                    "retry_after": metadata.get("retry_after", retry_after),
+                },
+            )
+            for _, metadata in outcomes
+        ]
+
+    def peek(
+        self,
+        identifier: str,
+        limit: int,
+        window: int,
+        scope: str = "",
+        *,
+        cost: int = 1,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """
+        Report a client's status without consuming any of its limit.
+
+        The stored state is read without writing it or taking locks, and
+        the decision ``is_allowed`` would make right now for a request of
+        ``cost`` is computed from it. The metadata is what ``is_allowed``
+        would return, except that ``remaining`` and ``current_count`` of an
+        allowed request don't include it.
+
+        Args:
+            identifier: Unique identifier for the client
+            limit: Maximum number of requests allowed
+            window: Time window in seconds
+            scope: Optional scope for grouping
+            cost: Units of the limit the hypothetical request would consume
+
+        Returns:
+            Tuple of (would_allow, metadata)
+        """
+        return self.peek_many([(identifier, limit, window, scope, cost)])[0]
+
+    def peek_many(
+        self, checks: Sequence[Tuple[Any, ...]]
+    ) -> List[Tuple[bool, Dict[str, Any]]]:
+        """
+        Peek at several clients with one batched backend read.
+
+        Checks are ``(identifier, limit, window[, scope[, cost]])`` tuples as
+        in ``is_allowed_many`` and are answered independently as ``peek``
+        would answer them. The default runs each check's ``_prepare``
+        updaters on copies of the state fetched with ``get_many``.
+
+        Returns:
+            List of (would_allow, metadata), one per check
+        """
+        probes = []
+        for identifier, limit, window, scope, cost in map(
+            self._normalize_check, checks
+        ):
+            # A free request reads the status, a second one makes the decision
+            status = self._prepare(identifier, limit, window, scope, 0)
+            request = self._prepare(identifier, limit, window, scope, cost)
+            if status is None or request is None:
+                raise NotImplementedError(
+                    f"{self.__class__.__name__} does not support peeking"
+                )
+            probes.append((status, request))
+
+        keys = [key for status, _ in probes for key, _, _ in status[0]]
+        stored = self.backend.get_many(list(dict.fromkeys(keys)))
+
+        outcomes = []
+        for status, request in probes:
+            allowed, metadata = self._dry_run(*request, stored)
+            if allowed:
+                outcomes.append(self._dry_run(*status, stored))
+            else:
+                outcomes.append((False, metadata))
+        return outcomes
+
+    @staticmethod
+    def _dry_run(
+        updates: List[Tuple[str, Callable[[Any], Any], Optional[int]]],
+        finish: Callable[[List[Any]], Tuple[bool, Dict[str, Any]]],
+        stored: Dict[str, Any],
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Run a prepared check on copies of stored state, writing nothing."""
+        return finish(
+            [updater(copy.deepcopy(stored.get(key))) for key, updater, _ in updates]
+        )
+
+    def _prepare(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> Optional[_Prepared]:
+        """
+        Split a check into backend updates and a function reading the result.
+
+        Limiters whose checks are a set of ``atomic_update`` calls return
+        ``([(key, updater, ttl), ...], finish)``, where ``finish`` receives the
+        updaters' results in order (``None`` when an update was not written)
+        and returns ``(is_allowed, metadata)``. This lets
+        ``is_allowed_many`` run many checks in one backend batch. Limiters
+        that can't be expressed this way return ``None``.
+        """
+        return None
+
+    def _apply_prepared(
+        self,
+        updates: List[Tuple[str, Callable[[Any], Any], Optional[int]]],
+        finish: Callable[[List[Any]], Tuple[bool, Dict[str, Any]]],
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Run a prepared check's updates one by one and read the result."""
+        return finish(
+            [
+                self.backend.atomic_update(key, updater, ttl)
+                for key, updater, ttl in updates
+            ]
+        )
+
+
+class _Sample:
+    """What a worker knows about a client between sampled backend checks."""
+
+    __slots__ = ("rate", "skipped", "pending", "expires", "metadata")
+
+    def __init__(self, rate: int, expires: float, metadata: Dict[str, Any]):
+        self.rate = rate
+        self.expires = expires
+        self.metadata = metadata
+        self.skipped = 0
+        self.pending = 0
+
+
+class _SamplingMixin:
+    """
+    Check only one in N requests of clients far below their limit.
+
+    With ``sample_fraction`` set, a worker remembers the ``remaining`` the
+    backend reported at a client's last check and allows the next N - 1
+    requests locally. The N-th request is checked with the cost of all N,
+    so the shared count catches up in one write. N is ``sample_fraction`` of
+    what remained, capped at ``max_sample_rate``; once fewer than
+    ``2 / sample_fraction`` remain, or after a denial, every request is
+    checked exactly. If the catch-up check is denied, as much of the skipped
+    cost as still fits is charged before this request is checked alone. A
+    worker lets at most N - 1 requests through uncounted, which fits in what
+    remained only while fewer than ``1 / sample_fraction`` workers serve the
+    client; with more, admissions overshoot the limit by up to ``workers *
+    sample_fraction`` of it. What a worker knows expires after ``window``
+    seconds, and at most ``max_sampled_clients`` clients are remembered.
+
+    Subclasses call ``_init_sampling``, provide ``_exact_is_allowed`` and
+    route ``is_allowed`` through ``_sampled_is_allowed`` when
+    ``sample_fraction`` is set.
+    """
+
+    peek: Callable[..., Tuple[bool, Dict[str, Any]]]
+    max_sampled_clients = 10000
+
+    def _init_sampling(self, sample_fraction: float, max_sample_rate: int) -> None:
+        if not 0 <= sample_fraction <= 1:
+            raise ValueError("sample_fraction must be between 0 and 1")
+        if max_sample_rate < 1:
+            raise ValueError("max_sample_rate must be at least 1")
+        self.sample_fraction = sample_fraction
+        self.max_sample_rate = max_sample_rate
+        self._samples: "OrderedDict[str, _Sample]" = OrderedDict()
+        self._samples_lock = threading.Lock()
+
+    def _exact_is_allowed(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Check a request against the shared backend."""
+        raise NotImplementedError
+
+    def _sampled_is_allowed(
+        self, key: str, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Allow a request locally, or check it with the cost skipped so far."""
+        key = f"{key}:{limit}/{window}"
+        now = time.time()
+
+        with self._samples_lock:
+            sample = self._samples.get(key)
+            if sample is not None and sample.expires > now:
+                if sample.skipped + 1 < sample.rate:
+                    sample.skipped += 1
+                    sample.pending += cost
+                    return True, self._sample_metadata(sample)
+            self._samples.pop(key, None)
+        pending = sample.pending if sample is not None else 0
+
+        allowed, metadata = self._exact_is_allowed(
+            identifier, limit, window, scope, pending + cost
+        )
+        if not allowed and pending:
+            # The skipped requests were already served: charge what still
+            # fits of them, then check this one alone
+            would_allow, status = self.peek(identifier, limit, window, scope)
+            charge = min(pending, status["remaining"] if would_allow else 0)
+            if charge:
+                self._exact_is_allowed(identifier, limit, window, scope, charge)
+            allowed, metadata = self._exact_is_allowed(
+                identifier, limit, window, scope, cost
+            )
+
+        rate = 1
+        if allowed:
+            rate = max(
+                1,
+                min(
+                    self.max_sample_rate,
+                    int(metadata["remaining"] * self.sample_fraction),
+                ),
+            )
+        with self._samples_lock:
+            # Keep an entry another thread created meanwhile
+            if key not in self._samples:
+                self._samples[key] = _Sample(rate, now + window, metadata)
+            self._samples.move_to_end(key)
+            while len(self._samples) > self.max_sampled_clients:
+                self._samples.popitem(last=False)
+        return allowed, {**metadata, "sample_rate": rate}
+
+    def _sample_metadata(self, sample: _Sample) -> Dict[str, Any]:
+        """Describe a request allowed locally after the last check."""
+        metadata = {
+            **sample.metadata,
+            "remaining": max(0, sample.metadata["remaining"] - sample.pending),
+            "sample_rate": sample.rate,
+        }
+        if "current_count" in metadata:
+            metadata["current_count"] += sample.pending
+        return metadata
+
 
-class SlidingWindowRateLimiter(BaseRateLimiter):
+class SlidingWindowRateLimiter(_SamplingMixin, BaseRateLimiter):
     """
     Sliding window rate limiter using a log of timestamps.
 
     Maintains a precise sliding window by storing individual request timestamps.
     More memory intensive but provides exact rate limiting.
+
+    Limits above ``histogram_threshold`` switch to a bucketed histogram of
+    ``[bucket, count]`` pairs, so state stays bounded by ``histogram_buckets``
+    entries however generous the limit is. Buckets are
+    ``max(1, window / histogram_buckets)`` seconds wide (per second for short
+    windows) and count until their last second leaves the window. The
+    histogram therefore never admits more than the exact log would; a request
+    may stay counted up to one bucket longer, a window error of at most
+    ``1 / histogram_buckets``. State is converted when a limit crosses the
+    threshold in either direction.
+
+    With ``sample_fraction`` clients far below their limit are checked only
+    once every few requests; see ``_SamplingMixin``.
     """
 
+    def __init__(
+        self,
+        backend: Optional[BaseBackend] = None,
+        key_prefix: str = "rate_limit",
+        histogram_threshold: int = 1000,
+        histogram_buckets: int = 100,
+        sample_fraction: float = 0.0,
+        max_sample_rate: int = 100,
+    ):
+        super().__init__(backend, key_prefix)
+        self.histogram_threshold = histogram_threshold
+        self.histogram_buckets = histogram_buckets
+        self._init_sampling(sample_fraction, max_sample_rate)
+
     def is_allowed(
-        self, identifier: str, limit: int, window: int, scope: str = ""
+        self,
+        identifier: str,
+        limit: int,
+        window: int,
+        scope: str = "",
+        *,
+        cost: int = 1,
     ) -> Tuple[bool, Dict[str, Any]]:
         """Check if request is allowed using sliding window algorithm."""
+        self._check_cost(cost)
+        if self.sample_fraction:
+            return self._sampled_is_allowed(
+                self._get_key(identifier, scope), identifier, limit, window, scope, cost
+            )
+        return self._exact_is_allowed(identifier, limit, window, scope, cost)
+
+    def _exact_is_allowed(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Check a request against the shared timestamp log."""
+        return self._apply_prepared(
+            *self._prepare(identifier, limit, window, scope, cost)
+        )
+
+    def _prepare(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> _Prepared:
+        """Prepare a sliding log check, bucketed above the threshold."""
+        if limit > self.histogram_threshold:
+            return self._prepare_histogram(identifier, limit, window, scope, cost)
+
         key = self._get_key(identifier, scope)
         current_time = time.time()
         window_start = current_time - window
@@ -97,6 +682,10 @@ class SlidingWindowRateLimiter(BaseRateLimiter):
         def update_window(current_data):
             if current_data is None:
                 current_data = {"requests": []}
+            elif "buckets" in current_data:
+                current_data = {
+                    "requests": self._buckets_to_log(current_data, current_time, limit)
+                }
 
             # Remove requests outside the window
             requests = [
@@ -106,8 +695,8 @@ class SlidingWindowRateLimiter(BaseRateLimiter):
             ]
 
             # Check if we can add a new request
-            if len(requests) < limit:
-                requests.append(current_time)
+            if len(requests) + cost <= limit:
+                requests.extend([current_time] * cost)
                 allowed = True
             else:
                 allowed = False
@@ -116,42 +705,348 @@ class SlidingWindowRateLimiter(BaseRateLimiter):
                 "requests": requests,
                 "allowed": allowed,
                 "count": len(requests),
-                "oldest_request": min(requests) if requests else None,
             }
 
-        result = self.backend.atomic_update(key, update_window, window + 10)
+        def finish(results):
+            result = results[0]
 
-        if result and result.get("allowed", False):
-            return True, {
-                "remaining": limit - result["count"],
-                "reset_time": current_time + window,
-                "current_count": result["count"],
+            if result and result.get("allowed", False):
+                return True, {
+                    "remaining": limit - result["count"],
+                    "reset_time": current_time + window,
+                    "current_count": result["count"],
+                }
+            else:
+                # Calculate retry after: enough of the oldest requests must expire
+                requests = sorted(result["requests"]) if result else []
+                to_expire = len(requests) + cost - limit
+                retry_after = (
+                    max(0, int((requests[to_expire - 1] + window) - current_time))
+                    if 0 < to_expire <= len(requests)
+                    else window
+                )
+
+                return False, {
+                    "remaining": 0,
+                    "reset_time": current_time + retry_after,
+                    "current_count": result.get("count", limit) if result else limit,
+                    "retry_after": retry_after,
+                }
+
+        _with_headroom(update_window, lambda state: limit - state["count"])
+        return [(key, update_window, window + 10)], finish
+
+    def _prepare_histogram(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> _Prepared:
+        """Prepare a check against the bucketed histogram."""
+        key = self._get_key(identifier, scope)
+        current_time = time.time()
+        window_start = current_time - window
+        bucket_size = max(1.0, window / self.histogram_buckets)
+        current_bucket = int(current_time // bucket_size)
+
+        def update_histogram(current_data):
+            buckets = self._as_buckets(current_data, bucket_size)
+
+            # Drop buckets whose last second has left the window
+            buckets = [b for b in buckets if (b[0] + 1) * bucket_size > window_start]
+            count = sum(bucket_count for _, bucket_count in buckets)
+
+            if count + cost <= limit:
+                # A lagging clock counts into the newest bucket
+                if buckets and buckets[-1][0] >= current_bucket:
+                    buckets[-1][1] += cost
+                else:
+                    buckets.append([current_bucket, cost])
+                allowed = True
+                count += cost
+            else:
+                allowed = False
+
+            return {
+                "bucket_size": bucket_size,
+                "buckets": buckets,
+                "allowed": allowed,
+                "count": count,
             }
-        else:
-            # Calculate retry after
-            oldest_request = result.get("oldest_request") if result else None
-            retry_after = (
-                max(0, int((oldest_request + window) - current_time))
-                if oldest_request
-                else window
-            )
+
+        def finish(results):
+            result = results[0]
+
+            if result and result.get("allowed", False):
+                return True, {
+                    "remaining": limit - result["count"],
+                    "reset_time": current_time + window,
+                    "current_count": result["count"],
+                }
+
+            count = result.get("count", limit) if result else limit
+            retry_after = window
+            if result:
+                # Release buckets oldest first until the request fits
+                excess = count + cost - limit
+                freed = 0
+                for bucket, bucket_count in result["buckets"]:
+                    freed += bucket_count
+                    if freed >= excess:
+                        release_time = (bucket + 1) * bucket_size + window
+                        retry_after = max(1, math.ceil(release_time - current_time))
+                        break
 
             return False, {
                 "remaining": 0,
                 "reset_time": current_time + retry_after,
-                "current_count": result.get("count", limit) if result else limit,
+                "current_count": count,
                 "retry_after": retry_after,
             }
 
+        _with_headroom(update_histogram, lambda state: limit - state["count"])
+        return [(key, update_histogram, window + 10)], finish
+
+    @staticmethod
+    def _as_buckets(current_data: Any, bucket_size: float) -> List[List[int]]:
+        """Return stored state as sorted ``[bucket, count]`` pairs."""
+        if not current_data:
+            return []
+
+        if "buckets" in current_data:
+            stored_size = current_data["bucket_size"]
+            if stored_size == bucket_size:
+                return current_data["buckets"]
+            # Re-bucket by each bucket's end so nothing is released early
+            pairs = [
+                (int(((b + 1) * stored_size - 1e-9) // bucket_size), c)
+                for b, c in current_data["buckets"]
+            ]
+        else:
+            pairs = [
+                (int(req_time // bucket_size), 1)
+                for req_time in current_data.get("requests", [])
+            ]
+
+        merged: Dict[int, int] = {}
+        for bucket, bucket_count in pairs:
+            merged[bucket] = merged.get(bucket, 0) + bucket_count
+        return [[bucket, merged[bucket]] for bucket in sorted(merged)]
+
+    @staticmethod
+    def _buckets_to_log(
+        current_data: Dict[str, Any], current_time: float, limit: int
+    ) -> List[float]:
+        """Expand a histogram into at most ``limit`` of its newest timestamps."""
+        bucket_size = current_data["bucket_size"]
+        requests: List[float] = []
+        for bucket, bucket_count in reversed(current_data["buckets"]):
+            # Stamp at the bucket's end so nothing is released early
+            req_time = min((bucket + 1) * bucket_size, current_time)
+            requests[:0] = [req_time] * min(bucket_count, limit - len(requests))
+            if len(requests) >= limit:
+                break
+        return requests
+
+
+class _TokenLease:
+    """Tokens taken from the shared backend and not yet spent locally."""
+
+    __slots__ = (
+        "epoch",
+        "tokens",
+        "expires",
+        "granted_at",
+        "spent",
+        "rate",
+        "metadata",
+    )
+
+    def __init__(
+        self,
+        epoch: Any,
+        tokens: int,
+        expires: float,
+        granted_at: float,
+        metadata: Dict[str, Any],
+    ):
+        self.epoch = epoch
+        self.tokens = tokens
+        self.expires = expires
+        self.granted_at = granted_at
+        self.metadata = metadata
+        self.spent = 0
+        self.rate = 0.0
+
+
+class _TokenLeasingMixin:
+    """
+    Spend tokens leased in blocks from the shared backend without round trips.
+
+    A worker takes a block of tokens from the shared state in one atomic
+    update and spends it in process; only when the block runs out does it go
+    back to the backend. The block size follows the observed request rate
+    (enough tokens for ``lease_ttl`` seconds), capped at ``max_lease_size``
+    and at ``max_lease_fraction`` of the limit so one worker can't hoard the
+    quota. Tokens left in a lease idle for ``lease_ttl`` seconds, and all
+    leases at interpreter exit or on ``return_leases``, go back to the shared
+    state. Leased tokens are already counted there, so the global limit holds.
+
+    Subclasses provide ``_take_block``, ``_give_back`` and the metadata
+    field reporting what is left, ``_remaining_field``.
+    """
+
+    _remaining_field = "remaining"
+
+    def _init_leasing(
+        self,
+        local_lease: bool,
+        lease_ttl: float,
+        max_lease_size: int,
+        max_lease_fraction: float,
+    ) -> None:
+        self.local_lease = local_lease
+        self.lease_ttl = lease_ttl
+        self.max_lease_size = max_lease_size
+        self.max_lease_fraction = max_lease_fraction
+        self._leases: Dict[str, _TokenLease] = {}
+        self._leases_lock = threading.Lock()
+        self._next_lease_sweep = 0.0
+        self._exit_hook_registered = False
+
+    def _take_block(
+        self, key: str, epoch: Any, block: int, needed: int, context: Dict[str, Any]
+    ) -> Tuple[int, Dict[str, Any]]:
+        """
+        Take between ``needed`` and ``block`` tokens from the shared state.
+
+        Returns:
+            Tuple of (granted, metadata) where granted is 0 when fewer than
+            ``needed`` tokens are available and metadata describes the shared
+            state after the grant
+        """
+        raise NotImplementedError
+
+    def _give_back(self, key: str, epoch: Any, tokens: int) -> None:
+        """Return unspent leased tokens to the shared state."""
+        raise NotImplementedError
+
+    def _leased_is_allowed(
+        self, key: str, epoch: Any, limit: int, cost: int, context: Dict[str, Any]
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Spend ``cost`` leased tokens, taking a new block when they run out."""
+        now = time.time()
+        if now >= self._next_lease_sweep:
+            self._return_idle_leases(now)
+
+        with self._leases_lock:
+            lease = self._leases.get(key)
+            if lease is not None and lease.epoch == epoch and lease.tokens >= cost:
+                lease.tokens -= cost
+                lease.spent += cost
+                return True, self._lease_metadata(lease.metadata, lease.tokens)
+            self._leases.pop(key, None)
+
+        held, rate = 0, 0.0
+        if lease is not None:
+            observed = lease.spent / max(now - lease.granted_at, 1e-3)
+            rate = observed if not lease.rate else (lease.rate + observed) / 2
+            if lease.epoch == epoch:
+                held = lease.tokens
+            elif lease.tokens:
+                self._give_back(key, lease.epoch, lease.tokens)
+
+        block = min(
+            self.max_lease_size,
+            max(1, int(limit * self.max_lease_fraction)),
+            max(1, math.ceil(rate * self.lease_ttl)),
+        )
+        granted, metadata = self._take_block(
+            key, epoch, max(block, cost - held), cost - held, context
+        )
+        tokens = held + granted
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+
+        # Keep even an empty lease to remember the observed rate
+        with self._leases_lock:
+            current = self._leases.get(key)
+            if current is not None and current.epoch == epoch:
+                # Another thread refilled meanwhile
+                current.tokens += tokens
+                current.expires = now + self.lease_ttl
+                current.metadata = metadata
+            else:
+                lease = _TokenLease(epoch, tokens, now + self.lease_ttl, now, metadata)
+                lease.spent = cost if allowed else 0
+                lease.rate = rate
+                self._leases[key] = lease
+            if not self._exit_hook_registered:
+                self._exit_hook_registered = True
+                atexit.register(self.return_leases)
+        if current is not None and current.epoch != epoch and current.tokens:
+            self._give_back(key, current.epoch, current.tokens)
 
-class TokenBucketRateLimiter(BaseRateLimiter):
+        if not allowed:
+            return False, metadata
+        return True, self._lease_metadata(metadata, tokens)
+
+    def _lease_metadata(self, metadata: Dict[str, Any], tokens: int) -> Dict[str, Any]:
+        """Describe a request served with ``tokens`` still leased locally."""
+        return {
+            **metadata,
+            self._remaining_field: metadata[self._remaining_field] + tokens,
+            "leased_tokens": tokens,
+        }
+
+    def _return_idle_leases(self, now: float) -> None:
+        """Give back the tokens of leases not refreshed for lease_ttl seconds."""
+        with self._leases_lock:
+            self._next_lease_sweep = now + self.lease_ttl
+            idle = [
+                (key, lease)
+                for key, lease in self._leases.items()
+                if lease.expires <= now
+            ]
+            for key, _ in idle:
+                del self._leases[key]
+        for key, lease in idle:
+            if lease.tokens:
+                self._give_back(key, lease.epoch, lease.tokens)
+
+    def return_leases(self) -> None:
+        """Give every unspent leased token back to the shared backend."""
+        with self._leases_lock:
+            leases = list(self._leases.items())
+            self._leases.clear()
+        for key, lease in leases:
+            if lease.tokens:
+                self._give_back(key, lease.epoch, lease.tokens)
+
+
+class TokenBucketRateLimiter(_TokenLeasingMixin, BaseRateLimiter):
     """
     Token bucket rate limiter.
 
     Allows burst requests up to the bucket capacity while maintaining
     a steady rate of token replenishment.
+
+    With ``local_lease`` each worker takes tokens from the shared bucket in
+    blocks and spends them in process; see ``_TokenLeasingMixin``.
     """
 
+    _remaining_field = "remaining_tokens"
+
+    def __init__(
+        self,
+        backend: Optional[BaseBackend] = None,
+        key_prefix: str = "rate_limit",
+        local_lease: bool = False,
+        lease_ttl: float = 1.0,
+        max_lease_size: int = 1000,
+        max_lease_fraction: float = 0.1,
+    ):
+        super().__init__(backend, key_prefix)
+        self._init_leasing(local_lease, lease_ttl, max_lease_size, max_lease_fraction)
+
     def is_allowed(
         self,
         identifier: str,
@@ -160,6 +1055,8 @@ class TokenBucketRateLimiter(BaseRateLimiter):
         scope: str = "",
         tokens_per_request: int = 1,
         burst_capacity: Optional[int] = None,
+        *,
+        cost: int = 1,
     ) -> Tuple[bool, Dict[str, Any]]:
         """
         Check if request is allowed using token bucket algorithm.
@@ -171,9 +1068,50 @@ class TokenBucketRateLimiter(BaseRateLimiter):
             scope: Optional scope for grouping
             tokens_per_request: Number of tokens required per request
             burst_capacity: Maximum bucket capacity (defaults to limit)
+            cost: Multiplier of tokens_per_request for this request
         """
+        self._check_cost(cost)
+        if self.local_lease:
+            return self._leased_is_allowed(
+                self._get_key(identifier, scope),
+                window,
+                limit,
+                tokens_per_request * cost,
+                {
+                    "limit": limit,
+                    "window": window,
+                    "burst_capacity": (
+                        limit if burst_capacity is None else burst_capacity
+                    ),
+                },
+            )
+        return self._apply_prepared(
+            *self._prepare(
+                identifier,
+                limit,
+                window,
+                scope,
+                cost,
+                tokens_per_request=tokens_per_request,
+                burst_capacity=burst_capacity,
+            )
+        )
+
+    def _prepare(
+        self,
+        identifier: str,
+        limit: int,
+        window: int,
+        scope: str,
+        cost: int,
+        tokens_per_request: int = 1,
+        burst_capacity: Optional[int] = None,
+    ) -> _Prepared:
+        """Prepare a token bucket check."""
         if burst_capacity is None:
             burst_capacity = limit
+        unit_tokens = max(tokens_per_request, 1)
+        tokens_per_request *= cost
 
         key = self._get_key(identifier, scope)
         current_time = time.time()
@@ -205,46 +1143,293 @@ class TokenBucketRateLimiter(BaseRateLimiter):
                 "allowed": allowed,
             }
 
-        result = self.backend.atomic_update(key, update_bucket, window * 2)
+        def finish(results):
+            result = results[0]
 
-        if result and result.get("allowed", False):
-            return True, {
-                "remaining_tokens": int(result["tokens"]),
-                "burst_capacity": burst_capacity,
-                "refill_rate": tokens_per_second,
-            }
-        else:
-            # Calculate retry after (time to get enough tokens)
-            current_tokens = result.get("tokens", 0) if result else 0
-            tokens_needed = tokens_per_request - current_tokens
-            retry_after = max(1, int(tokens_needed / tokens_per_second))
+            if result and result.get("allowed", False):
+                return True, {
+                    "remaining_tokens": int(result["tokens"]),
+                    "burst_capacity": burst_capacity,
+                    "refill_rate": tokens_per_second,
+                }
+            else:
+                # Calculate retry after (time to get enough tokens)
+                current_tokens = result.get("tokens", 0) if result else 0
+                tokens_needed = tokens_per_request - current_tokens
+                retry_after = max(1, int(tokens_needed / tokens_per_second))
+
+                return False, {
+                    "remaining_tokens": int(current_tokens),
+                    "burst_capacity": burst_capacity,
+                    "refill_rate": tokens_per_second,
+                    "retry_after": retry_after,
+                }
+
+        _with_headroom(
+            update_bucket, lambda state: int(state["tokens"] / unit_tokens + 1e-9)
+        )
+        return [(key, update_bucket, window * 2)], finish
+
+    def _refill(
+        self, current_data: Any, current_time: float, context: Dict[str, Any]
+    ) -> float:
+        """Return the tokens in a stored bucket after refilling it."""
+        if current_data is None:
+            return context["burst_capacity"]
+        time_elapsed = current_time - current_data.get("last_refill", current_time)
+        return min(
+            context["burst_capacity"],
+            current_data.get("tokens", 0)
+            + time_elapsed * context["limit"] / context["window"],
+        )
 
-            return False, {
-                "remaining_tokens": int(current_tokens),
-                "burst_capacity": burst_capacity,
-                "refill_rate": tokens_per_second,
-                "retry_after": retry_after,
+    def _take_block(
+        self, key: str, epoch: Any, block: int, needed: int, context: Dict[str, Any]
+    ) -> Tuple[int, Dict[str, Any]]:
+        """Take a block of whole tokens from the shared bucket."""
+        current_time = time.time()
+        tokens_per_second = context["limit"] / context["window"]
+        outcome: List[Any] = [0, 0.0]
+
+        def take_tokens(current_data):
+            current_tokens = self._refill(current_data, current_time, context)
+            granted = min(block, int(current_tokens + 1e-9))
+            if granted < needed:
+                granted = 0
+            outcome[:] = [granted, current_tokens - granted]
+            return {
+                "tokens": current_tokens - granted,
+                "last_refill": current_time,
+                "allowed": granted > 0,
             }
 
+        self.backend.atomic_update(key, take_tokens, context["window"] * 2)
+        granted, current_tokens = outcome
+
+        metadata = {
+            "remaining_tokens": int(current_tokens),
+            "burst_capacity": context["burst_capacity"],
+            "refill_rate": tokens_per_second,
+        }
+        if not granted:
+            metadata["retry_after"] = max(
+                1, int((needed - current_tokens) / tokens_per_second)
+            )
+        return granted, metadata
+
+    def _give_back(self, key: str, epoch: Any, tokens: int) -> None:
+        """Put unspent tokens back into the shared bucket."""
 
-class FixedWindowRateLimiter(BaseRateLimiter):
+        def return_tokens(current_data):
+            if current_data is None:
+                # The bucket expired and refills to capacity anyway
+                return None
+            return {**current_data, "tokens": current_data.get("tokens", 0) + tokens}
+
+        # The epoch of a bucket lease is its window
+        self.backend.atomic_update(key, return_tokens, epoch * 2)
+
+
+class _SplitCount:
+    """The summed count of a split key as of a recent read."""
+
+    __slots__ = ("count", "expires")
+
+    def __init__(self, count: int, expires: float):
+        self.count = count
+        self.expires = expires
+
+
+class _SplitCounterMixin:
+    """
+    Spread the counter of a hot key across ``split_counters`` sub-keys.
+
+    A key whose identifier is in ``hot_keys``, or that a worker sees more
+    than ``hot_key_rate`` times within a second, is split: requests add
+    their cost to a random sub-key and compare the sum of the key and its
+    sub-keys with the limit, so concurrent writes no longer queue on one
+    key or row. Each worker reads the sum with one ``get_many`` at most
+    every ``split_cache_ttl`` seconds and adds its own writes in between; a
+    request the cached sum would deny is checked against a fresh sum. Other
+    workers' admissions since the last read go unseen, so the limit can be
+    exceeded by what they admit within ``split_cache_ttl``.
+
+    Sub-keys carry a hash tag made of a digest of the key and the shard
+    number, which spreads the sub-keys of one key, and those of different
+    keys, over Redis Cluster slots. Subclasses call ``_init_splitting`` and
+    make every worker sum the same counters once a key is split.
+    """
+
+    backend: BaseBackend
+    max_split_keys = 10000
+
+    def _init_splitting(
+        self,
+        split_counters: int,
+        hot_keys: Sequence[str],
+        hot_key_rate: float,
+        split_cache_ttl: float,
+    ) -> None:
+        self.split_counters = split_counters
+        self.hot_keys = frozenset(hot_keys)
+        self.hot_key_rate = hot_key_rate
+        self.split_cache_ttl = split_cache_ttl
+        # Requests per key in the current second, and sums of split keys
+        self._request_rates: "OrderedDict[str, List[int]]" = OrderedDict()
+        self._split_sums: "OrderedDict[str, _SplitCount]" = OrderedDict()
+        self._split_lock = threading.Lock()
+
+    def _split_keys(self, key: str) -> List[str]:
+        """Return the sub-keys of a split key."""
+        tag = hashlib.blake2b(key.encode(), digest_size=4).hexdigest()
+        return [f"{key}:{{{tag}:s{shard}}}" for shard in range(self.split_counters)]
+
+    def _is_hot(self, identifier: str, key: str, now: float) -> bool:
+        """Count a request of key and tell whether the key should be split."""
+        if identifier in self.hot_keys:
+            return True
+        if not self.hot_key_rate:
+            return False
+        second = int(now)
+        with self._split_lock:
+            rate = self._request_rates.get(key)
+            if rate is None or rate[0] != second:
+                rate = self._request_rates[key] = [second, 0]
+            self._request_rates.move_to_end(key)
+            while len(self._request_rates) > self.max_split_keys:
+                self._request_rates.popitem(last=False)
+            rate[1] += 1
+            return rate[1] > self.hot_key_rate
+
+    def _is_split(self, key: str) -> bool:
+        """Tell whether this worker has seen key split."""
+        with self._split_lock:
+            return key in self._split_sums
+
+    def _split_total(self, key: str, now: float, fresh: bool = False) -> int:
+        """Return the count of key and its sub-keys, cached unless fresh."""
+        with self._split_lock:
+            cached = self._split_sums.get(key)
+            if cached is not None and not fresh and cached.expires > now:
+                return cached.count
+
+        stored = self.backend.get_many([key, *self._split_keys(key)])
+        total = sum(_as_count(value) for value in stored.values())
+        with self._split_lock:
+            self._split_sums[key] = _SplitCount(total, now + self.split_cache_ttl)
+            self._split_sums.move_to_end(key)
+            while len(self._split_sums) > self.max_split_keys:
+                self._split_sums.popitem(last=False)
+        return total
+
+    def _split_charge(self, key: str, cost: int, ttl: int) -> None:
+        """Add cost to a random sub-key of key."""
+        sub_key = self._split_keys(key)[random.randrange(self.split_counters)]
+        self.backend.increment(sub_key, cost, ttl)
+        with self._split_lock:
+            cached = self._split_sums.get(key)
+            if cached is not None:
+                cached.count += cost
+
+
+class FixedWindowRateLimiter(
+    _TokenLeasingMixin, _SamplingMixin, _SplitCounterMixin, BaseRateLimiter
+):
     """
     Fixed window rate limiter.
 
     Divides time into fixed windows and counts requests within each window.
     Simple and memory efficient but can allow bursts at window boundaries.
+
+    With ``local_lease`` each worker takes blocks of the window's quota and
+    spends them in process; see ``_TokenLeasingMixin``. With
+    ``sample_fraction`` clients far below their limit are checked only once
+    every few requests; see ``_SamplingMixin``. With ``split_counters`` the
+    counters of hot keys are spread across sub-keys; see
+    ``_SplitCounterMixin``. The first worker to split a window flags its
+    counter, and workers finding the flag sum the sub-keys too. Batch checks
+    of a limiter with split counters run one by one.
     """
 
+    def __init__(
+        self,
+        backend: Optional[BaseBackend] = None,
+        key_prefix: str = "rate_limit",
+        local_lease: bool = False,
+        lease_ttl: float = 1.0,
+        max_lease_size: int = 1000,
+        max_lease_fraction: float = 0.1,
+        sample_fraction: float = 0.0,
+        max_sample_rate: int = 100,
+        split_counters: int = 0,
+        hot_keys: Sequence[str] = (),
+        hot_key_rate: float = 0.0,
+        split_cache_ttl: float = 0.05,
+    ):
+        super().__init__(backend, key_prefix)
+        if local_lease and (sample_fraction or split_counters):
+            raise ValueError(
+                "local_lease can't be combined with sample_fraction or split_counters"
+            )
+        self._init_leasing(local_lease, lease_ttl, max_lease_size, max_lease_fraction)
+        self._init_sampling(sample_fraction, max_sample_rate)
+        self._init_splitting(split_counters, hot_keys, hot_key_rate, split_cache_ttl)
+
     def is_allowed(
-        self, identifier: str, limit: int, window: int, scope: str = ""
+        self,
+        identifier: str,
+        limit: int,
+        window: int,
+        scope: str = "",
+        *,
+        cost: int = 1,
     ) -> Tuple[bool, Dict[str, Any]]:
         """Check if request is allowed using fixed window algorithm."""
+        self._check_cost(cost)
+        if self.local_lease:
+            window_start = int(time.time() // window) * window
+            return self._leased_is_allowed(
+                self._get_key(identifier, scope),
+                (window_start, window),
+                limit,
+                cost,
+                {"limit": limit, "window": window},
+            )
+        if self.sample_fraction:
+            return self._sampled_is_allowed(
+                self._get_key(identifier, scope), identifier, limit, window, scope, cost
+            )
+        return self._exact_is_allowed(identifier, limit, window, scope, cost)
+
+    def _exact_is_allowed(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Check a request against the shared window counter."""
+        if self.split_counters:
+            return self._split_is_allowed(identifier, limit, window, scope, cost)
+        return self._apply_prepared(
+            *self._prepare_window(identifier, limit, window, scope, cost)
+        )
+
+    def _prepare(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> Optional[_Prepared]:
+        """Prepare a fixed window check, unless windows may be split."""
+        if self.split_counters:
+            return None
+        return self._prepare_window(identifier, limit, window, scope, cost)
+
+    def _prepare_window(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> _Prepared:
+        """Prepare a check of the window counter alone."""
         key = self._get_key(identifier, scope)
         current_time = time.time()
 
         # Calculate current window
         window_start = int(current_time // window) * window
         window_key = f"{key}:{window_start}"
+        split = [False]
 
         def update_counter(current_data):
             if current_data is None:
@@ -255,10 +1440,15 @@ class FixedWindowRateLimiter(BaseRateLimiter):
                 # New window, reset counter
                 current_data = {"count": 0, "window_start": window_start}
 
+            if self.split_counters and current_data.get("split"):
+                # Another worker split the window; its sub-keys count too
+                split[0] = True
+                return None
+
             current_count = current_data.get("count", 0)
 
-            if current_count < limit:
-                current_data["count"] = current_count + 1
+            if current_count + cost <= limit:
+                current_data["count"] = current_count + cost
                 allowed = True
             else:
                 allowed = False
@@ -266,36 +1456,181 @@ class FixedWindowRateLimiter(BaseRateLimiter):
             current_data["allowed"] = allowed
             return current_data
 
-        result = self.backend.atomic_update(window_key, update_counter, window + 10)
-
-        if result and result.get("allowed", False):
-            current_count = result.get("count", 1)
-            return True, {
-                "remaining": limit - current_count,
-                "reset_time": window_start + window,
-                "current_count": current_count,
-                "window_start": window_start,
-            }
-        else:
-            reset_time = window_start + window
-            retry_after = max(1, int(reset_time - current_time))
+        def finish(results):
+            result = results[0]
+            if split[0]:
+                return False, {"split": True}
 
-            return False, {
-                "remaining": 0,
-                "reset_time": reset_time,
-                "current_count": result.get("count", limit) if result else limit,
-                "retry_after": retry_after,
-                "window_start": window_start,
-            }
+            allowed = bool(result and result.get("allowed", False))
+            if allowed:
+                current_count = result.get("count", 1)
+            else:
+                current_count = result.get("count", limit) if result else limit
+            return self._window_result(
+                allowed, current_count, window_start, window, limit, current_time
+            )
 
+        _with_headroom(update_counter, lambda state: limit - state["count"])
+        return [(window_key, update_counter, window + 10)], finish
 
-class SlidingWindowCounterRateLimiter(BaseRateLimiter):
+    def _window_result(
+        self,
+        allowed: bool,
+        current_count: int,
+        window_start: int,
+        window: int,
+        limit: int,
+        current_time: float,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Build the metadata for a fixed window decision."""
+        reset_time = window_start + window
+        metadata = {
+            "remaining": limit - current_count if allowed else 0,
+            "reset_time": reset_time,
+            "current_count": current_count,
+            "window_start": window_start,
+        }
+        if not allowed:
+            metadata["retry_after"] = max(1, int(reset_time - current_time))
+        return allowed, metadata
+
+    def _split_is_allowed(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Check a request, spreading the counters of hot keys."""
+        key = self._get_key(identifier, scope)
+        current_time = time.time()
+        window_start = int(current_time // window) * window
+        window_key = f"{key}:{window_start}"
+
+        if not self._is_split(window_key):
+            if not self._is_hot(identifier, key, current_time):
+                allowed, metadata = self._apply_prepared(
+                    *self._prepare_window(identifier, limit, window, scope, cost)
+                )
+                if not metadata.get("split"):
+                    return allowed, metadata
+            else:
+                self._split_window(window_key, window_start, window)
+
+        current_count = self._split_total(window_key, current_time)
+        if current_count + cost > limit:
+            # Don't deny on a stale sum
+            current_count = self._split_total(window_key, current_time, fresh=True)
+        allowed = current_count + cost <= limit
+        if allowed:
+            self._split_charge(window_key, cost, window + 10)
+            current_count += cost
+        return self._window_result(
+            allowed, current_count, window_start, window, limit, current_time
+        )
+
+    def _split_window(self, window_key: str, window_start: int, window: int) -> None:
+        """Flag a window's counter so that every worker sums its sub-keys."""
+
+        def flag_split(current_data):
+            if current_data is None or current_data.get("window_start") != window_start:
+                current_data = {"count": 0, "window_start": window_start}
+            current_data["split"] = True
+            return current_data
+
+        self.backend.atomic_update(window_key, flag_split, window + 10)
+
+    def peek_many(
+        self, checks: Sequence[Tuple[Any, ...]]
+    ) -> List[Tuple[bool, Dict[str, Any]]]:
+        """Peek at several clients, summing the sub-keys of split windows."""
+        if not self.split_counters:
+            return super().peek_many(checks)
+
+        current_time = time.time()
+        windows = []
+        for identifier, limit, window, scope, cost in map(
+            self._normalize_check, checks
+        ):
+            window_start = int(current_time // window) * window
+            window_key = f"{self._get_key(identifier, scope)}:{window_start}"
+            keys = [window_key, *self._split_keys(window_key)]
+            windows.append((keys, limit, window, window_start, cost))
+
+        stored = self.backend.get_many(
+            list(dict.fromkeys(key for keys, *_ in windows for key in keys))
+        )
+        outcomes = []
+        for keys, limit, window, window_start, cost in windows:
+            current_count = sum(_as_count(stored.get(key)) for key in keys)
+            outcomes.append(
+                self._window_result(
+                    current_count + cost <= limit,
+                    current_count,
+                    window_start,
+                    window,
+                    limit,
+                    current_time,
+                )
+            )
+        return outcomes
+
+    def _take_block(
+        self, key: str, epoch: Any, block: int, needed: int, context: Dict[str, Any]
+    ) -> Tuple[int, Dict[str, Any]]:
+        """Take a block of the current window's quota."""
+        limit = context["limit"]
+        window_start, window = epoch
+        outcome = [0, 0]
+
+        def take_quota(current_data):
+            if current_data is None or current_data.get("window_start") != window_start:
+                current_data = {"count": 0, "window_start": window_start}
+            current_count = current_data.get("count", 0)
+            granted = min(block, limit - current_count)
+            if granted < needed:
+                granted = 0
+            current_data["count"] = current_count + granted
+            current_data["allowed"] = granted > 0
+            outcome[:] = [granted, current_data["count"]]
+            return current_data
+
+        self.backend.atomic_update(f"{key}:{window_start}", take_quota, window + 10)
+        granted, current_count = outcome
+
+        metadata = {
+            "remaining": max(0, limit - current_count),
+            "reset_time": window_start + window,
+            "current_count": current_count,
+            "window_start": window_start,
+        }
+        if not granted:
+            metadata["retry_after"] = max(1, int(window_start + window - time.time()))
+        return granted, metadata
+
+    def _give_back(self, key: str, epoch: Any, tokens: int) -> None:
+        """Uncount unspent quota while its window is still open."""
+        window_start, window = epoch
+        if time.time() >= window_start + window:
+            return
+
+        def return_quota(current_data):
+            if current_data is None or current_data.get("window_start") != window_start:
+                return None
+            return {
+                **current_data,
+                "count": max(0, current_data.get("count", 0) - tokens),
+            }
+
+        self.backend.atomic_update(f"{key}:{window_start}", return_quota, window + 10)
+
+
+class SlidingWindowCounterRateLimiter(_SamplingMixin, BaseRateLimiter):
     """
     Sliding window counter rate limiter.
 
     Approximates sliding window using multiple fixed windows.
     More memory efficient than full sliding window while providing
     better accuracy than fixed window.
+
+    With ``sample_fraction`` clients far below their limit are checked only
+    once every few requests; see ``_SamplingMixin``.
     """
 
     def __init__(
@@ -303,14 +1638,42 @@ class SlidingWindowCounterRateLimiter(BaseRateLimiter):
         backend: Optional[BaseBackend] = None,
         key_prefix: str = "rate_limit",
         num_windows: int = 10,
+        sample_fraction: float = 0.0,
+        max_sample_rate: int = 100,
     ):
         super().__init__(backend, key_prefix)
         self.num_windows = num_windows
+        self._init_sampling(sample_fraction, max_sample_rate)
 
     def is_allowed(
-        self, identifier: str, limit: int, window: int, scope: str = ""
+        self,
+        identifier: str,
+        limit: int,
+        window: int,
+        scope: str = "",
+        *,
+        cost: int = 1,
     ) -> Tuple[bool, Dict[str, Any]]:
         """Check if request is allowed using sliding window counter algorithm."""
+        self._check_cost(cost)
+        if self.sample_fraction:
+            return self._sampled_is_allowed(
+                self._get_key(identifier, scope), identifier, limit, window, scope, cost
+            )
+        return self._exact_is_allowed(identifier, limit, window, scope, cost)
+
+    def _exact_is_allowed(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Check a request against the shared sub-window counters."""
+        return self._apply_prepared(
+            *self._prepare(identifier, limit, window, scope, cost)
+        )
+
+    def _prepare(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> _Prepared:
+        """Prepare a sliding window counter check."""
         key = self._get_key(identifier, scope)
         current_time = time.time()
 
@@ -319,57 +1682,1552 @@ class SlidingWindowCounterRateLimiter(BaseRateLimiter):
         current_sub_window = int(current_time // sub_window_size)
 
         def update_counters(current_data):
-            if current_data is None:
-                current_data = {"windows": {}, "last_cleanup": current_time}
-
-            windows = current_data.get("windows", {})
-
-            # Cleanup old windows
-            cutoff_window = current_sub_window - self.num_windows
-            windows = {k: v for k, v in windows.items() if int(k) > cutoff_window}
+            counts = self._ring_counts(current_data, current_sub_window)
+            slot = current_sub_window % self.num_windows
+            # Never move the epoch backwards on a lagging clock
+            epoch = max(current_sub_window, (current_data or {}).get("epoch", 0))
 
             # Calculate current total count
-            total_count = sum(windows.values())
+            total_count = sum(counts)
 
             # Check if we can add a new request
-            if total_count < limit:
-                # Add to current sub-window
-                windows[str(current_sub_window)] = (
-                    windows.get(str(current_sub_window), 0) + 1
-                )
+            if total_count + cost <= limit:
+                counts[slot] += cost
                 allowed = True
-                total_count += 1
+                total_count += cost
             else:
                 allowed = False
 
             return {
-                "windows": windows,
-                "last_cleanup": current_time,
+                "epoch": epoch,
+                "counts": counts,
                 "allowed": allowed,
-                "total_count": total_count,
             }
 
-        result = self.backend.atomic_update(key, update_counters, window + 10)
+        def finish(results):
+            result = results[0]
+            counts = result.get("counts", []) if result else []
+            total_count = sum(counts) if counts else limit
+
+            if result and result.get("allowed", False):
+                return True, {
+                    "remaining": limit - total_count,
+                    "reset_time": current_time + window,
+                    "current_count": total_count,
+                }
+            else:
+                retry_after = self._retry_after(
+                    counts,
+                    total_count + cost,
+                    limit,
+                    current_sub_window,
+                    sub_window_size,
+                )
+                retry_after = max(1, math.ceil(retry_after - current_time))
+
+                return False, {
+                    "remaining": 0,
+                    "reset_time": current_time + retry_after,
+                    "current_count": total_count,
+                    "retry_after": retry_after,
+                }
+
+        _with_headroom(update_counters, lambda state: limit - sum(state["counts"]))
+        return [(key, update_counters, window + 10)], finish
+
+    def _ring_counts(self, current_data: Any, current_sub_window: int) -> List[int]:
+        """
+        Return the ring of sub-window counts, rotated to the current sub-window.
 
-        if result and result.get("allowed", False):
-            total_count = result.get("total_count", 1)
+        The ring holds one integer per sub-window at index
+        ``sub_window % num_windows``; ``epoch`` is the last sub-window that
+        was written. Slots that rotated out since then are zeroed in place.
+        State written by the old ``{"windows": {...}}`` layout is migrated.
+        """
+        num_windows = self.num_windows
+
+        if not current_data:
+            return [0] * num_windows
+
+        if "windows" in current_data:
+            counts = [0] * num_windows
+            cutoff_window = current_sub_window - num_windows
+            for sub_window, count in current_data["windows"].items():
+                if cutoff_window < int(sub_window) <= current_sub_window:
+                    counts[int(sub_window) % num_windows] += count
+            return counts
+
+        counts = current_data["counts"]
+        epoch = current_data["epoch"]
+        if len(counts) != num_windows or current_sub_window - epoch >= num_windows:
+            return [0] * num_windows
+
+        for sub_window in range(epoch + 1, current_sub_window + 1):
+            counts[sub_window % num_windows] = 0
+        return counts
+
+    def _retry_after(
+        self,
+        counts: List[int],
+        needed: int,
+        limit: int,
+        current_sub_window: int,
+        sub_window_size: float,
+    ) -> float:
+        """Return the time at which enough sub-windows expire to fit `needed`."""
+        excess = needed - limit
+        oldest = current_sub_window - self.num_windows + 1
+
+        freed = 0
+        for sub_window in range(oldest, current_sub_window + 1):
+            freed += counts[sub_window % self.num_windows] if counts else 0
+            if freed >= excess:
+                # A sub-window leaves the ring once num_windows newer ones began
+                return (sub_window + self.num_windows) * sub_window_size
+
+        return (current_sub_window + self.num_windows) * sub_window_size
+
+
+class ApproximateSlidingWindowRateLimiter(_SamplingMixin, BaseRateLimiter):
+    """
+    Two-window weighted sliding window rate limiter.
+
+    Keeps only the request counts of the current and previous fixed windows
+    and weights the previous count by how much of it still overlaps the
+    sliding window. Constant memory and a constant number of operations per
+    check (two integer counters, a GET and an INCRBY on Redis), with
+    near-sliding accuracy at fixed-window cost. Assumes requests in the
+    previous window were evenly spread.
+
+    With ``sample_fraction`` clients far below their limit are checked only
+    once every few requests; see ``_SamplingMixin``.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[BaseBackend] = None,
+        key_prefix: str = "rate_limit",
+        sample_fraction: float = 0.0,
+        max_sample_rate: int = 100,
+    ):
+        super().__init__(backend, key_prefix)
+        self._init_sampling(sample_fraction, max_sample_rate)
+
+    def is_allowed(
+        self,
+        identifier: str,
+        limit: int,
+        window: int,
+        scope: str = "",
+        *,
+        cost: int = 1,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Check if request is allowed using the weighted two-window estimate."""
+        self._check_cost(cost)
+        if self.sample_fraction:
+            return self._sampled_is_allowed(
+                self._get_key(identifier, scope), identifier, limit, window, scope, cost
+            )
+        return self._exact_is_allowed(identifier, limit, window, scope, cost)
+
+    def _exact_is_allowed(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Check a request with one weighted two-window update."""
+        key = self._get_key(identifier, scope)
+        current_time = time.time()
+
+        window_start = int(current_time // window) * window
+        elapsed = current_time - window_start
+        previous_weight = (window - elapsed) / window
+
+        # The current counter is read as "previous" during the next window
+        allowed, current_count, previous_count = self.backend.weighted_window_update(
+            f"{key}:{window_start}",
+            f"{key}:{window_start - window}",
+            previous_weight,
+            limit,
+            cost,
+            ttl=window * 2 + 10,
+        )
+        return self._result(
+            allowed,
+            current_count,
+            previous_count,
+            current_time,
+            limit,
+            window,
+            cost,
+        )
+
+    def _prepare(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> _Prepared:
+        """Prepare a weighted two-window check as a read and an increment."""
+        key = self._get_key(identifier, scope)
+        current_time = time.time()
+
+        window_start = int(current_time // window) * window
+        previous_weight = (window - (current_time - window_start)) / window
+        # current count before this request, previous count
+        counts = [0, 0]
+
+        def read_previous(stored):
+            counts[1] = _as_count(stored)
+            return None
+
+        def update_current(stored):
+            counts[0] = _as_count(stored)
+            if counts[1] * previous_weight + counts[0] + cost > limit:
+                return None
+            return counts[0] + cost
+
+        def finish(results):
+            # Only a written count admits; the closure explains a denial
+            allowed = results[1] is not None
+            current_count = _as_count(results[1]) if allowed else counts[0]
+            return self._result(
+                allowed,
+                current_count,
+                counts[1],
+                current_time,
+                limit,
+                window,
+                cost,
+            )
+
+        return [
+            (f"{key}:{window_start - window}", read_previous, None),
+            (f"{key}:{window_start}", update_current, window * 2 + 10),
+        ], finish
+
+    def _result(
+        self,
+        allowed: bool,
+        current_count: int,
+        previous_count: int,
+        current_time: float,
+        limit: int,
+        window: int,
+        cost: int,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Build the metadata for a weighted two-window decision."""
+        window_start = int(current_time // window) * window
+        elapsed = current_time - window_start
+        previous_weight = (window - elapsed) / window
+        estimate = previous_count * previous_weight + current_count
+
+        if allowed:
             return True, {
-                "remaining": limit - total_count,
-                "reset_time": current_time + window,
-                "current_count": total_count,
+                "remaining": max(0, int(limit - estimate)),
+                "reset_time": window_start + window,
+                "current_count": int(math.ceil(estimate)),
+                "window_start": window_start,
             }
         else:
-            # Calculate approximate retry time
-            retry_after = max(1, int(sub_window_size))
+            time_left = window - elapsed
+            if current_count + cost <= limit and previous_count:
+                # Wait for the previous window's weight to decay enough
+                headroom = limit - current_count - cost
+                wait = time_left - headroom * window / previous_count
+            elif current_count + cost <= limit:
+                # The counts allow it, so the backend gave up; retry soon
+                wait = 0.0
+            elif current_count:
+                # Wait until the current window becomes the previous one and
+                # its weight has decayed enough
+                wait = time_left + max(
+                    0.0, window * (1 - (limit - cost) / current_count)
+                )
+            else:
+                # The cost alone exceeds the limit
+                wait = window
+            retry_after = max(1, math.ceil(wait))
 
             return False, {
                 "remaining": 0,
                 "reset_time": current_time + retry_after,
-                "current_count": result.get("total_count", limit) if result else limit,
+                "current_count": int(math.ceil(estimate)),
+                "retry_after": retry_after,
+                "window_start": window_start,
+            }
+
+
+class GCRARateLimiter(BaseRateLimiter):
+    """
+    Generic Cell Rate Algorithm (GCRA) rate limiter.
+
+    Stores a single number per key: the theoretical arrival time (TAT) of
+    the next request. Requests are spaced ``window / limit`` seconds apart
+    with a burst tolerance of ``window``, so at most ``limit`` requests fit
+    in any window. Smooth like a token bucket, with the smallest state and
+    exact remaining and retry_after values.
+    """
+
+    def is_allowed(
+        self,
+        identifier: str,
+        limit: int,
+        window: int,
+        scope: str = "",
+        *,
+        cost: int = 1,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Check if request is allowed using the generic cell rate algorithm."""
+        self._check_cost(cost)
+        key = self._get_key(identifier, scope)
+        current_time = time.time()
+        emission_interval = _emission_interval(limit, window)
+
+        allowed, tat = self.backend.gcra_update(
+            key, current_time, emission_interval, window, cost
+        )
+        return self._result(allowed, tat, current_time, limit, window, cost)
+
+    def _prepare(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> _Prepared:
+        """Prepare a GCRA check on the stored theoretical arrival time."""
+        key = self._get_key(identifier, scope)
+        current_time = time.time()
+        emission_interval = _emission_interval(limit, window)
+        outcome: List[Any] = [False, current_time]
+
+        def update_tat(stored_tat):
+            outcome[:] = _gcra_step(
+                stored_tat, current_time, emission_interval, window, cost
+            )
+            return outcome[1] if outcome[0] else None
+
+        def finish(results):
+            # Only a written TAT admits; the closure just explains a denial
+            if results[0] is not None:
+                return self._result(True, results[0], current_time, limit, window, cost)
+            return self._result(False, outcome[1], current_time, limit, window, cost)
+
+        return [(key, update_tat, int(math.ceil(window)) + 1)], finish
+
+    def _result(
+        self,
+        allowed: bool,
+        tat: float,
+        current_time: float,
+        limit: int,
+        window: int,
+        cost: int,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Build the metadata for a GCRA decision."""
+        emission_interval = _emission_interval(limit, window)
+        # Whole requests that still fit within the tolerance
+        remaining = max(
+            0, int((window - (tat - current_time)) / emission_interval + 1e-9)
+        )
+
+        if allowed:
+            return True, {
+                "remaining": remaining,
+                "reset_time": tat,
+                "current_count": limit - remaining,
+            }
+        else:
+            retry_after = max(
+                1, math.ceil(tat + emission_interval * cost - window - current_time)
+            )
+
+            return False, {
+                "remaining": 0,
+                "reset_time": tat,
+                "current_count": limit,
+                "retry_after": retry_after,
+            }
+
+
+class LeakyBucketRateLimiter(BaseRateLimiter):
+    """
+    Leaky bucket (queue) rate limiter that shapes traffic instead of rejecting.
+
+    Requests leave the bucket at a steady ``limit / window`` rate. A request
+    arriving while others are queued is admitted with a ``delay`` until its
+    scheduled slot; callers that wait it out before proceeding send requests
+    downstream at constant throughput. The queue holds at most ``max_queue``
+    waiting requests (default ``limit``) and at most ``max_delay`` seconds of
+    waiting (default 2; None lifts the cap). Callers hold a worker while
+    they wait, so keep the cap short. Requests beyond it are dropped
+    according to ``drop_policy``:
+
+    - ``"tail"``: drop only when the queue is full
+    - ``"red"``: random early detection, dropping with a probability that
+      rises linearly from zero at half the queue to one at a full queue
+
+    The schedule is one number per key, the time the queue drains, updated
+    with ``BaseBackend.gcra_update``.
+    """
+
+    DROP_POLICIES = ("tail", "red")
+
+    def __init__(
+        self,
+        backend: Optional[BaseBackend] = None,
+        key_prefix: str = "rate_limit",
+        max_queue: Optional[int] = None,
+        max_delay: Optional[float] = 2.0,
+        drop_policy: str = "tail",
+    ):
+        super().__init__(backend, key_prefix)
+        if drop_policy not in self.DROP_POLICIES:
+            raise ValueError(
+                f"Unknown drop policy: {drop_policy}. "
+                f"Available: {list(self.DROP_POLICIES)}"
+            )
+        self.max_queue = max_queue
+        self.max_delay = max_delay
+        self.drop_policy = drop_policy
+
+    def _queue_size(self, limit: int, emission_interval: float) -> int:
+        """Return how many requests may wait in the queue."""
+        max_queue = limit if self.max_queue is None else self.max_queue
+        if self.max_delay is not None:
+            max_queue = min(max_queue, int(self.max_delay / emission_interval + 1e-9))
+        return max(0, max_queue)
+
+    def _early_drop(
+        self,
+        stored_tat: Any,
+        current_time: float,
+        emission_interval: float,
+        max_queue: int,
+    ) -> bool:
+        """Decide a random early drop from the current queue depth."""
+        if stored_tat is None:
+            return False
+
+        depth = max(0.0, float(stored_tat) - current_time) / emission_interval
+        threshold = max_queue / 2
+        if depth < threshold:
+            return False
+        probability = (depth - threshold) / max(max_queue - threshold, 1e-9)
+        return random.random() < probability
+
+    def is_allowed(
+        self,
+        identifier: str,
+        limit: int,
+        window: int,
+        scope: str = "",
+        *,
+        cost: int = 1,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Check if request is allowed and schedule it in the leaky bucket."""
+        self._check_cost(cost)
+        key = self._get_key(identifier, scope)
+        current_time = time.time()
+        emission_interval = _emission_interval(limit, window)
+        max_queue = self._queue_size(limit, emission_interval)
+        # Admit while at most max_queue requests are scheduled ahead
+        tolerance = (max_queue + 1) * emission_interval + 1e-9
+
+        if self.drop_policy == "red" and self._early_drop(
+            self.backend.get(key), current_time, emission_interval, max_queue
+        ):
+            return self._dropped(current_time, emission_interval, max_queue)
+
+        # A request of cost n occupies n consecutive slots
+        allowed, tat = self.backend.gcra_update(
+            key,
+            current_time,
+            emission_interval,
+            tolerance + (cost - 1) * emission_interval,
+            cost,
+        )
+        return self._result(
+            allowed, tat, current_time, emission_interval, max_queue, cost
+        )
+
+    def _prepare(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> _Prepared:
+        """Prepare a leaky bucket check on the stored queue drain time."""
+        key = self._get_key(identifier, scope)
+        current_time = time.time()
+        emission_interval = _emission_interval(limit, window)
+        max_queue = self._queue_size(limit, emission_interval)
+        tolerance = (max_queue + 1) * emission_interval + 1e-9
+        # allowed, tat, dropped early
+        outcome: List[Any] = [False, current_time, False]
+
+        def update_tat(stored_tat):
+            # A free request (a peek) occupies no slot and is never dropped
+            if (
+                cost
+                and self.drop_policy == "red"
+                and self._early_drop(
+                    stored_tat, current_time, emission_interval, max_queue
+                )
+            ):
+                outcome[:] = [False, current_time, True]
+                return None
+
+            allowed, tat = _gcra_step(
+                stored_tat,
+                current_time,
+                emission_interval,
+                tolerance + (cost - 1) * emission_interval,
+                cost,
+            )
+            outcome[:] = [allowed, tat, False]
+            return tat if allowed else None
+
+        def finish(results):
+            # Only a written drain time admits; the closure explains a denial
+            if results[0] is not None:
+                return self._result(
+                    True, results[0], current_time, emission_interval, max_queue, cost
+                )
+            if outcome[2]:
+                return self._dropped(current_time, emission_interval, max_queue)
+            return self._result(
+                False, outcome[1], current_time, emission_interval, max_queue, cost
+            )
+
+        return [(key, update_tat, int(math.ceil(window)) + 1)], finish
+
+    def _dropped(
+        self, current_time: float, emission_interval: float, max_queue: int
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Build the metadata for a random early drop."""
+        retry_after = max(1, math.ceil(emission_interval))
+        return False, {
+            "remaining": 0,
+            "reset_time": current_time + retry_after,
+            "current_count": max_queue,
+            "retry_after": retry_after,
+        }
+
+    def _result(
+        self,
+        allowed: bool,
+        tat: float,
+        current_time: float,
+        emission_interval: float,
+        max_queue: int,
+        cost: int,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Build the metadata for a scheduling decision."""
+        if allowed:
+            delay = max(0.0, tat - emission_interval * cost - current_time)
+            queue_depth = math.ceil(delay / emission_interval - 1e-9)
+            return True, {
+                # Unit requests that still fit in the queue behind this one
+                "remaining": max(0, max_queue + 1 - queue_depth - cost),
+                "reset_time": tat,
+                "current_count": queue_depth,
+                "delay": delay,
+                "queue_depth": queue_depth,
+            }
+        else:
+            tolerance = (max_queue + 1) * emission_interval + 1e-9
+            retry_after = max(
+                1, math.ceil(tat + emission_interval - tolerance - current_time)
+            )
+
+            return False, {
+                "remaining": 0,
+                "reset_time": tat,
+                "current_count": max_queue,
+                "retry_after": retry_after,
+            }
+
+
+class ConcurrencyRateLimiter(BaseRateLimiter):
+    """
+    Concurrency (in-flight) rate limiter.
+
+    Limits how many requests run at the same time rather than how many
+    arrive per window. ``limit`` is the number of simultaneous requests and
+    ``window`` the lease TTL in seconds. An allowed request holds a lease,
+    identified by ``lease_id`` in the metadata, until ``release`` is called
+    or the lease expires, so leases of crashed workers free their slot on
+    their own. Keep ``window`` above the slowest expected request.
+    """
+
+    # A slot frees as soon as a running request finishes
+    deny_cacheable = False
+
+    def is_allowed(
+        self,
+        identifier: str,
+        limit: int,
+        window: int,
+        scope: str = "",
+        *,
+        cost: int = 1,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Check if request is allowed by acquiring an in-flight lease."""
+        self._check_cost(cost)
+        key = self._get_key(identifier, scope)
+        current_time = time.time()
+        # The cost rides along in the lease id so release frees every slot
+        lease_id = uuid.uuid4().hex if cost == 1 else f"{uuid.uuid4().hex}:{cost}"
+
+        acquired, in_flight = self.backend.acquire_lease(
+            key, lease_id, limit, current_time, window, cost
+        )
+
+        if acquired:
+            return True, {
+                "remaining": limit - in_flight,
+                "reset_time": current_time + window,
+                "current_count": in_flight,
+                "lease_id": lease_id,
+            }
+        else:
+            # Slots free up as soon as running requests finish
+            return False, {
+                "remaining": 0,
+                "reset_time": current_time + 1,
+                "current_count": in_flight,
+                "retry_after": 1,
+            }
+
+    def peek_many(
+        self, checks: Sequence[Tuple[Any, ...]]
+    ) -> List[Tuple[bool, Dict[str, Any]]]:
+        """Peek at in-flight counts without acquiring or pruning leases."""
+        outcomes = []
+        current_time = time.time()
+        for identifier, limit, window, scope, cost in map(
+            self._normalize_check, checks
+        ):
+            in_flight = self.backend.count_leases(
+                self._get_key(identifier, scope), current_time
+            )
+            if in_flight + cost <= limit:
+                metadata = {
+                    "remaining": limit - in_flight,
+                    "reset_time": current_time + window,
+                    "current_count": in_flight,
+                }
+                outcomes.append((True, metadata))
+            else:
+                metadata = {
+                    "remaining": 0,
+                    "reset_time": current_time + 1,
+                    "current_count": in_flight,
+                    "retry_after": 1,
+                }
+                outcomes.append((False, metadata))
+        return outcomes
+
+    def release(
+        self,
+        identifier: str,
+        lease_id: Optional[str],
+        window: Optional[int] = None,
+        scope: str = "",
+    ) -> None:
+        """Release the in-flight lease of a finished request."""
+        if lease_id:
+            quantity = int(lease_id.partition(":")[2] or 1)
+            self.backend.release_lease(
+                self._get_key(identifier, scope), lease_id, window, quantity
+            )
+
+
+class CompositeRateLimiter(BaseRateLimiter):
+    """
+    Composite rate limiter enforcing several (limit, window) tiers at once.
+
+    Expresses burst plus sustained limits such as 10 per second and 1000 per
+    hour for one identifier. The ``limit``/``window`` passed to
+    ``is_allowed`` form the first tier and ``tiers`` lists the others. Each
+    tier is counted by a ``tier_algorithm`` limiter on the same backend, and
+    all tiers are checked with a single all-or-nothing ``is_allowed_many``
+    batch: a request consumes from every tier only if every tier allows it,
+    and a denial reports the longest ``retry_after`` among the denied tiers.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[BaseBackend] = None,
+        key_prefix: str = "rate_limit",
+        tiers: Optional[Sequence[Tuple[int, int]]] = None,
+        tier_algorithm: str = "sliding_window",
+        **tier_kwargs,
+    ):
+        super().__init__(backend, key_prefix)
+        if tier_kwargs.get("split_counters"):
+            # Split windows are checked one by one, outside the tiers' batch
+            raise ValueError("Composite tiers can't use split counters")
+        self.tiers = [(int(limit), int(window)) for limit, window in tiers or []]
+        self.tier_limiter = get_rate_limiter(
+            tier_algorithm, backend=self.backend, key_prefix=key_prefix, **tier_kwargs
+        )
+        if type(self.tier_limiter)._prepare is BaseRateLimiter._prepare:
+            # Checked one by one, the tiers that allow would be charged
+            raise ValueError(
+                f"Composite tiers can't use the {tier_algorithm} algorithm"
+            )
+
+    def is_allowed(
+        self,
+        identifier: str,
+        limit: int,
+        window: int,
+        scope: str = "",
+        *,
+        cost: int = 1,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Check if request is allowed by every tier in one batch."""
+        self._check_cost(cost)
+        tiers, tier_checks = self._tier_checks(identifier, limit, window, scope, cost)
+        return self._combine(
+            tiers, self.tier_limiter.is_allowed_many(tier_checks, all_or_nothing=True)
+        )
+
+    def peek_many(
+        self, checks: Sequence[Tuple[Any, ...]]
+    ) -> List[Tuple[bool, Dict[str, Any]]]:
+        """Peek at every tier of several checks with one batched read."""
+        expanded = [
+            self._tier_checks(*check) for check in map(self._normalize_check, checks)
+        ]
+        results = self.tier_limiter.peek_many(
+            [tier_check for _, tier_checks in expanded for tier_check in tier_checks]
+        )
+
+        outcomes = []
+        for tiers, _ in expanded:
+            outcomes.append(self._combine(tiers, results[: len(tiers)]))
+            results = results[len(tiers) :]
+        return outcomes
+
+    def _tier_checks(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> Tuple[List[Tuple[int, int]], List[Tuple[Any, ...]]]:
+        """Return the tiers of a check and the tier limiter's check for each."""
+        tiers = [(limit, window)] + self.tiers
+        return tiers, [
+            (
+                identifier,
+                tier_limit,
+                tier_window,
+                (
+                    f"{scope}:{tier_limit}/{tier_window}"
+                    if scope
+                    else f"{tier_limit}/{tier_window}"
+                ),
+                cost,
+            )
+            for tier_limit, tier_window in tiers
+        ]
+
+    def _combine(
+        self,
+        tiers: List[Tuple[int, int]],
+        results: List[Tuple[bool, Dict[str, Any]]],
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Merge the tiers' results into one decision."""
+        now = time.time()
+        tier_metadata = []
+        for (tier_limit, tier_window), (_, metadata) in zip(tiers, results):
+            # Token buckets report remaining_tokens and no window position
+            remaining = metadata.get("remaining", metadata.get("remaining_tokens", 0))
+            tier_metadata.append(
+                {
+                    "limit": tier_limit,
+                    "window": tier_window,
+                    "remaining": remaining,
+                    "current_count": tier_limit - remaining,
+                    "reset_time": now,
+                    **metadata,
+                }
+            )
+
+        # The tightest tier decides what the client sees
+        tightest = min(tier_metadata, key=lambda metadata: metadata["remaining"])
+        metadata = {
+            "remaining": tightest["remaining"],
+            "reset_time": max(tier["reset_time"] for tier in tier_metadata),
+            "current_count": tightest["current_count"],
+            "tiers": tier_metadata,
+        }
+        delays = [tier["delay"] for tier in tier_metadata if "delay" in tier]
+        if delays:
+            metadata["delay"] = max(delays)
+
+        if all(allowed for allowed, _ in results):
+            return True, metadata
+        else:
+            metadata["retry_after"] = max(
+                tier.get("retry_after", 1) for tier in tier_metadata
+            )
+            return False, metadata
+
+
+class HierarchicalRateLimiter(BaseRateLimiter):
+    """
+    Hierarchical quota limiter charging a request up a chain of parents.
+
+    ``get_parent(identifier)`` returns the parent of an identifier as
+    ``(parent_identifier, limit, window)``, or ``None`` at the top, e.g. an
+    API key's user and that user's organization with their plan quotas. A
+    request is charged against its own ``limit``/``window`` and every
+    ancestor's quota at once, each counted in a fixed window, and is denied at
+    the first exhausted level from the bottom up when any level would be
+    exceeded; nothing is charged then. The chain is updated with
+    ``BaseBackend.chain_increment``, a single script on Redis, and every key
+    of a chain carries the root identifier as a ``{hash tag}`` so Redis
+    Cluster keeps them in one slot.
+
+    Parent lookups are cached in process for ``parent_cache_ttl`` seconds,
+    for at most ``max_cached_parents`` identifiers, least recently used
+    first out; call ``invalidate_parents`` after moving an identifier or
+    changing a plan.
+    """
+
+    max_cached_parents = 10000
+
+    def __init__(
+        self,
+        backend: Optional[BaseBackend] = None,
+        key_prefix: str = "rate_limit",
+        get_parent: Union[
+            str, Callable[[str], Optional[Tuple[str, int, int]]], None
+        ] = None,
+        parent_cache_ttl: float = 300,
+        max_depth: int = 8,
+    ):
+        super().__init__(backend, key_prefix)
+        self.get_parent: Callable[[str], Optional[Tuple[str, int, int]]] = (
+            import_string(get_parent)
+            if isinstance(get_parent, str)
+            else get_parent or (lambda identifier: None)
+        )
+        self.parent_cache_ttl = parent_cache_ttl
+        self.max_depth = max_depth
+        self._parents: (
+            "OrderedDict[str, Tuple[float, Optional[Tuple[str, int, int]]]]"
+        ) = OrderedDict()
+        self._parents_lock = threading.Lock()
+
+    def _parent(self, identifier: str) -> Optional[Tuple[str, int, int]]:
+        """Look up the parent of an identifier through the in-process cache."""
+        now = time.monotonic()
+        with self._parents_lock:
+            cached = self._parents.get(identifier)
+            if cached is not None and cached[0] > now:
+                self._parents.move_to_end(identifier)
+                return cached[1]
+
+        parent = self.get_parent(identifier)
+        if parent is not None:
+            parent_identifier, limit, window = parent
+            parent = (str(parent_identifier), int(limit), int(window))
+        with self._parents_lock:
+            self._parents[identifier] = (now + self.parent_cache_ttl, parent)
+            self._parents.move_to_end(identifier)
+            while len(self._parents) > self.max_cached_parents:
+                self._parents.popitem(last=False)
+        return parent
+
+    def invalidate_parents(self, identifier: Optional[str] = None) -> None:
+        """Forget the cached parent of an identifier, or of every identifier."""
+        with self._parents_lock:
+            if identifier is None:
+                self._parents.clear()
+            else:
+                self._parents.pop(identifier, None)
+
+    def get_chain(
+        self, identifier: str, limit: int, window: int
+    ) -> List[Tuple[str, int, int]]:
+        """Return the (identifier, limit, window) levels from bottom to top."""
+        chain = [(identifier, limit, window)]
+        seen = {identifier}
+        while len(chain) < self.max_depth:
+            parent = self._parent(chain[-1][0])
+            if parent is None or parent[0] in seen:
+                break
+            chain.append(parent)
+            seen.add(parent[0])
+        return chain
+
+    def is_allowed(
+        self,
+        identifier: str,
+        limit: int,
+        window: int,
+        scope: str = "",
+        *,
+        cost: int = 1,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Check if request is allowed by its own and every parent quota."""
+        self._check_cost(cost)
+        current_time = time.time()
+        chain = self.get_chain(identifier, limit, window)
+        keys, window_starts = self._chain_keys(chain, scope, current_time)
+        allowed, counts = self.backend.chain_increment(
+            keys,
+            [level_limit for _, level_limit, _ in chain],
+            cost,
+            [level_window + 10 for _, _, level_window in chain],
+        )
+        return self._result(allowed, chain, window_starts, counts, current_time, cost)
+
+    def peek_many(
+        self, checks: Sequence[Tuple[Any, ...]]
+    ) -> List[Tuple[bool, Dict[str, Any]]]:
+        """Peek at the counters of several chains with one batched read."""
+        current_time = time.time()
+        chains = []
+        for identifier, limit, window, scope, cost in map(
+            self._normalize_check, checks
+        ):
+            chain = self.get_chain(identifier, limit, window)
+            chains.append((chain, *self._chain_keys(chain, scope, current_time), cost))
+        stored = self.backend.get_many(
+            list(dict.fromkeys(key for _, keys, _, _ in chains for key in keys))
+        )
+
+        outcomes = []
+        for chain, keys, window_starts, cost in chains:
+            counts = [_as_count(stored.get(key)) for key in keys]
+            allowed = all(
+                count + cost <= level_limit
+                for count, (_, level_limit, _) in zip(counts, chain)
+            )
+            outcomes.append(
+                self._result(allowed, chain, window_starts, counts, current_time, cost)
+            )
+        return outcomes
+
+    def _chain_keys(
+        self, chain: List[Tuple[str, int, int]], scope: str, current_time: float
+    ) -> Tuple[List[str], List[int]]:
+        """Return the counter key and window start of every level of a chain."""
+        hash_tag = f"{{{chain[-1][0]}}}"
+        window_starts = [
+            int(current_time // level_window) * level_window
+            for _, _, level_window in chain
+        ]
+        keys = [
+            f"{self._get_key(level_identifier, scope)}:{hash_tag}:{start}"
+            for (level_identifier, _, _), start in zip(chain, window_starts)
+        ]
+        return keys, window_starts
+
+    def _result(
+        self,
+        allowed: bool,
+        chain: List[Tuple[str, int, int]],
+        window_starts: List[int],
+        counts: List[int],
+        current_time: float,
+        cost: int,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Build the metadata for a decision on a chain of quotas."""
+        levels: List[Dict[str, Any]] = [
+            {
+                "identifier": level_identifier,
+                "limit": level_limit,
+                "window": level_window,
+                "remaining": max(0, level_limit - count),
+                "reset_time": start + level_window,
+                "current_count": count,
+            }
+            for (level_identifier, level_limit, level_window), start, count in zip(
+                chain, window_starts, counts
+            )
+        ]
+
+        if allowed:
+            tightest = min(levels, key=lambda level: level["remaining"])
+            return True, {
+                "remaining": tightest["remaining"],
+                "reset_time": tightest["reset_time"],
+                "current_count": levels[0]["current_count"],
+                "levels": levels,
+            }
+        else:
+            exhausted = next(
+                (
+                    level
+                    for level in levels
+                    if level["current_count"] + cost > level["limit"]
+                ),
+                levels[0],
+            )
+            retry_after = max(1, math.ceil(exhausted["reset_time"] - current_time))
+
+            return False, {
+                "remaining": 0,
+                "reset_time": exhausted["reset_time"],
+                "current_count": levels[0]["current_count"],
                 "retry_after": retry_after,
+                "exhausted_level": exhausted["identifier"],
+                "levels": levels,
             }
 
 
+class CountMinSketchRateLimiter(BaseRateLimiter):
+    """
+    Fixed window rate limiter counting identifiers in a count-min sketch.
+
+    All identifiers of a scope share one ``depth`` x ``width`` array of
+    counters per window instead of one key each, so state stays at
+    ``width * depth`` counters (32 KiB by default) however many distinct
+    identifiers arrive, e.g. during a distributed attack. An identifier's
+    count is the smallest of its ``depth`` counters, which are updated
+    conservatively and never undercount: nobody gets more than ``limit``.
+
+    The estimate can exceed the true count. With ``N`` requests in the window
+    across all identifiers, it overcounts by at most ``e / width * N`` with
+    probability at least ``1 - exp(-depth)``; the defaults (2048 x 4) keep
+    the overcount below 0.14% of the window's total traffic for 98% of
+    identifiers. Size ``width`` so that this stays well under ``limit`` at
+    the expected traffic.
+
+    The backend must update sketches in place (``supports_sketch``): the
+    memory and Redis backends do.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[BaseBackend] = None,
+        key_prefix: str = "rate_limit",
+        width: int = 2048,
+        depth: int = 4,
+    ):
+        super().__init__(backend, key_prefix)
+        if width < 1 or depth < 1:
+            raise ValueError("Sketch width and depth must be positive")
+        if not self.backend.supports_sketch:
+            raise ValueError(
+                f"{self.backend.__class__.__name__} can't hold count-min sketches; "
+                "use the memory or Redis backend"
+            )
+        self.width = width
+        self.depth = depth
+
+    def _indexes(self, identifier: str) -> List[int]:
+        """Return the counter of each sketch row for an identifier."""
+        digest = hashlib.blake2b(identifier.encode(), digest_size=16).digest()
+        # Double hashing derives every row's hash from two 64-bit halves
+        first = int.from_bytes(digest[:8], "big")
+        second = int.from_bytes(digest[8:], "big") | 1
+        return [
+            row * self.width + (first + row * second) % self.width
+            for row in range(self.depth)
+        ]
+
+    def is_allowed(
+        self,
+        identifier: str,
+        limit: int,
+        window: int,
+        scope: str = "",
+        *,
+        cost: int = 1,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Check if request is allowed using its count-min sketch estimate."""
+        self._check_cost(cost)
+        current_time = time.time()
+        window_start = int(current_time // window) * window
+
+        # One sketch per scope and window; identifiers only pick counters
+        allowed, estimate = self.backend.sketch_update(
+            self._get_key(str(window_start), scope),
+            self._indexes(identifier),
+            self.width * self.depth,
+            limit,
+            cost,
+            ttl=window + 10,
+        )
+        return self._result(allowed, estimate, current_time, limit, window)
+
+    def peek_many(
+        self, checks: Sequence[Tuple[Any, ...]]
+    ) -> List[Tuple[bool, Dict[str, Any]]]:
+        """Peek at sketch estimates without raising any counter."""
+        outcomes = []
+        current_time = time.time()
+        for identifier, limit, window, scope, cost in map(
+            self._normalize_check, checks
+        ):
+            window_start = int(current_time // window) * window
+            estimate = self.backend.sketch_estimate(
+                self._get_key(str(window_start), scope), self._indexes(identifier)
+            )
+            outcomes.append(
+                self._result(
+                    estimate + cost <= limit, estimate, current_time, limit, window
+                )
+            )
+        return outcomes
+
+    def _result(
+        self,
+        allowed: bool,
+        estimate: int,
+        current_time: float,
+        limit: int,
+        window: int,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Build the metadata for a decision on a sketch estimate."""
+        window_start = int(current_time // window) * window
+        reset_time = window_start + window
+
+        if allowed:
+            return True, {
+                "remaining": max(0, limit - estimate),
+                "reset_time": reset_time,
+                "current_count": estimate,
+                "window_start": window_start,
+            }
+        else:
+            return False, {
+                "remaining": 0,
+                "reset_time": reset_time,
+                "current_count": estimate,
+                "retry_after": max(1, int(reset_time - current_time)),
+                "window_start": window_start,
+            }
+
+
+class CalendarRateLimiter(BaseRateLimiter):
+    """
+    Calendar-aligned quota rate limiter.
+
+    Counts requests per calendar minute, hour, day, week or month in
+    ``timezone``, so quotas reset at the start of the period (e.g. midnight
+    or the first of the month) instead of rolling from the first request.
+    The period is ``period``, or the one matching ``window`` as
+    ``parse_rate_string`` returns it, so "1000/month" is a calendar month
+    rather than 30 days. Weeks start on ``week_start`` (0 is Monday).
+
+    Counts are kept in multi-resolution buckets: minute buckets for the last
+    hour, rolled up into hour buckets for the last day, rolled up into day
+    buckets. State stays below about 60 + 24 + (days in the window) buckets
+    and a check sums them. With ``rolling`` the limit applies to the
+    trailing ``window`` seconds instead, of any length; the bucket at the
+    window's edge counts in full until it ends, so the limit is conservative
+    by at most one bucket (a minute, hour or day, depending on its age).
+    """
+
+    # Windows of parse_rate_string read as calendar periods
+    period_windows = {
+        60: "minute",
+        3600: "hour",
+        86400: "day",
+        604800: "week",
+        2592000: "month",
+    }
+    # Buckets older than these many seconds join the next coarser tier
+    minute_retention = 3600
+    hour_retention = 86400
+
+    _TIERS = (("minutes", "minute"), ("hours", "hour"), ("days", "day"))
+
+    def __init__(
+        self,
+        backend: Optional[BaseBackend] = None,
+        key_prefix: str = "rate_limit",
+        period: Optional[str] = None,
+        timezone: str = "UTC",
+        week_start: int = 0,
+        rolling: bool = False,
+    ):
+        super().__init__(backend, key_prefix)
+        if period is not None and period not in self.period_windows.values():
+            raise ValueError(f"Invalid calendar period: {period}")
+        if rolling and period is not None:
+            raise ValueError("Rolling windows can't have a calendar period")
+        if not 0 <= week_start <= 6:
+            raise ValueError("week_start must be between 0 (Monday) and 6 (Sunday)")
+        self.period = period
+        self.timezone = timezone
+        self.week_start = week_start
+        self.rolling = rolling
+
+        self.tzinfo: tzinfo
+        if timezone == "UTC":
+            self.tzinfo = dt_timezone.utc
+        elif not ZONEINFO_AVAILABLE:
+            raise ValueError("Time zones other than UTC require Python 3.9+")
+        else:
+            try:
+                self.tzinfo = ZoneInfo(timezone)
+            except (KeyError, ValueError) as e:
+                raise ValueError(f"Unknown time zone: {timezone}") from e
+        # Bounds of the latest period of each unit, see _current_bounds
+        self._bounds: Dict[str, Tuple[int, int]] = {}
+
+    def get_period(self, window: int) -> str:
+        """Return the calendar period of a window, e.g. "month" for 2592000."""
+        if self.period is not None:
+            return self.period
+        if window not in self.period_windows:
+            raise ValueError(
+                f"Window {window} is not a calendar period; pass period explicitly"
+            )
+        return self.period_windows[window]
+
+    def period_bounds(self, timestamp: float, period: str) -> Tuple[int, int]:
+        """
+        Return the calendar period containing a timestamp.
+
+        Args:
+            timestamp: Time in seconds
+            period: "minute", "hour", "day", "week" or "month"
+
+        Returns:
+            Tuple of (start, end) timestamps
+        """
+        local = datetime.fromtimestamp(timestamp, self.tzinfo)
+        if period in ("minute", "hour"):
+            # Time zone offsets are whole minutes, so these are fixed lengths
+            local = local.replace(second=0, microsecond=0)
+            if period == "minute":
+                start = int(local.timestamp())
+                return start, start + 60
+            start = int(local.replace(minute=0).timestamp())
+            return start, start + 3600
+
+        # Longer periods follow the wall clock across DST changes
+        start_local = local.replace(hour=0, minute=0, second=0, microsecond=0)
+        if period == "day":
+            end_local = start_local + timedelta(days=1)
+        elif period == "week":
+            start_local -= timedelta(days=(local.weekday() - self.week_start) % 7)
+            end_local = start_local + timedelta(days=7)
+        else:
+            start_local = start_local.replace(day=1)
+            end_local = (start_local + timedelta(days=32)).replace(day=1)
+        return int(start_local.timestamp()), int(end_local.timestamp())
+
+    def _current_bounds(self, timestamp: float, period: str) -> Tuple[int, int]:
+        """Return ``period_bounds``, reusing the last result while it holds."""
+        bounds = self._bounds.get(period)
+        if bounds is None or not bounds[0] <= timestamp < bounds[1]:
+            bounds = self._bounds[period] = self.period_bounds(timestamp, period)
+        return bounds
+
+    def _bucket_end(self, start: int, unit: str) -> int:
+        """Return the end of the bucket starting at start."""
+        if unit == "minute":
+            return start + 60
+        if unit == "hour":
+            return start + 3600
+        return self.period_bounds(start, unit)[1]
+
+    @staticmethod
+    def _add(tier: List[List[int]], start: int, count: int) -> None:
+        """Add count to the newest bucket of a tier, or start a newer one."""
+        # A lagging clock adds to the newest bucket instead of an older one
+        if tier and start <= tier[-1][0]:
+            tier[-1][1] += count
+        else:
+            tier.append([start, count])
+
+    def _roll_up(
+        self, current_data: Any, current_time: float, cutoff: float
+    ) -> Dict[str, List[List[int]]]:
+        """
+        Return the stored buckets as of current_time.
+
+        Buckets ending by cutoff are dropped, then minute buckets older than
+        ``minute_retention`` join their hour's bucket and hour buckets older
+        than ``hour_retention`` join their day's bucket. Every tier is a list
+        of ``[start, count]`` pairs, oldest first.
+        """
+        buckets = {name: (current_data or {}).get(name, []) for name, _ in self._TIERS}
+        for name, unit in self._TIERS:
+            tier = buckets[name]
+            while tier and self._bucket_end(tier[0][0], unit) <= cutoff:
+                tier.pop(0)
+
+        for (name, unit), (coarser, coarser_unit), retention in (
+            (self._TIERS[0], self._TIERS[1], self.minute_retention),
+            (self._TIERS[1], self._TIERS[2], self.hour_retention),
+        ):
+            tier = buckets[name]
+            while (
+                tier and self._bucket_end(tier[0][0], unit) <= current_time - retention
+            ):
+                start, count = tier.pop(0)
+                self._add(
+                    buckets[coarser], self.period_bounds(start, coarser_unit)[0], count
+                )
+        return buckets
+
+    def is_allowed(
+        self,
+        identifier: str,
+        limit: int,
+        window: int,
+        scope: str = "",
+        *,
+        cost: int = 1,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Check if request is allowed within its calendar period."""
+        self._check_cost(cost)
+        return self._apply_prepared(
+            *self._prepare(identifier, limit, window, scope, cost)
+        )
+
+    def _prepare(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> _Prepared:
+        """Prepare a calendar check as one update of the bucket tiers."""
+        key = self._get_key(identifier, scope)
+        current_time = time.time()
+
+        if self.rolling:
+            key = f"{key}:{window}"
+            cutoff, reset_time = current_time - window, current_time + window
+            ttl = window + 10
+        else:
+            # One key per period, so a new period starts from nothing
+            period = self.get_period(window)
+            cutoff, reset_time = self._current_bounds(current_time, period)
+            key = f"{key}:{period}:{cutoff}"
+            ttl = int(math.ceil(reset_time - current_time)) + 10
+        minute_start = self._current_bounds(current_time, "minute")[0]
+        # allowed, buckets, count
+        outcome: List[Any] = [False, {}, 0]
+
+        def update_buckets(current_data):
+            buckets = self._roll_up(current_data, current_time, cutoff)
+            count = sum(count for tier in buckets.values() for _, count in tier)
+            if count + cost > limit:
+                outcome[:] = [False, buckets, count]
+                return None
+            self._add(buckets["minutes"], minute_start, cost)
+            outcome[:] = [True, buckets, count + cost]
+            return buckets
+
+        def finish(results):
+            allowed, buckets, count = outcome
+            metadata: Dict[str, Any] = {
+                "remaining": max(0, limit - count),
+                "reset_time": reset_time,
+                "current_count": count,
+            }
+            if not self.rolling:
+                metadata["window_start"] = cutoff
+            if allowed:
+                return True, metadata
+
+            if self.rolling:
+                reset_time_denied = self._rolling_reset(
+                    buckets, count + cost - limit, current_time, window
+                )
+            else:
+                reset_time_denied = reset_time
+            retry_after = max(1, math.ceil(reset_time_denied - current_time))
+            metadata.update(
+                remaining=0,
+                reset_time=current_time + retry_after,
+                retry_after=retry_after,
+            )
+            return False, metadata
+
+        return [(key, update_buckets, ttl)], finish
+
+    def _rolling_reset(
+        self,
+        buckets: Dict[str, List[List[int]]],
+        excess: int,
+        current_time: float,
+        window: int,
+    ) -> float:
+        """Return the time at which enough buckets leave the window."""
+        freed = 0
+        for name, unit in reversed(self._TIERS):
+            for start, count in buckets[name]:
+                freed += count
+                if freed >= excess:
+                    return self._bucket_end(start, unit) + window
+        # The cost alone exceeds the limit
+        return current_time + window
+
+
+class PenaltyRateLimiter(BaseRateLimiter):
+    """
+    Rate limiter escalating blocks for identifiers that keep hitting a limit.
+
+    Requests are checked by an ``inner_algorithm`` limiter on the same
+    backend. Every request it denies is a violation of the identifier.
+    Violations beyond ``penalty_threshold`` block the identifier for
+    ``base_penalty`` seconds, multiplied by ``penalty_factor`` (2 by
+    default) with each further violation up to ``max_penalty``. One
+    violation is forgiven per ``penalty_decay`` seconds after a block ends.
+    Blocked requests are denied without touching the inner limiter's state.
+    With a deny cache they are denied in process for the whole block.
+
+    Each identifier and scope stores ``{"violations": n, "blocked_until": t}``
+    in a key next to the inner limiter's state. The key is read, checked and
+    written in the same ``atomic_update_many`` batch as the inner check, and
+    only violations write it. Inner algorithms that can't run in a batch are
+    rejected, and their local modes (leasing, sampling, split counters) are
+    not used.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[BaseBackend] = None,
+        key_prefix: str = "rate_limit",
+        base_penalty: float = 60,
+        penalty_factor: float = 2.0,
+        max_penalty: float = 86400,
+        penalty_threshold: int = 3,
+        penalty_decay: float = 3600,
+        inner_algorithm: str = "sliding_window",
+        **inner_kwargs,
+    ):
+        super().__init__(backend, key_prefix)
+        if base_penalty <= 0 or max_penalty < base_penalty or penalty_factor < 1:
+            raise ValueError(
+                "Penalties need 0 < base_penalty <= max_penalty and penalty_factor >= 1"
+            )
+        if penalty_threshold < 0 or penalty_decay <= 0:
+            raise ValueError(
+                "penalty_threshold can't be negative and penalty_decay must be positive"
+            )
+        self.base_penalty = base_penalty
+        self.penalty_factor = penalty_factor
+        self.max_penalty = max_penalty
+        self.penalty_threshold = penalty_threshold
+        self.penalty_decay = penalty_decay
+        self.inner_limiter = get_rate_limiter(
+            inner_algorithm, backend=self.backend, key_prefix=key_prefix, **inner_kwargs
+        )
+        if type(self.inner_limiter)._prepare is BaseRateLimiter._prepare:
+            raise ValueError(f"Penalties can't wrap the {inner_algorithm} algorithm")
+        if inner_kwargs.get("split_counters"):
+            raise ValueError("Penalties can't wrap split counters")
+
+        # Further violations can't lengthen a block of max_penalty
+        escalations = 0
+        if penalty_factor > 1:
+            escalations = math.ceil(
+                math.log(max_penalty / base_penalty) / math.log(penalty_factor)
+            )
+        self.max_violations = penalty_threshold + 1 + escalations
+        # Keep the state until a block of max_penalty has fully decayed
+        self.penalty_ttl = int(max_penalty + self.max_violations * penalty_decay) + 10
+        self.deny_cacheable = self.inner_limiter.deny_cacheable
+
+    def penalty(self, violations: int) -> float:
+        """Return the seconds an identifier with this many violations is blocked."""
+        if violations <= self.penalty_threshold:
+            return 0.0
+        escalation = min(violations, self.max_violations) - self.penalty_threshold - 1
+        return min(
+            self.max_penalty, self.base_penalty * self.penalty_factor**escalation
+        )
+
+    def _violations(self, stored: Any, current_time: float) -> int:
+        """Return the stored violations left after decay."""
+        if not stored:
+            return 0
+        idle = max(0.0, current_time - stored["blocked_until"])
+        return max(0, stored["violations"] - int(idle // self.penalty_decay))
+
+    def is_allowed(
+        self,
+        identifier: str,
+        limit: int,
+        window: int,
+        scope: str = "",
+        *,
+        cost: int = 1,
+    ) -> Tuple[bool, Dict[str, Any]]:
+        """Check if request is allowed unless the identifier is blocked."""
+        self._check_cost(cost)
+        updates, finish = self._prepare(identifier, limit, window, scope, cost)
+        return finish(self.backend.atomic_update_many(updates))
+
+    def _prepare(
+        self, identifier: str, limit: int, window: int, scope: str, cost: int
+    ) -> _Prepared:
+        """Prepare the inner check between a read and a write of the penalty."""
+        inner = self.inner_limiter._prepare(identifier, limit, window, scope, cost)
+        if inner is None:
+            raise ValueError("Penalties need an inner check that runs in a batch")
+        inner_updates, inner_finish = inner
+        penalty_key = f"{self._get_key(identifier, scope)}:penalty"
+        current_time = time.time()
+        # Decayed violations, block end, the inner results and decision
+        state: Dict[str, Any] = {}
+
+        def check_block(stored):
+            state.clear()
+            state.update(violations=self._violations(stored, current_time), results=[])
+            if stored and current_time < stored["blocked_until"]:
+                state["blocked_until"] = stored["blocked_until"]
+            return None
+
+        def gate(updater):
+            def update_inner(stored):
+                # Blocked requests leave the inner state untouched
+                result = None if "blocked_until" in state else updater(stored)
+                state["results"].append(result)
+                return result
+
+            return update_inner
+
+        def record_violation(stored):
+            if "blocked_until" in state:
+                return None
+            state["decision"] = inner_finish(state["results"])
+            if state["decision"][0]:
+                return None
+            violations = min(state["violations"] + 1, self.max_violations)
+            state.update(
+                violations=violations,
+                blocked_until=current_time + self.penalty(violations),
+                violated=True,
+            )
+            return {
+                "violations": violations,
+                "blocked_until": state["blocked_until"],
+            }
+
+        def finish(results):
+            if "blocked_until" in state and not state.get("violated"):
+                blocked_until = state["blocked_until"]
+                return False, {
+                    "remaining": 0,
+                    "reset_time": blocked_until,
+                    "current_count": limit,
+                    "retry_after": max(1, math.ceil(blocked_until - current_time)),
+                    "violations": state["violations"],
+                    "blocked_until": blocked_until,
+                }
+
+            # Backends that gave up before running the updaters report None
+            allowed, metadata = state.get("decision") or inner_finish(results[1:-1])
+            metadata = {**metadata, "violations": state.get("violations", 0)}
+            if state.get("violated") and state["blocked_until"] > current_time:
+                blocked_until = state["blocked_until"]
+                metadata.update(
+                    reset_time=max(metadata.get("reset_time", 0), blocked_until),
+                    retry_after=max(
+                        metadata.get("retry_after", 1),
+                        math.ceil(blocked_until - current_time),
+                    ),
+                    blocked_until=blocked_until,
+                )
+            return allowed, metadata
+
+        return (
+            [(penalty_key, check_block, None)]
+            + [(key, gate(updater), key_ttl) for key, updater, key_ttl in inner_updates]
+            + [(penalty_key, record_violation, self.penalty_ttl)]
+        ), finish
+
+
 # Factory function to get rate limiter instances
 def get_rate_limiter(algorithm: str = "sliding_window", **kwargs) -> BaseRateLimiter:
     """
@@ -377,7 +3235,9 @@ def get_rate_limiter(algorithm: str = "sliding_window", **kwargs) -> BaseRateLim
 
     Args:
         algorithm: Type of algorithm ("sliding_window", "token_bucket",
-            "fixed_window", "sliding_counter")
+            "fixed_window", "sliding_counter", "sliding_approx", "gcra",
+            "leaky_bucket", "concurrency", "composite", "hierarchical",
+            "count_min", "calendar", "penalty")
         **kwargs: Additional arguments passed to the rate limiter constructor
 
     Returns:
@@ -388,6 +3248,15 @@ def get_rate_limiter(algorithm: str = "sliding_window", **kwargs) -> BaseRateLim
         "token_bucket": TokenBucketRateLimiter,
         "fixed_window": FixedWindowRateLimiter,
         "sliding_counter": SlidingWindowCounterRateLimiter,
+        "sliding_approx": ApproximateSlidingWindowRateLimiter,
+        "gcra": GCRARateLimiter,
+        "leaky_bucket": LeakyBucketRateLimiter,
+        "concurrency": ConcurrencyRateLimiter,
+        "composite": CompositeRateLimiter,
+        "hierarchical": HierarchicalRateLimiter,
+        "count_min": CountMinSketchRateLimiter,
+        "calendar": CalendarRateLimiter,
+        "penalty": PenaltyRateLimiter,
     }
 
     if algorithm not in algorithms:
@@ -5,16 +5,30 @@ Provides thread-safe, deadlock-safe storage implementations for
 in-memory, database, and Redis backends.
 """
 
+import array
+import atexit
+import copy
+import hashlib
 import json
+import math
+import os
+import sqlite3
 import threading
 import time
+import uuid
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 
-from django.db import transaction
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    DatabaseError,
+    IntegrityError,
+    connections,
+    transaction,
+)
 from django.utils import timezone
 
-from .exceptions import BackendError
+from .exceptions import BackendError, ConfigurationError
 
 try:
     import redis
@@ -24,8 +38,61 @@ except ImportError:
     REDIS_AVAILABLE = False
 
 
+def _as_count(value: Any) -> int:
+    """Read a counter stored either as a bare integer or as {"count": n}."""
+    if isinstance(value, dict):
+        return value.get("count", 0)
+    return int(value or 0)
+
+
+def _with_headroom(updater_func: Any, headroom: Callable[[Any], int]) -> Any:
+    """
+    Let ``TwoTierBackend`` absorb an updater while its state has headroom.
+
+    ``headroom`` receives the state the updater returned and must say, without
+    side effects, how many more unit requests that state admits.
+    """
+    updater_func.headroom = headroom
+    return updater_func
+
+
+def _lease_members(lease_id: str, quantity: int) -> List[str]:
+    """Return the slot names a lease of the given quantity occupies."""
+    if quantity == 1:
+        return [lease_id]
+    return [f"{lease_id}#{slot}" for slot in range(quantity)]
+
+
+def _gcra_step(
+    stored_tat: Any,
+    now: float,
+    emission_interval: float,
+    tolerance: float,
+    quantity: int = 1,
+) -> Tuple[bool, float]:
+    """
+    Compute one GCRA step from a stored theoretical arrival time.
+
+    Returns:
+        Tuple of (allowed, tat) where tat is the value to store when allowed,
+        or the unchanged arrival time when denied
+    """
+    tat = max(float(stored_tat) if stored_tat is not None else now, now)
+    new_tat = tat + emission_interval * quantity
+    if new_tat - now > tolerance:
+        return False, tat
+    return True, new_tat
+
+
 class BaseBackend(ABC):
-    """Abstract base class for rate limiting storage backends."""
+    """
+    Abstract base class for rate limiting storage backends.
+
+    Backends that update count-min sketch counters in place set
+    ``supports_sketch``; ``CountMinSketchRateLimiter`` rejects the others.
+    """
+
+    supports_sketch = False
 
     @abstractmethod
     def get(self, key: str) -> Optional[Dict[str, Any]]:
@@ -52,10 +119,294 @@ class BaseBackend(ABC):
         """Perform atomic update on a key's value."""
         pass
 
+    def take_contention(self) -> bool:
+        """
+        Report whether an update in this thread gave up on a contended lock.
+
+        The flag is reset by the call. Such an update returned None without
+        looking at the stored state, so the denial it caused says nothing
+        about the client. Backends that never give up always return False.
+        """
+        return False
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get data for several keys, omitting keys that have no data."""
+        result = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                result[key] = value
+        return result
+
+    def set_many(self, values: Dict[str, Dict[str, Any]], ttl: int) -> None:
+        """Set data for several keys with the same TTL."""
+        for key, value in values.items():
+            self.set(key, value, ttl)
+
+    @staticmethod
+    def _run_updates(
+        updates: List[Tuple[str, Any, Optional[int]]], current: Dict[str, Any]
+    ) -> Tuple[List[Any], Dict[str, Tuple[Any, Optional[int]]]]:
+        """
+        Run updaters in order over the current values.
+
+        An updater sees a copy of the value staged by an earlier updater of
+        the same key, so results already returned are not mutated. Returns
+        the updaters' results and the staged writes per key.
+        """
+        results = []
+        staged: Dict[str, Tuple[Any, Optional[int]]] = {}
+        for key, updater_func, ttl in updates:
+            if key in staged:
+                value = copy.deepcopy(staged[key][0])
+            else:
+                value = current.get(key)
+            new_data = updater_func(value)
+            results.append(new_data)
+            if new_data is not None:
+                staged[key] = (new_data, ttl)
+        return results, staged
+
+    def atomic_update_many(
+        self,
+        updates: List[Tuple[str, Any, Optional[int]]],
+        commit: Optional[Callable[[List[Any]], bool]] = None,
+    ) -> List[Any]:
+        """
+        Apply several ``(key, updater, ttl)`` updates in one interaction.
+
+        Updaters run in list order, as described in ``_run_updates``. Once
+        all of them ran, ``commit`` receives their results and nothing is
+        written unless it returns True. A backend that cannot lock several
+        keys at once gives up before running the updaters and returns None
+        for every update.
+
+        Backends implement this with a single transaction. There is no
+        generic fallback, since one built from ``get_many`` and ``set``
+        would let all-or-nothing batches and multi-key limiters overspend
+        under concurrency.
+
+        Returns:
+            The updaters' results, as ``atomic_update`` would return them
+
+        Raises:
+            BackendError: If the backend does not support atomic batches
+        """
+        raise BackendError(
+            f"{self.__class__.__name__} does not support atomic batch updates"
+        )
+
+    def gcra_update(
+        self,
+        key: str,
+        now: float,
+        emission_interval: float,
+        tolerance: float,
+        quantity: int = 1,
+    ) -> Tuple[bool, float]:
+        """
+        Run one GCRA step on the theoretical arrival time stored at key.
+
+        The state is a single number. Denied requests leave it untouched.
+
+        Returns:
+            Tuple of (allowed, tat) where tat is the arrival time after the
+            update, or the unchanged one when denied
+        """
+        outcome: List[Any] = [False, now]
+
+        def update_tat(stored_tat):
+            outcome[:] = _gcra_step(
+                stored_tat, now, emission_interval, tolerance, quantity
+            )
+            return outcome[1] if outcome[0] else None
+
+        new_tat = self.atomic_update(key, update_tat, int(math.ceil(tolerance)) + 1)
+        if new_tat is not None:
+            return True, float(new_tat)
+        return False, outcome[1]
+
+    def weighted_window_update(
+        self,
+        current_key: str,
+        previous_key: str,
+        previous_weight: float,
+        limit: int,
+        quantity: int = 1,
+        ttl: Optional[int] = None,
+    ) -> Tuple[bool, int, int]:
+        """
+        Run one two-window weighted sliding window step.
+
+        Each window is a bare integer counter. The previous window is closed,
+        so it is read without locking and only the current window's counter
+        is updated atomically. Denied requests write nothing.
+
+        Returns:
+            Tuple of (allowed, current_count, previous_count)
+        """
+        previous_count = _as_count(self.get(previous_key))
+        outcome: List[Any] = [False, 0]
+
+        def update_current(stored_count):
+            current_count = _as_count(stored_count)
+            estimate = previous_count * previous_weight + current_count
+            if estimate + quantity > limit:
+                outcome[:] = [False, current_count]
+                return None
+            outcome[:] = [True, current_count + quantity]
+            return current_count + quantity
+
+        new_count = self.atomic_update(current_key, update_current, ttl)
+        if new_count is not None:
+            return True, _as_count(new_count), previous_count
+        return False, outcome[1], previous_count
+
+    def chain_increment(
+        self,
+        keys: List[str],
+        limits: List[int],
+        quantity: int = 1,
+        ttls: Optional[List[int]] = None,
+    ) -> Tuple[bool, List[int]]:
+        """
+        Increment a chain of integer counters only if every one stays in limit.
+
+        All counters are checked and written in one ``atomic_update_many``
+        batch, so the chain is charged completely or not at all.
+
+        Returns:
+            Tuple of (allowed, counts) where counts include the increment when
+            allowed and are the current values otherwise
+        """
+        counts = [0] * len(keys)
+
+        def charge(index: int, limit: int) -> Callable[[Any], Any]:
+            def update_count(stored_count):
+                counts[index] = _as_count(stored_count)
+                if counts[index] + quantity > limit:
+                    return None
+                return counts[index] + quantity
+
+            return update_count
+
+        results = self.atomic_update_many(
+            [
+                (key, charge(index, limit), ttl)
+                for index, (key, limit, ttl) in enumerate(
+                    zip(keys, limits, ttls or [3600] * len(keys))
+                )
+            ],
+            commit=lambda results: None not in results,
+        )
+        if None in results:
+            return False, counts
+        return True, [_as_count(count) for count in results]
+
+    def sketch_update(
+        self,
+        key: str,
+        indexes: List[int],
+        size: int,
+        limit: int,
+        quantity: int = 1,
+        ttl: Optional[int] = None,
+    ) -> Tuple[bool, int]:
+        """
+        Run one conservative count-min sketch step on a fixed-size counter array.
+
+        The estimate is the smallest counter at ``indexes``. When the estimate
+        plus ``quantity`` stays within ``limit`` every counter at ``indexes``
+        is raised to at least that value; otherwise nothing is written. The
+        array holds ``size`` counters however many identifiers are counted.
+
+        Only backends that touch the counters at ``indexes`` in place
+        implement this. Emulating it with ``atomic_update`` would rewrite all
+        ``size`` counters as JSON under one lock on every request.
+
+        Returns:
+            Tuple of (allowed, estimate) where the estimate includes the
+            quantity when allowed
+        """
+        raise BackendError(
+            f"{self.__class__.__name__} does not support count-min sketches"
+        )
+
+    def sketch_estimate(self, key: str, indexes: List[int]) -> int:
+        """Return the smallest sketch counter at ``indexes`` without writing."""
+        raise BackendError(
+            f"{self.__class__.__name__} does not support count-min sketches"
+        )
+
+    def acquire_lease(
+        self,
+        key: str,
+        lease_id: str,
+        limit: int,
+        now: float,
+        ttl: int,
+        quantity: int = 1,
+    ) -> Tuple[bool, int]:
+        """
+        Acquire an in-flight lease that expires on its own after ttl seconds.
+
+        Leases are kept as ``{"leases": {lease_id: expiry}}`` and expired ones
+        are pruned on every acquire, so leases of crashed workers free their
+        slot once their TTL passes. A lease of quantity n takes n slots.
+
+        Returns:
+            Tuple of (acquired, in_flight) where in_flight counts live leases
+            including the new one when acquired
+        """
+        outcome: List[Any] = [False, 0]
+
+        def add_lease(current_data):
+            leases = {
+                held: expiry
+                for held, expiry in (current_data or {}).get("leases", {}).items()
+                if expiry > now
+            }
+            if len(leases) + quantity > limit:
+                outcome[:] = [False, len(leases)]
+                return None
+            for member in _lease_members(lease_id, quantity):
+                leases[member] = now + ttl
+            outcome[:] = [True, len(leases)]
+            return {"leases": leases}
+
+        self.atomic_update(key, add_lease, ttl)
+        return outcome[0], outcome[1]
+
+    def release_lease(
+        self, key: str, lease_id: str, ttl: Optional[int] = None, quantity: int = 1
+    ) -> None:
+        """Release an in-flight lease before it expires."""
+        members = _lease_members(lease_id, quantity)
+
+        def remove_lease(current_data):
+            held = (current_data or {}).get("leases", {})
+            if not any(member in held for member in members):
+                return None
+            leases = {
+                member: expiry
+                for member, expiry in held.items()
+                if member not in members
+            }
+            return {"leases": leases}
+
+        self.atomic_update(key, remove_lease, ttl)
+
+    def count_leases(self, key: str, now: float) -> int:
+        """Count the live in-flight leases at key without pruning them."""
+        leases = (self.get(key) or {}).get("leases", {})
+        return sum(1 for expiry in leases.values() if expiry > now)
+
 
 class MemoryBackend(BaseBackend):
     """Thread-safe in-memory storage backend."""
 
+    supports_sketch = True
+
     def __init__(self):
         self._data: Dict[str, Tuple[Dict[str, Any], Optional[float]]] = {}
         self._lock = threading.RLock()  # Use RLock to prevent deadlocks
@@ -78,14 +429,26 @@ class MemoryBackend(BaseBackend):
             if key in self._data:
                 value, expiry = self._data[key]
                 if not expiry or time.time() <= expiry:
-                    return value.copy()
+                    return value.copy() if isinstance(value, dict) else value
             return None
 
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get data for several keys with a single expiry sweep."""
+        with self._lock:
+            self._cleanup_expired()
+            result = {}
+            for key in keys:
+                if key in self._data:
+                    value = self._data[key][0]
+                    result[key] = value.copy() if isinstance(value, dict) else value
+            return result
+
     def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
         """Set data for a key with TTL."""
         with self._lock:
             expiry = time.time() + ttl if ttl else None
-            self._data[key] = (value.copy(), expiry)
+            stored = value.copy() if isinstance(value, dict) else value
+            self._data[key] = (stored, expiry)
 
     def increment(self, key: str, amount: int = 1, ttl: Optional[int] = None) -> int:
         """Atomically increment a counter."""
@@ -119,11 +482,83 @@ class MemoryBackend(BaseBackend):
                 self.set(key, new_data, ttl or 3600)
             return new_data
 
+    def atomic_update_many(
+        self,
+        updates: List[Tuple[str, Any, Optional[int]]],
+        commit: Optional[Callable[[List[Any]], bool]] = None,
+    ) -> List[Any]:
+        """Apply several updates atomically under the backend lock."""
+        with self._lock:
+            # Deep copies keep in-place updaters off the stored values
+            current = {key: copy.deepcopy(self.get(key)) for key, _, _ in updates}
+            results, staged = self._run_updates(updates, current)
+            if commit is None or commit(results):
+                for key, (value, ttl) in staged.items():
+                    self.set(key, value, ttl or 3600)
+            return results
+
+    def sketch_update(
+        self,
+        key: str,
+        indexes: List[int],
+        size: int,
+        limit: int,
+        quantity: int = 1,
+        ttl: Optional[int] = None,
+    ) -> Tuple[bool, int]:
+        """Run one sketch step in place on an unsigned 32-bit integer array."""
+        with self._lock:
+            counts: Any = self.get(key)
+            if not isinstance(counts, array.array):
+                counts = array.array("I", [0]) * size
+                self.set(key, counts, ttl or 3600)
+            estimate = min(counts[index] for index in indexes)
+            if estimate + quantity > limit:
+                return False, estimate
+            for index in indexes:
+                counts[index] = max(counts[index], estimate + quantity)
+            return True, estimate + quantity
+
+    def sketch_estimate(self, key: str, indexes: List[int]) -> int:
+        """Return the smallest counter at ``indexes`` of the in-place array."""
+        counts: Any = self.get(key)
+        if not isinstance(counts, array.array):
+            return 0
+        return min(counts[index] for index in indexes)
+
 
 class DatabaseBackend(BaseBackend):
-    """Database storage backend using Django ORM."""
+    """
+    Database storage backend using Django ORM.
 
-    def __init__(self):
+    Row locking is controlled by ``lock_policy``:
+
+    - ``"block"``: wait in ``SELECT ... FOR UPDATE`` (default)
+    - ``"nowait"``: fail fast with ``FOR UPDATE NOWAIT`` and deny
+    - ``"skip_locked"``: treat a row locked by another worker as limited
+    - ``"timeout"``: wait at most ``lock_timeout`` seconds for the row lock
+    - ``"advisory"``: take a non-blocking advisory lock on the key
+      (PostgreSQL)
+
+    Policies the database does not support fall back to ``"block"``. When a
+    lock is contended, ``atomic_update`` returns ``None`` without calling the
+    updater, which every algorithm treats as a denied request, and
+    ``contended_locks`` is incremented.
+    """
+
+    LOCK_POLICIES = ("block", "nowait", "skip_locked", "timeout", "advisory")
+
+    def __init__(self, lock_policy: str = "block", lock_timeout: float = 1.0):
+        if lock_policy not in self.LOCK_POLICIES:
+            raise ConfigurationError(
+                f"Unknown lock policy: {lock_policy}. "
+                f"Available: {list(self.LOCK_POLICIES)}"
+            )
+        self.lock_policy = lock_policy
+        self.lock_timeout = lock_timeout
+        self.contended_locks = 0
+        self._stats_lock = threading.Lock()
+        self._contention = threading.local()
         self._ensure_table_exists()
 
     def _ensure_table_exists(self):
@@ -131,6 +566,98 @@ class DatabaseBackend(BaseBackend):
         # This will be handled by migrations
         # Check if database storage config is set
 
+    def _record_contention(self) -> None:
+        with self._stats_lock:
+            self.contended_locks += 1
+        self._contention.flag = True
+
+    def take_contention(self) -> bool:
+        """Report and reset whether an update in this thread gave up."""
+        contended = getattr(self._contention, "flag", False)
+        self._contention.flag = False
+        return contended
+
+    @staticmethod
+    def _advisory_lock_id(key: str) -> int:
+        """Stable signed 64-bit lock id for a key."""
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, "big", signed=True)
+
+    def _try_advisory_lock(self, connection, key: str) -> Optional[bool]:
+        """
+        Try to take a transaction-scoped advisory lock for a key.
+
+        Returns None when the database has no transaction-scoped advisory
+        locks (only PostgreSQL does).
+        """
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_try_advisory_xact_lock(%s)", [self._advisory_lock_id(key)]
+            )
+            return bool(cursor.fetchone()[0])
+
+    def _select_with_timeout(self, connection, queryset):
+        """SELECT FOR UPDATE that waits at most lock_timeout seconds."""
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute(
+                    f"SET LOCAL lock_timeout = '{int(self.lock_timeout * 1000)}ms'"
+                )
+            elif connection.vendor == "mysql":
+                cursor.execute(
+                    "SET SESSION innodb_lock_wait_timeout = %s",
+                    [max(1, int(self.lock_timeout))],
+                )
+        try:
+            return queryset.select_for_update().first()
+        finally:
+            if connection.vendor == "mysql":
+                with connection.cursor() as cursor:
+                    cursor.execute("SET SESSION innodb_lock_wait_timeout = DEFAULT")
+
+    def _lock_entry(self, key: str) -> Tuple[Any, bool]:
+        """
+        Fetch the live entry for a key under the configured lock policy.
+
+        Must be called inside a transaction.
+
+        Returns:
+            Tuple of (entry or None, contended)
+        """
+        from .models import RateLimitEntry
+
+        connection = transaction.get_connection()
+        features = connection.features
+        queryset = RateLimitEntry.objects.filter(key=key, expires_at__gt=timezone.now())
+        policy = self.lock_policy
+
+        if policy == "advisory":
+            acquired = self._try_advisory_lock(connection, key)
+            if acquired is False:
+                return None, True
+            if acquired:
+                # The advisory lock already serializes writers of this key
+                return queryset.first(), False
+        elif policy == "skip_locked" and features.has_select_for_update_skip_locked:
+            entry = queryset.select_for_update(skip_locked=True).first()
+            if entry is None and queryset.exists():
+                return None, True
+            return entry, False
+        elif policy in ("nowait", "timeout") and features.has_select_for_update:
+            try:
+                # Savepoint keeps the outer transaction usable after a failure
+                with transaction.atomic():
+                    if policy == "timeout":
+                        return self._select_with_timeout(connection, queryset), False
+                    if features.has_select_for_update_nowait:
+                        return queryset.select_for_update(nowait=True).first(), False
+            except DatabaseError:
+                return None, True
+
+        return queryset.select_for_update().first(), False
+
     def get(self, key: str) -> Optional[Dict[str, Any]]:
         """Get data for a key."""
         try:
@@ -145,6 +672,23 @@ class DatabaseBackend(BaseBackend):
         except Exception as e:
             raise BackendError(f"Database get error: {e}")
 
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get data for several keys with non-locking batched SELECTs."""
+        try:
+            from .models import RateLimitEntry
+
+            result = {}
+            now = timezone.now()
+            # Stay below the bound parameter limits of the database
+            for start in range(0, len(keys), 500):
+                for entry in RateLimitEntry.objects.filter(
+                    key__in=keys[start : start + 500], expires_at__gt=now
+                ):
+                    result[entry.key] = json.loads(entry.data)
+            return result
+        except Exception as e:
+            raise BackendError(f"Database get error: {e}")
+
     def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
         """Set data for a key with TTL."""
         try:
@@ -170,11 +714,10 @@ class DatabaseBackend(BaseBackend):
 
             with transaction.atomic():
                 # Use SELECT FOR UPDATE to prevent race conditions
-                entry = (
-                    RateLimitEntry.objects.select_for_update()
-                    .filter(key=key, expires_at__gt=timezone.now())
-                    .first()
-                )
+                entry, contended = self._lock_entry(key)
+                if contended:
+                    self._record_contention()
+                    raise BackendError(f"Lock on {key} is contended")
 
                 if entry:
                     data = json.loads(entry.data)
@@ -211,11 +754,11 @@ class DatabaseBackend(BaseBackend):
             from .models import RateLimitEntry
 
             with transaction.atomic():
-                entry = (
-                    RateLimitEntry.objects.select_for_update()
-                    .filter(key=key, expires_at__gt=timezone.now())
-                    .first()
-                )
+                entry, contended = self._lock_entry(key)
+                if contended:
+                    # Deny instead of queueing behind a hot row
+                    self._record_contention()
+                    return None
 
                 current_data = None
                 if entry:
@@ -239,10 +782,956 @@ class DatabaseBackend(BaseBackend):
         except Exception as e:
             raise BackendError(f"Database atomic update error: {e}")
 
+    def gcra_update(
+        self,
+        key: str,
+        now: float,
+        emission_interval: float,
+        tolerance: float,
+        quantity: int = 1,
+    ) -> Tuple[bool, float]:
+        """Run one GCRA step under a row lock, writing at most one UPDATE."""
+        try:
+            from .models import RateLimitEntry
+
+            with transaction.atomic():
+                entry, contended = self._lock_entry(key)
+                if contended:
+                    self._record_contention()
+                    return False, now
+
+                tat = max(float(json.loads(entry.data)) if entry else now, now)
+                new_tat = tat + emission_interval * quantity
+                if new_tat - now > tolerance:
+                    # Denied requests do not write anything
+                    return False, tat
+
+                data = json.dumps(new_tat)
+                expires_at = timezone.now() + timezone.timedelta(
+                    seconds=new_tat - now + 1
+                )
+                if entry:
+                    RateLimitEntry.objects.filter(pk=entry.pk).update(
+                        data=data, expires_at=expires_at
+                    )
+                else:
+                    # An expired row may still hold the key
+                    RateLimitEntry.objects.update_or_create(
+                        key=key, defaults={"data": data, "expires_at": expires_at}
+                    )
+                return True, new_tat
+        except Exception as e:
+            raise BackendError(f"Database GCRA update error: {e}")
+
+    def atomic_update_many(
+        self,
+        updates: List[Tuple[str, Any, Optional[int]]],
+        commit: Optional[Callable[[List[Any]], bool]] = None,
+    ) -> List[Any]:
+        """
+        Apply several updates in one transaction.
+
+        Rows are locked in key order so concurrent batches cannot deadlock.
+        If any row lock is contended, nothing is updated and every result is
+        None.
+        """
+        try:
+            from .models import RateLimitEntry
+
+            keys = sorted({key for key, _, _ in updates})
+            with transaction.atomic():
+                if self.lock_policy == "block":
+                    # One locking SELECT for the whole batch
+                    entries = {
+                        entry.key: entry
+                        for entry in RateLimitEntry.objects.filter(
+                            key__in=keys, expires_at__gt=timezone.now()
+                        )
+                        .order_by("key")
+                        .select_for_update()
+                    }
+                else:
+                    entries = {}
+                    for key in keys:
+                        entry, contended = self._lock_entry(key)
+                        if contended:
+                            self._record_contention()
+                            return [None] * len(updates)
+                        if entry:
+                            entries[key] = entry
+
+                current = {
+                    key: json.loads(entry.data) for key, entry in entries.items()
+                }
+                results, staged = self._run_updates(updates, current)
+                if commit is None or commit(results):
+                    now = timezone.now()
+                    for key, (value, ttl) in staged.items():
+                        data = json.dumps(value)
+                        expires_at = now + timezone.timedelta(seconds=ttl or 3600)
+                        if key in entries:
+                            RateLimitEntry.objects.filter(pk=entries[key].pk).update(
+                                data=data, expires_at=expires_at
+                            )
+                        else:
+                            # An expired row may still hold the key
+                            RateLimitEntry.objects.update_or_create(
+                                key=key,
+                                defaults={"data": data, "expires_at": expires_at},
+                            )
+                return results
+        except Exception as e:
+            raise BackendError(f"Database atomic update error: {e}")
+
+
+class _BucketConflict(Exception):
+    """Raised internally when a concurrent writer changed a bucketed entry."""
+
+
+class BucketedDatabaseBackend(BaseBackend):
+    """
+    Database storage backend that writes entries into time-bucketed tables.
+
+    Every entry is stored in the table for the period that contains its
+    expiry time (hourly by default). Once a period has passed, every row in
+    its table is expired, so purging becomes a single ``DROP TABLE`` instead
+    of a row-by-row delete. Buckets are created on demand and dropped by
+    ``rotate_buckets`` (run from the ``cleanup_rate_limits`` command).
+
+    Entries may not outlive ``max_ttl`` seconds, which bounds the number of
+    bucket tables a lookup has to consult. Updates look in the buckets their
+    own TTL reaches first, so a key rewritten with a steady TTL is found in
+    one or two tables; the later buckets are only read when that misses.
+    Optimistic writes that keep conflicting give up with ``BackendError``
+    after ``max_retries`` attempts.
+    """
+
+    TABLE_PREFIX = "django_rate_limiter_bucket_"
+
+    _FLOAT_TYPES = {
+        "postgresql": "DOUBLE PRECISION",
+        "mysql": "DOUBLE",
+    }
+
+    def __init__(
+        self,
+        bucket_seconds: int = 3600,
+        max_ttl: int = 172800,
+        using: str = DEFAULT_DB_ALIAS,
+        max_retries: int = 10,
+    ):
+        if bucket_seconds <= 0:
+            raise ConfigurationError("bucket_seconds must be a positive integer")
+        if max_ttl <= 0:
+            raise ConfigurationError("max_ttl must be a positive integer")
+        if max_retries <= 0:
+            raise ConfigurationError("max_retries must be a positive integer")
+
+        self.bucket_seconds = bucket_seconds
+        self.max_ttl = max_ttl
+        self.using = using
+        self.max_retries = max_retries
+        self._known_tables: Set[str] = set()
+        # ((first, last) bucket ends, live tables) of the last lookup
+        self._live: Tuple[Tuple[int, int], List[str]] = ((0, 0), [])
+        self._lock = threading.Lock()
+
+    @property
+    def _connection(self):
+        return connections[self.using]
+
+    def _bucket_end(self, expires_at: float) -> int:
+        """End of the bucket period that contains expires_at."""
+        return (int(expires_at // self.bucket_seconds) + 1) * self.bucket_seconds
+
+    def _table_for(self, expires_at: float) -> str:
+        """Name of the bucket table holding entries that expire at expires_at."""
+        return f"{self.TABLE_PREFIX}{self._bucket_end(expires_at)}"
+
+    def _ensure_table(self, table: str) -> None:
+        """Create a bucket table if this process has not seen it yet."""
+        if table in self._known_tables:
+            return
+
+        connection = self._connection
+        qn = connection.ops.quote_name
+        float_type = self._FLOAT_TYPES.get(connection.vendor, "REAL")
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {qn(table)} ("
+                f"{qn('key')} VARCHAR(255) NOT NULL PRIMARY KEY, "
+                f"{qn('data')} TEXT NOT NULL, "
+                f"{qn('expires_at')} {float_type} NOT NULL)"
+            )
+        with self._lock:
+            self._known_tables.add(table)
+
+    def _live_tables(self, now: float) -> List[str]:
+        """Bucket tables that may contain entries which have not expired yet."""
+        # The last bucket moves within a period unless max_ttl is a multiple
+        # of bucket_seconds
+        bounds = (self._bucket_end(now), self._bucket_end(now + self.max_ttl))
+        cached_bounds, tables = self._live
+        if cached_bounds == bounds:
+            return tables
+
+        first, last = bounds
+        tables = []
+        for bucket_end in range(first, last + 1, self.bucket_seconds):
+            table = f"{self.TABLE_PREFIX}{bucket_end}"
+            self._ensure_table(table)
+            tables.append(table)
+        self._live = (bounds, tables)
+        return tables
+
+    def _check_ttl(self, ttl: int) -> None:
+        if ttl > self.max_ttl:
+            raise BackendError(
+                f"TTL of {ttl}s exceeds the bucketed backend's max_ttl "
+                f"of {self.max_ttl}s"
+            )
+
+    def _find(
+        self, cursor, key: str, now: float, ttl: Optional[int] = None
+    ) -> Optional[Tuple[str, str, float]]:
+        """
+        Return (table, data, expires_at) for the live entry of a key.
+
+        An entry last written with ``ttl`` expires no later than ``now +
+        ttl``, so those buckets are searched first and the rest only when
+        they hold nothing.
+        """
+        tables = self._live_tables(now)
+        if ttl is not None:
+            reach = (self._bucket_end(now + ttl) - self._bucket_end(now)) // (
+                self.bucket_seconds
+            ) + 1
+            found = self._select(cursor, key, tables[:reach], now)
+            if found or reach >= len(tables):
+                return found
+            tables = tables[reach:]
+        return self._select(cursor, key, tables, now)
+
+    def _select(
+        self, cursor, key: str, tables: List[str], now: float
+    ) -> Optional[Tuple[str, str, float]]:
+        """Look a key's live entry up in the given bucket tables."""
+        qn = self._connection.ops.quote_name
+        selects = []
+        params: List[Any] = []
+        for table in tables:
+            selects.append(
+                f"SELECT '{table}', {qn('data')}, {qn('expires_at')} "
+                f"FROM {qn(table)} "
+                f"WHERE {qn('key')} = %s AND {qn('expires_at')} > %s"
+            )
+            params.extend([key, now])
+        cursor.execute(" UNION ALL ".join(selects) + " ORDER BY 3 DESC", params)
+        row = cursor.fetchone()
+        return (row[0], row[1], row[2]) if row else None
+
+    def _write(
+        self,
+        cursor,
+        key: str,
+        found: Optional[Tuple[str, str, float]],
+        value: Any,
+        expires_at: float,
+        now: float,
+    ) -> None:
+        """Move a key's entry into the bucket for its new expiry time."""
+        qn = self._connection.ops.quote_name
+        if found:
+            table, data, old_expires_at = found
+            cursor.execute(
+                f"DELETE FROM {qn(table)} WHERE {qn('key')} = %s "
+                f"AND {qn('data')} = %s AND {qn('expires_at')} = %s",
+                [key, data, old_expires_at],
+            )
+            if cursor.rowcount == 0:
+                raise _BucketConflict()
+
+        target = self._table_for(expires_at)
+        # An expired row for the same key may still sit in the target bucket
+        cursor.execute(
+            f"DELETE FROM {qn(target)} WHERE {qn('key')} = %s "
+            f"AND {qn('expires_at')} <= %s",
+            [key, now],
+        )
+        cursor.execute(
+            f"INSERT INTO {qn(target)} ({qn('key')}, {qn('data')}, "
+            f"{qn('expires_at')}) VALUES (%s, %s, %s)",
+            [key, json.dumps(value), expires_at],
+        )
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get data for a key."""
+        try:
+            now = time.time()
+            with self._connection.cursor() as cursor:
+                found = self._find(cursor, key, now)
+            return json.loads(found[1]) if found else None
+        except Exception as e:
+            raise BackendError(f"Bucketed database get error: {e}")
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        """Set data for a key with TTL."""
+        self.atomic_update(key, lambda current_data: value, ttl)
+
+    def increment(self, key: str, amount: int = 1, ttl: Optional[int] = None) -> int:
+        """Atomically increment a counter."""
+
+        def add(current_data):
+            current_data = current_data or {"count": 0}
+            current_data["count"] = current_data.get("count", 0) + amount
+            return current_data
+
+        return self.atomic_update(key, add, ttl)["count"]
+
+    def delete(self, key: str) -> None:
+        """Delete a key."""
+        try:
+            qn = self._connection.ops.quote_name
+            tables = self._live_tables(time.time())
+            with transaction.atomic(using=self.using):
+                with self._connection.cursor() as cursor:
+                    for table in tables:
+                        cursor.execute(
+                            f"DELETE FROM {qn(table)} WHERE {qn('key')} = %s", [key]
+                        )
+        except Exception as e:
+            raise BackendError(f"Bucketed database delete error: {e}")
+
+    def atomic_update(self, key: str, updater_func, ttl: Optional[int] = None) -> Any:
+        """
+        Perform atomic update on a key's value.
+
+        Uses optimistic concurrency: the old row is deleted only if it is
+        unchanged, and the whole transaction is retried otherwise, up to
+        ``max_retries`` times.
+        """
+        ttl = ttl or 3600
+        self._check_ttl(ttl)
+        try:
+            for _ in range(self.max_retries):
+                now = time.time()
+                try:
+                    with transaction.atomic(using=self.using):
+                        with self._connection.cursor() as cursor:
+                            found = self._find(cursor, key, now, ttl)
+                            current_data = json.loads(found[1]) if found else None
+
+                            new_data = updater_func(current_data)
+
+                            if new_data is not None:
+                                self._write(
+                                    cursor, key, found, new_data, now + ttl, now
+                                )
+                            return new_data
+                except (_BucketConflict, IntegrityError):
+                    # Another writer got there first, retry with fresh data
+                    continue
+        except BackendError:
+            raise
+        except Exception as e:
+            raise BackendError(f"Bucketed database atomic update error: {e}")
+        raise BackendError(
+            f"Bucketed database atomic update of {key} conflicted "
+            f"{self.max_retries} times"
+        )
+
+    def atomic_update_many(
+        self,
+        updates: List[Tuple[str, Any, Optional[int]]],
+        commit: Optional[Callable[[List[Any]], bool]] = None,
+    ) -> List[Any]:
+        """
+        Apply several updates in one transaction.
+
+        Like ``atomic_update``, every old row is deleted only if it is
+        unchanged, and the whole batch is retried otherwise, up to
+        ``max_retries`` times.
+        """
+        ttls: Dict[str, int] = {}
+        for key, _, ttl in updates:
+            self._check_ttl(ttl or 3600)
+            ttls[key] = max(ttls.get(key, 0), ttl or 3600)
+        keys = sorted(ttls)
+        try:
+            for _ in range(self.max_retries):
+                now = time.time()
+                try:
+                    with transaction.atomic(using=self.using):
+                        with self._connection.cursor() as cursor:
+                            found = {
+                                key: self._find(cursor, key, now, ttls[key])
+                                for key in keys
+                            }
+                            current = {
+                                key: json.loads(row[1])
+                                for key, row in found.items()
+                                if row
+                            }
+
+                            results, staged = self._run_updates(updates, current)
+                            if commit is None or commit(results):
+                                for key, (value, ttl) in sorted(staged.items()):
+                                    self._write(
+                                        cursor,
+                                        key,
+                                        found[key],
+                                        value,
+                                        now + (ttl or 3600),
+                                        now,
+                                    )
+                            return results
+                except (_BucketConflict, IntegrityError):
+                    # Another writer got there first, retry with fresh data
+                    continue
+        except BackendError:
+            raise
+        except Exception as e:
+            raise BackendError(f"Bucketed database atomic update error: {e}")
+        raise BackendError(
+            f"Bucketed database batch update conflicted {self.max_retries} times"
+        )
+
+    @classmethod
+    def rotate_buckets(
+        cls,
+        using: str = DEFAULT_DB_ALIAS,
+        dry_run: bool = False,
+        now: Optional[float] = None,
+    ) -> List[str]:
+        """
+        Drop bucket tables whose period has fully passed.
+
+        Table names encode the end of their period, so rotation does not
+        depend on the bucket size the tables were created with.
+
+        Returns:
+            Names of the dropped (or, with dry_run, droppable) tables
+        """
+        now = time.time() if now is None else now
+        connection = connections[using]
+        qn = connection.ops.quote_name
+
+        expired = []
+        for table in connection.introspection.table_names():
+            if not table.startswith(cls.TABLE_PREFIX):
+                continue
+            suffix = table[len(cls.TABLE_PREFIX) :]
+            if suffix.isdigit() and int(suffix) <= now:
+                expired.append(table)
+
+        if not dry_run:
+            with connection.cursor() as cursor:
+                for table in expired:
+                    cursor.execute(f"DROP TABLE IF EXISTS {qn(table)}")
+        return sorted(expired)
+
+
+class SQLiteBackend(BaseBackend):
+    """
+    Shared single-host backend on a dedicated SQLite file.
+
+    All worker processes on a host point at the same file. The database runs
+    in WAL mode so readers never block the writer, updates run inside
+    ``BEGIN IMMEDIATE`` transactions, and every thread (and forked process)
+    keeps its own connection. Gives exact cross-process limits at local-disk
+    latency without Redis or the Django ORM.
+    """
+
+    _SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS rate_limit_entry ("
+        "key TEXT NOT NULL PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL"
+        ") WITHOUT ROWID"
+    )
+    _SELECT = "SELECT data FROM rate_limit_entry WHERE key = ? AND expires_at > ?"
+    _UPSERT = (
+        "INSERT INTO rate_limit_entry (key, data, expires_at) VALUES (?, ?, ?) "
+        "ON CONFLICT(key) DO UPDATE SET "
+        "data = excluded.data, expires_at = excluded.expires_at"
+    )
+    _DELETE = "DELETE FROM rate_limit_entry WHERE key = ?"
+    _PURGE = "DELETE FROM rate_limit_entry WHERE expires_at <= ?"
+
+    def __init__(self, path: str = "rate_limits.sqlite3", timeout: float = 5.0):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+        try:
+            self._connection()
+        except sqlite3.Error as e:
+            raise BackendError(f"SQLite connection error: {e}")
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return this thread's connection, opening one if needed."""
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            # Never share a connection with the parent of a forked worker
+            connection = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(self._SCHEMA)
+            self._local.connection = connection
+            self._local.pid = pid
+        return self._local.connection
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get data for a key."""
+        try:
+            row = (
+                self._connection().execute(self._SELECT, (key, time.time())).fetchone()
+            )
+            return json.loads(row[0]) if row else None
+        except sqlite3.Error as e:
+            raise BackendError(f"SQLite get error: {e}")
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        """Set data for a key with TTL."""
+        try:
+            self._connection().execute(
+                self._UPSERT, (key, json.dumps(value), time.time() + ttl)
+            )
+        except sqlite3.Error as e:
+            raise BackendError(f"SQLite set error: {e}")
+
+    def increment(self, key: str, amount: int = 1, ttl: Optional[int] = None) -> int:
+        """Atomically increment a counter."""
+
+        def add(current_data):
+            current_data = current_data or {"count": 0}
+            current_data["count"] = current_data.get("count", 0) + amount
+            return current_data
+
+        return self.atomic_update(key, add, ttl)["count"]
+
+    def delete(self, key: str) -> None:
+        """Delete a key."""
+        try:
+            self._connection().execute(self._DELETE, (key,))
+        except sqlite3.Error as e:
+            raise BackendError(f"SQLite delete error: {e}")
+
+    def atomic_update(self, key: str, updater_func, ttl: Optional[int] = None) -> Any:
+        """Perform atomic update on a key's value."""
+        try:
+            connection = self._connection()
+            # Take the write lock up front so concurrent updaters queue
+            # instead of failing on lock upgrade
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                row = connection.execute(self._SELECT, (key, now)).fetchone()
+                current_data = json.loads(row[0]) if row else None
+
+                new_data = updater_func(current_data)
+
+                if new_data is not None:
+                    connection.execute(
+                        self._UPSERT, (key, json.dumps(new_data), now + (ttl or 3600))
+                    )
+                connection.execute("COMMIT")
+                return new_data
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            raise BackendError(f"SQLite atomic update error: {e}")
+
+    def atomic_update_many(
+        self,
+        updates: List[Tuple[str, Any, Optional[int]]],
+        commit: Optional[Callable[[List[Any]], bool]] = None,
+    ) -> List[Any]:
+        """Apply several updates in one ``BEGIN IMMEDIATE`` transaction."""
+        try:
+            connection = self._connection()
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                now = time.time()
+                current = {}
+                for key in dict.fromkeys(key for key, _, _ in updates):
+                    row = connection.execute(self._SELECT, (key, now)).fetchone()
+                    if row:
+                        current[key] = json.loads(row[0])
+
+                results, staged = self._run_updates(updates, current)
+                if commit is None or commit(results):
+                    connection.executemany(
+                        self._UPSERT,
+                        [
+                            (key, json.dumps(value), now + (ttl or 3600))
+                            for key, (value, ttl) in staged.items()
+                        ],
+                    )
+                connection.execute("COMMIT")
+                return results
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+        except sqlite3.Error as e:
+            raise BackendError(f"SQLite atomic update error: {e}")
+
+    def cleanup_expired(self) -> int:
+        """Remove expired entries, returning how many were deleted."""
+        try:
+            cursor = self._connection().execute(self._PURGE, (time.time(),))
+            return cursor.rowcount
+        except sqlite3.Error as e:
+            raise BackendError(f"SQLite cleanup error: {e}")
+
+
+class CacheBackend(BaseBackend):
+    """
+    Storage backend running on a Django cache alias from ``CACHES``.
+
+    Reuses the project's configured (and pooled) Redis, memcached or locmem
+    connections instead of opening a second pool. Counters use
+    ``cache.add``/``cache.incr``, batch access uses ``get_many``/``set_many``,
+    and atomic updates use compare-and-swap when the underlying memcached
+    client supports it or an ``add``-based lock otherwise.
+
+    A lock that cannot be taken within ``lock_timeout`` seconds makes
+    ``atomic_update`` return ``None`` (treated as a denied request) and is
+    counted in ``contended_locks``.
+    """
+
+    def __init__(
+        self, alias: str = "default", lock_timeout: float = 1.0, lock_ttl: int = 5
+    ):
+        from django.core.cache import caches
+
+        try:
+            self.cache = caches[alias]
+        except Exception as e:
+            raise BackendError(f"Unknown cache alias {alias}: {e}")
+        self.lock_timeout = lock_timeout
+        self.lock_ttl = lock_ttl
+        self.contended_locks = 0
+        self._stats_lock = threading.Lock()
+        self._contention = threading.local()
+
+    @staticmethod
+    def _unwrap(value: Any) -> Any:
+        # Counters written by increment() are stored as bare integers
+        if isinstance(value, int) and not isinstance(value, bool):
+            return {"count": value}
+        return value
+
+    def _cas_client(self):
+        """Underlying memcached client when it supports gets/cas."""
+        client = getattr(self.cache, "_cache", None)
+        if hasattr(client, "gets") and hasattr(client, "cas"):
+            return client
+        return None
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get data for a key."""
+        try:
+            return self._unwrap(self.cache.get(key))
+        except Exception as e:
+            raise BackendError(f"Cache get error: {e}")
+
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get data for several keys in one cache round trip."""
+        try:
+            values = self.cache.get_many(keys)
+            return {key: self._unwrap(value) for key, value in values.items()}
+        except Exception as e:
+            raise BackendError(f"Cache get_many error: {e}")
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        """Set data for a key with TTL."""
+        try:
+            self.cache.set(key, value, ttl)
+        except Exception as e:
+            raise BackendError(f"Cache set error: {e}")
+
+    def set_many(self, values: Dict[str, Dict[str, Any]], ttl: int) -> None:
+        """Set data for several keys in one cache round trip."""
+        try:
+            self.cache.set_many(values, ttl)
+        except Exception as e:
+            raise BackendError(f"Cache set_many error: {e}")
+
+    def increment(self, key: str, amount: int = 1, ttl: Optional[int] = None) -> int:
+        """Atomically increment a counter."""
+        try:
+            if self.cache.add(key, amount, ttl or 3600):
+                return amount
+            return self.cache.incr(key, amount)
+        except Exception:
+            # The key expired between add and incr, or holds a dict
+            pass
+
+        def add(current_data):
+            current_data = current_data or {"count": 0}
+            current_data["count"] = current_data.get("count", 0) + amount
+            return current_data
+
+        result = self.atomic_update(key, add, ttl)
+        if result is None:
+            raise BackendError(f"Lock on {key} is contended")
+        return result["count"]
+
+    def delete(self, key: str) -> None:
+        """Delete a key."""
+        try:
+            self.cache.delete(key)
+        except Exception as e:
+            raise BackendError(f"Cache delete error: {e}")
+
+    def _record_contention(self) -> None:
+        with self._stats_lock:
+            self.contended_locks += 1
+        self._contention.flag = True
+
+    def take_contention(self) -> bool:
+        """Report and reset whether an update in this thread gave up."""
+        contended = getattr(self._contention, "flag", False)
+        self._contention.flag = False
+        return contended
+
+    def _acquire_lock(self, key: str) -> Optional[str]:
+        """Take the add-based lock on a key, returning its token or None."""
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.lock_timeout
+        delay = 0.001
+        while not self.cache.add(lock_key, token, self.lock_ttl):
+            if time.monotonic() >= deadline:
+                self._record_contention()
+                return None
+            time.sleep(delay)
+            delay = min(delay * 2, 0.05)
+        return token
+
+    def _release_lock(self, key: str, token: str) -> None:
+        lock_key = f"{key}:lock"
+        if self.cache.get(lock_key) == token:
+            self.cache.delete(lock_key)
+
+    def _cas_update(self, client, key: str, updater_func, ttl: int) -> Any:
+        """Compare-and-swap loop on a memcached client."""
+        cache_key = self.cache.make_key(key)
+        timeout = self.cache.get_backend_timeout(ttl)
+        deadline = time.monotonic() + self.lock_timeout
+        while True:
+            value, cas_token = client.gets(cache_key)
+            new_data = updater_func(self._unwrap(value))
+            if new_data is None:
+                return None
+            if self.cache.get(f"{key}:lock") is not None:
+                # A batch holds the key, wait for it to write
+                if time.monotonic() >= deadline:
+                    self._record_contention()
+                    return None
+                time.sleep(0.001)
+                continue
+            if cas_token is None:
+                if self.cache.add(key, new_data, ttl):
+                    return new_data
+            elif client.cas(cache_key, new_data, cas_token, timeout):
+                return new_data
+
+    def _locked_update(self, key: str, updater_func, ttl: int) -> Any:
+        """Update under an add-based lock."""
+        token = self._acquire_lock(key)
+        if token is None:
+            return None
+
+        try:
+            new_data = updater_func(self._unwrap(self.cache.get(key)))
+            if new_data is not None:
+                self.cache.set(key, new_data, ttl)
+            return new_data
+        finally:
+            self._release_lock(key, token)
+
+    def atomic_update(self, key: str, updater_func, ttl: Optional[int] = None) -> Any:
+        """Perform atomic update on a key's value."""
+        try:
+            client = self._cas_client()
+            if client is not None:
+                return self._cas_update(client, key, updater_func, ttl or 3600)
+            return self._locked_update(key, updater_func, ttl or 3600)
+        except Exception as e:
+            raise BackendError(f"Cache atomic update error: {e}")
+
+    def atomic_update_many(
+        self,
+        updates: List[Tuple[str, Any, Optional[int]]],
+        commit: Optional[Callable[[List[Any]], bool]] = None,
+    ) -> List[Any]:
+        """
+        Apply several updates under the add-based locks of all their keys.
+
+        Locks are taken in key order so concurrent batches cannot deadlock,
+        and compare-and-swap updates don't write a key while a batch holds
+        its lock. If any lock is contended, nothing is updated and every
+        result is None.
+        """
+        keys = sorted({key for key, _, _ in updates})
+        held: List[Tuple[str, str]] = []
+        try:
+            try:
+                for key in keys:
+                    token = self._acquire_lock(key)
+                    if token is None:
+                        return [None] * len(updates)
+                    held.append((key, token))
+
+                results, staged = self._run_updates(updates, self.get_many(keys))
+                if commit is None or commit(results):
+                    for key, (value, ttl) in staged.items():
+                        self.cache.set(key, value, ttl or 3600)
+                return results
+            finally:
+                for key, token in reversed(held):
+                    self._release_lock(key, token)
+        except BackendError:
+            raise
+        except Exception as e:
+            raise BackendError(f"Cache atomic update error: {e}")
+
 
 class RedisBackend(BaseBackend):
     """Redis storage backend."""
 
+    supports_sketch = True
+
+    # One GCRA step server side; the TAT is stored as a bare number
+    GCRA_SCRIPT = """
+local now = tonumber(ARGV[1])
+local interval = tonumber(ARGV[2])
+local tolerance = tonumber(ARGV[3])
+local quantity = tonumber(ARGV[4])
+local tat = tonumber(redis.call('GET', KEYS[1])) or now
+if tat < now then
+    tat = now
+end
+local new_tat = tat + interval * quantity
+if new_tat - now > tolerance then
+    return {0, string.format('%.6f', tat)}
+end
+local ttl_ms = math.ceil((new_tat - now) * 1000) + 1000
+redis.call('SET', KEYS[1], string.format('%.6f', new_tat), 'PX', ttl_ms)
+return {1, string.format('%.6f', new_tat)}
+"""
+
+    # In-flight leases in a sorted set scored by expiry
+    LEASE_SCRIPT = """
+local now = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now)
+local in_flight = redis.call('ZCARD', KEYS[1])
+local quantity = #ARGV - 3
+if in_flight + quantity > tonumber(ARGV[2]) then
+    return {0, in_flight}
+end
+local ttl = tonumber(ARGV[3])
+for i = 4, #ARGV do
+    redis.call('ZADD', KEYS[1], now + ttl, ARGV[i])
+end
+local newest = tonumber(redis.call('ZRANGE', KEYS[1], -1, -1, 'WITHSCORES')[2])
+redis.call('PEXPIREAT', KEYS[1], math.ceil(newest * 1000))
+return {1, in_flight + quantity}
+"""
+
+    # Counter stored as JSON with a "count" field, incremented in place
+    INCREMENT_SCRIPT = """
+local stored = redis.call('GET', KEYS[1])
+local data = {count = 0}
+if stored then
+    data = cjson.decode(stored)
+    if type(data) ~= 'table' then
+        data = {count = data}
+    end
+end
+data['count'] = (data['count'] or 0) + tonumber(ARGV[1])
+redis.call('SETEX', KEYS[1], ARGV[2], cjson.encode(data))
+return data['count']
+"""
+
+    # Two-window weighted sliding window: a GET and a conditional INCRBY
+    WEIGHTED_WINDOW_SCRIPT = """
+local previous = tonumber(redis.call('GET', KEYS[2])) or 0
+local current = tonumber(redis.call('GET', KEYS[1])) or 0
+local quantity = tonumber(ARGV[3])
+if previous * tonumber(ARGV[1]) + current + quantity > tonumber(ARGV[2]) then
+    return {0, current, previous}
+end
+current = redis.call('INCRBY', KEYS[1], quantity)
+if current == quantity then
+    redis.call('EXPIRE', KEYS[1], ARGV[4])
+end
+return {1, current, previous}
+"""
+
+    # A chain of integer counters charged all together or not at all
+    CHAIN_SCRIPT = """
+local quantity = tonumber(ARGV[1])
+local n = #KEYS
+local counts = {}
+local allowed = 1
+for i = 1, n do
+    counts[i] = tonumber(redis.call('GET', KEYS[i])) or 0
+    if counts[i] + quantity > tonumber(ARGV[1 + i]) then
+        allowed = 0
+    end
+end
+if allowed == 1 then
+    for i = 1, n do
+        counts[i] = redis.call('INCRBY', KEYS[i], quantity)
+        if counts[i] == quantity then
+            redis.call('EXPIRE', KEYS[i], ARGV[1 + n + i])
+        end
+    end
+end
+table.insert(counts, 1, allowed)
+return counts
+"""
+
+    # Conservative count-min sketch step on unsigned 32-bit BITFIELD counters
+    SKETCH_SCRIPT = """
+local quantity = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+local gets = {}
+for i = 4, #ARGV do
+    table.insert(gets, 'GET')
+    table.insert(gets, 'u32')
+    table.insert(gets, '#' .. ARGV[i])
+end
+local counts = redis.call('BITFIELD', KEYS[1], unpack(gets))
+local estimate = counts[1]
+for i = 2, #counts do
+    if counts[i] < estimate then
+        estimate = counts[i]
+    end
+end
+if estimate + quantity > limit then
+    return {0, estimate}
+end
+local target = estimate + quantity
+local sets = {'OVERFLOW', 'SAT'}
+for i = 1, #counts do
+    if counts[i] < target then
+        table.insert(sets, 'SET')
+        table.insert(sets, 'u32')
+        table.insert(sets, '#' .. ARGV[3 + i])
+        table.insert(sets, target)
+    end
+end
+redis.call('BITFIELD', KEYS[1], unpack(sets))
+if redis.call('TTL', KEYS[1]) < 0 then
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+return {1, target}
+"""
+
     def __init__(self, redis_client=None, **kwargs):
         if not REDIS_AVAILABLE:
             raise BackendError("Redis is not available. Install redis package.")
@@ -253,6 +1742,15 @@ class RedisBackend(BaseBackend):
             # Default Redis connection
             self.redis = redis.Redis(**kwargs)
 
+        self._increment_script = self.redis.register_script(self.INCREMENT_SCRIPT)
+        self._gcra_script = self.redis.register_script(self.GCRA_SCRIPT)
+        self._weighted_window_script = self.redis.register_script(
+            self.WEIGHTED_WINDOW_SCRIPT
+        )
+        self._lease_script = self.redis.register_script(self.LEASE_SCRIPT)
+        self._chain_script = self.redis.register_script(self.CHAIN_SCRIPT)
+        self._sketch_script = self.redis.register_script(self.SKETCH_SCRIPT)
+
     def get(self, key: str) -> Optional[Dict[str, Any]]:
         """Get data for a key."""
         try:
@@ -263,6 +1761,19 @@ class RedisBackend(BaseBackend):
         except Exception as e:
             raise BackendError(f"Redis get error: {e}")
 
+    def get_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get data for several keys with one MGET."""
+        if not keys:
+            return {}
+        # Cluster clients split reads across slots with mget_nonatomic
+        mget = getattr(self.redis, "mget_nonatomic", self.redis.mget)
+        try:
+            return {
+                key: json.loads(data) for key, data in zip(keys, mget(keys)) if data
+            }
+        except Exception as e:
+            raise BackendError(f"Redis get error: {e}")
+
     def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
         """Set data for a key with TTL."""
         try:
@@ -271,26 +1782,9 @@ class RedisBackend(BaseBackend):
             raise BackendError(f"Redis set error: {e}")
 
     def increment(self, key: str, amount: int = 1, ttl: Optional[int] = None) -> int:
-        """Atomically increment a counter."""
+        """Atomically increment a counter in one script call."""
         try:
-            # Use Redis pipeline for atomicity
-            pipe = self.redis.pipeline()
-            pipe.multi()
-
-            # Check if key exists
-            current = self.redis.get(key)
-            if current:
-                data = json.loads(current)
-                new_count = data.get("count", 0) + amount
-                data["count"] = new_count
-            else:
-                new_count = amount
-                data = {"count": new_count}
-
-            pipe.setex(key, ttl or 3600, json.dumps(data))
-            pipe.execute()
-
-            return new_count
+            return int(self._increment_script(keys=[key], args=[amount, ttl or 3600]))
         except Exception as e:
             raise BackendError(f"Redis increment error: {e}")
 
@@ -332,16 +1826,444 @@ class RedisBackend(BaseBackend):
         except Exception as e:
             raise BackendError(f"Redis atomic update error: {e}")
 
+    def atomic_update_many(
+        self,
+        updates: List[Tuple[str, Any, Optional[int]]],
+        commit: Optional[Callable[[List[Any]], bool]] = None,
+    ) -> List[Any]:
+        """Apply several updates with one WATCH/MGET and one MULTI/EXEC."""
+        keys = list(dict.fromkeys(key for key, _, _ in updates))
+        try:
+            with self.redis.pipeline() as pipe:
+                while True:
+                    try:
+                        pipe.watch(*keys)
+                        current = {
+                            key: json.loads(data)
+                            for key, data in zip(keys, pipe.mget(keys))
+                            if data
+                        }
+
+                        results, staged = self._run_updates(updates, current)
+                        if commit is None or commit(results):
+                            pipe.multi()
+                            for key, (value, ttl) in staged.items():
+                                pipe.setex(key, ttl or 3600, json.dumps(value))
+                            pipe.execute()
+                        else:
+                            pipe.unwatch()
+
+                        return results
+                    except redis.WatchError:
+                        # A key was modified, retry
+                        continue
+        except Exception as e:
+            raise BackendError(f"Redis atomic update error: {e}")
+
+    def gcra_update(
+        self,
+        key: str,
+        now: float,
+        emission_interval: float,
+        tolerance: float,
+        quantity: int = 1,
+    ) -> Tuple[bool, float]:
+        """Run one GCRA step in a single script call."""
+        try:
+            allowed, tat = self._gcra_script(
+                keys=[key], args=[now, emission_interval, tolerance, quantity]
+            )
+            return bool(int(allowed)), float(tat)
+        except Exception as e:
+            raise BackendError(f"Redis GCRA update error: {e}")
+
+    def weighted_window_update(
+        self,
+        current_key: str,
+        previous_key: str,
+        previous_weight: float,
+        limit: int,
+        quantity: int = 1,
+        ttl: Optional[int] = None,
+    ) -> Tuple[bool, int, int]:
+        """Run one weighted window step on two integer keys in one call."""
+        try:
+            allowed, current_count, previous_count = self._weighted_window_script(
+                keys=[current_key, previous_key],
+                args=[previous_weight, limit, quantity, ttl or 3600],
+            )
+            return bool(allowed), int(current_count), int(previous_count)
+        except Exception as e:
+            raise BackendError(f"Redis weighted window update error: {e}")
+
+    def chain_increment(
+        self,
+        keys: List[str],
+        limits: List[int],
+        quantity: int = 1,
+        ttls: Optional[List[int]] = None,
+    ) -> Tuple[bool, List[int]]:
+        """
+        Charge a chain of integer counters in one script call.
+
+        Redis Cluster requires the keys to share a hash slot, e.g. through a
+        common ``{hash tag}``.
+        """
+        try:
+            allowed, *counts = self._chain_script(
+                keys=keys,
+                args=[quantity, *limits, *(ttls or [3600] * len(keys))],
+            )
+            return bool(allowed), [int(count) for count in counts]
+        except Exception as e:
+            raise BackendError(f"Redis chain increment error: {e}")
+
+    def sketch_update(
+        self,
+        key: str,
+        indexes: List[int],
+        size: int,
+        limit: int,
+        quantity: int = 1,
+        ttl: Optional[int] = None,
+    ) -> Tuple[bool, int]:
+        """Run one sketch step on a BITFIELD string in a single script call."""
+        try:
+            allowed, estimate = self._sketch_script(
+                keys=[key], args=[quantity, limit, ttl or 3600, *indexes]
+            )
+            return bool(allowed), int(estimate)
+        except Exception as e:
+            raise BackendError(f"Redis sketch update error: {e}")
+
+    def sketch_estimate(self, key: str, indexes: List[int]) -> int:
+        """Read the sketch counters with one BITFIELD GET."""
+        try:
+            fields = self.redis.bitfield(key)
+            for index in indexes:
+                fields.get("u32", f"#{index}")
+            return min(int(count) for count in fields.execute())
+        except Exception as e:
+            raise BackendError(f"Redis sketch read error: {e}")
+
+    def acquire_lease(
+        self,
+        key: str,
+        lease_id: str,
+        limit: int,
+        now: float,
+        ttl: int,
+        quantity: int = 1,
+    ) -> Tuple[bool, int]:
+        """Acquire a lease in a sorted set scored by expiry, in one call."""
+        try:
+            acquired, in_flight = self._lease_script(
+                keys=[key],
+                args=[now, limit, ttl, *_lease_members(lease_id, quantity)],
+            )
+            return bool(acquired), int(in_flight)
+        except Exception as e:
+            raise BackendError(f"Redis lease acquire error: {e}")
+
+    def release_lease(
+        self, key: str, lease_id: str, ttl: Optional[int] = None, quantity: int = 1
+    ) -> None:
+        """Release a lease from the sorted set."""
+        try:
+            self.redis.zrem(key, *_lease_members(lease_id, quantity))
+        except Exception as e:
+            raise BackendError(f"Redis lease release error: {e}")
+
+    def count_leases(self, key: str, now: float) -> int:
+        """Count the live leases in the sorted set with ZCOUNT."""
+        try:
+            return int(self.redis.zcount(key, f"({now}", "+inf"))
+        except Exception as e:
+            raise BackendError(f"Redis lease count error: {e}")
+
+
+class _LocalEntry:
+    """Locally cached shared state plus updates not yet synced."""
+
+    __slots__ = ("state", "fetched_at", "ttl", "pending")
+
+    def __init__(self, state: Any, fetched_at: float, ttl: Optional[int]):
+        self.state = state
+        self.fetched_at = fetched_at
+        self.ttl = ttl
+        self.pending: List[Any] = []
+
+
+class TwoTierBackend(BaseBackend):
+    """
+    Composite backend with an in-process tier in front of a shared backend.
+
+    ``atomic_update`` is absorbed locally while the cached shared state is
+    younger than ``staleness`` seconds, the worker holds fewer than its
+    budget of ``min(slack, max_pending)`` unsynced updates for the key, and
+    the identifier has headroom: the local result, which already counts the
+    worker's own unsynced updates, must be allowed and still admit ``slack``
+    further unit requests. Cache misses, stale state, a spent budget and
+    identifiers near their limit go to the shared backend, which stays
+    authoritative. Other workers' unsynced updates are invisible, so a limit
+    is exceeded by at most the number of workers times the budget.
+
+    Absorbed updates are replayed against the shared backend by a background
+    thread every ``sync_interval`` seconds, as one atomic update per key, and
+    flushed at interpreter exit. Headroom is read from the ``headroom``
+    function the bundled algorithms attach to their updaters (see
+    ``_with_headroom``), so probing never runs an updater twice; any other
+    update always goes to the shared tier. Updates whose sync fails are kept
+    for the next one, and ``set``, ``increment`` and ``delete`` sync a key's
+    absorbed updates before writing it.
+    """
+
+    def __init__(
+        self,
+        shared: BaseBackend,
+        staleness: float = 1.0,
+        slack: int = 5,
+        max_pending: int = 100,
+        sync_interval: float = 0.5,
+    ):
+        self.shared = shared
+        self.staleness = staleness
+        self.slack = slack
+        self.max_pending = max_pending
+        self.sync_interval = sync_interval
+        self._entries: Dict[str, _LocalEntry] = {}
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._sync_thread: Optional[threading.Thread] = None
+
+    def _fresh_entry(self, key: str) -> Optional[_LocalEntry]:
+        """Local entry for a key if it is within the staleness budget."""
+        entry = self._entries.get(key)
+        if entry is not None and time.monotonic() - entry.fetched_at <= self.staleness:
+            return entry
+        return None
+
+    def _has_headroom(self, updater_func, state: Any) -> bool:
+        """Check that state is allowed and admits `slack` more unit requests."""
+        headroom = getattr(updater_func, "headroom", None)
+        if headroom is None or not isinstance(state, dict):
+            return False
+        return bool(state.get("allowed")) and headroom(state) >= self.slack
+
+    def _ensure_sync_thread(self) -> None:
+        if self._sync_thread is None:
+            atexit.register(self.close)
+        if self._sync_thread is None or not self._sync_thread.is_alive():
+            self._stop.clear()
+            self._sync_thread = threading.Thread(
+                target=self._sync_loop, name="rate-limit-two-tier-sync", daemon=True
+            )
+            self._sync_thread.start()
+
+    def _sync_loop(self) -> None:
+        while not self._stop.wait(self.sync_interval):
+            self.flush()
+
+    def _sync(self, key: str, updaters: List[Any], ttl: Optional[int]) -> Any:
+        """Apply updaters to the shared backend in one atomic update."""
+        last: List[Any] = [None]
+
+        def replay(current_data):
+            for updater_func in updaters:
+                new_data = updater_func(current_data)
+                last[0] = new_data
+                if new_data is not None:
+                    current_data = new_data
+            return current_data
+
+        state = self.shared.atomic_update(key, replay, ttl)
+        fetched_at = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            pending = entry.pending if entry else []
+            if state is None and not pending:
+                self._entries.pop(key, None)
+            else:
+                # Rebase updates absorbed while we were talking to the shared tier
+                local_state = copy.deepcopy(state)
+                for updater_func in pending:
+                    new_data = updater_func(local_state)
+                    if new_data is not None:
+                        local_state = new_data
+                new_entry = _LocalEntry(local_state, fetched_at, ttl)
+                new_entry.pending = pending
+                self._entries[key] = new_entry
+        return last[0]
+
+    def _take_pending(self, key: str) -> List[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return []
+            pending, entry.pending = entry.pending, []
+            return pending
+
+    def _restore_pending(self, key: str, pending: List[Any], ttl: Optional[int]):
+        """Put back updates whose sync failed, ahead of newer ones."""
+        if not pending:
+            return
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                # Stale, so the next update of the key syncs them
+                entry = _LocalEntry(None, float("-inf"), ttl)
+                self._entries[key] = entry
+            entry.pending[:0] = pending
+
+    def _sync_pending(self, key: str) -> None:
+        """Sync a key's absorbed updates, keeping them if the sync fails."""
+        with self._lock:
+            entry = self._entries.get(key)
+            ttl = entry.ttl if entry else None
+        pending = self._take_pending(key)
+        if not pending:
+            return
+        try:
+            self._sync(key, pending, ttl)
+        except BackendError:
+            self._restore_pending(key, pending, ttl)
+            raise
+
+    def flush(self) -> None:
+        """Sync every locally absorbed update to the shared backend."""
+        with self._lock:
+            keys = []
+            for key, entry in list(self._entries.items()):
+                if entry.pending:
+                    keys.append((key, entry.ttl))
+                elif self._fresh_entry(key) is None:
+                    del self._entries[key]
+
+        for key, ttl in keys:
+            try:
+                self._sync_pending(key)
+            except BackendError:
+                # The updates were kept for the next attempt
+                continue
+
+    def close(self) -> None:
+        """Stop the sync thread and flush pending updates."""
+        self._stop.set()
+        if self._sync_thread is not None and self._sync_thread is not (
+            threading.current_thread()
+        ):
+            self._sync_thread.join()
+        self.flush()
+
+    def take_contention(self) -> bool:
+        """Report and reset whether a shared update in this thread gave up."""
+        return self.shared.take_contention()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get data for a key, from the local tier while it is fresh."""
+        with self._lock:
+            entry = self._fresh_entry(key)
+            if entry is not None:
+                return copy.deepcopy(entry.state)
+        return self.shared.get(key)
+
+    def _drop_local(self, key: str) -> None:
+        """Forget a key's local state unless updates were absorbed meanwhile."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and not entry.pending:
+                del self._entries[key]
+            elif entry is not None:
+                # Keep them for the next sync, from fresh shared state
+                entry.fetched_at = float("-inf")
+
+    def set(self, key: str, value: Dict[str, Any], ttl: int) -> None:
+        """Set data for a key on the shared backend after absorbed updates."""
+        self._sync_pending(key)
+        try:
+            self.shared.set(key, value, ttl)
+        finally:
+            self._drop_local(key)
+
+    def increment(self, key: str, amount: int = 1, ttl: Optional[int] = None) -> int:
+        """Atomically increment a counter on the shared backend."""
+        self._sync_pending(key)
+        try:
+            return self.shared.increment(key, amount, ttl)
+        finally:
+            self._drop_local(key)
+
+    def delete(self, key: str) -> None:
+        """Delete a key on the shared backend after absorbed updates."""
+        self._sync_pending(key)
+        try:
+            self.shared.delete(key)
+        finally:
+            self._drop_local(key)
+
+    def atomic_update(self, key: str, updater_func, ttl: Optional[int] = None) -> Any:
+        """Perform atomic update, locally when the identifier has headroom."""
+        with self._lock:
+            entry = self._fresh_entry(key)
+            if (
+                entry is not None
+                and len(entry.pending) < min(self.slack, self.max_pending)
+                and hasattr(updater_func, "headroom")
+            ):
+                candidate = updater_func(copy.deepcopy(entry.state))
+                if self._has_headroom(updater_func, candidate):
+                    entry.state = candidate
+                    entry.pending.append(updater_func)
+                    entry.ttl = ttl
+                    self._ensure_sync_thread()
+                    return candidate
+
+        # Authoritative path: replay pending updates and this one together
+        pending = self._take_pending(key)
+        try:
+            return self._sync(key, pending + [updater_func], ttl)
+        except BackendError:
+            self._restore_pending(key, pending, ttl)
+            raise
+
+    def atomic_update_many(
+        self,
+        updates: List[Tuple[str, Any, Optional[int]]],
+        commit: Optional[Callable[[List[Any]], bool]] = None,
+    ) -> List[Any]:
+        """
+        Apply several updates atomically on the shared backend.
+
+        Updates absorbed locally for the batch's keys are synced first, so
+        the batch sees them, and the local state of those keys is dropped
+        afterwards so later updates start from the shared tier.
+        """
+        keys = list(dict.fromkeys(key for key, _, _ in updates))
+        for key in keys:
+            self._sync_pending(key)
+
+        try:
+            return self.shared.atomic_update_many(updates, commit)
+        finally:
+            for key in keys:
+                self._drop_local(key)
+
 
 # Global backend instances
 _memory_backend = None
 _database_backend = None
+_bucketed_database_backend = None
+_sqlite_backend = None
+_cache_backends: Dict[str, CacheBackend] = {}
 _redis_backend = None
+_two_tier_backend = None
 
 
 def get_backend(backend_type: str = "memory", **kwargs) -> BaseBackend:
     """Get a backend instance."""
-    global _memory_backend, _database_backend, _redis_backend
+    global _memory_backend, _database_backend, _bucketed_database_backend
+    global _sqlite_backend, _redis_backend, _two_tier_backend
 
     if backend_type == "memory":
         if _memory_backend is None:
@@ -349,11 +2271,31 @@ def get_backend(backend_type: str = "memory", **kwargs) -> BaseBackend:
         return _memory_backend
     elif backend_type == "database":
         if _database_backend is None:
-            _database_backend = DatabaseBackend()
+            _database_backend = DatabaseBackend(**kwargs)
         return _database_backend
+    elif backend_type == "bucketed_database":
+        if _bucketed_database_backend is None:
+            _bucketed_database_backend = BucketedDatabaseBackend(**kwargs)
+        return _bucketed_database_backend
+    elif backend_type == "sqlite":
+        if _sqlite_backend is None:
+            _sqlite_backend = SQLiteBackend(**kwargs)
+        return _sqlite_backend
+    elif backend_type == "cache":
+        alias = kwargs.get("alias", "default")
+        if alias not in _cache_backends:
+            _cache_backends[alias] = CacheBackend(**kwargs)
+        return _cache_backends[alias]
     elif backend_type == "redis":
         if _redis_backend is None:
             _redis_backend = RedisBackend(**kwargs)
         return _redis_backend
+    elif backend_type == "two_tier":
+        if _two_tier_backend is None:
+            shared = get_backend(
+                kwargs.pop("shared", "redis"), **kwargs.pop("shared_kwargs", {})
+            )
+            _two_tier_backend = TwoTierBackend(shared, **kwargs)
+        return _two_tier_backend
     else:
         raise BackendError(f"Unknown backend type: {backend_type}")
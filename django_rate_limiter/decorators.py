@@ -2,14 +2,21 @@
 Decorators for rate limiting Django views and functions.
 """
 
+import asyncio
 import functools
-from typing import Any, Callable, Dict, Optional
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, Union
 
 from django.http import HttpRequest, HttpResponse, JsonResponse
+from django.utils.module_loading import import_string
 
-from .algorithms import get_rate_limiter
+from asgiref.sync import sync_to_async
+
+from .algorithms import BaseRateLimiter, DenyCache, get_rate_limiter
 from .backends import get_backend
 from .exceptions import RateLimitExceeded
+from .utils import parse_rate_string
 
 
 def get_client_ip(request: HttpRequest) -> str:
@@ -36,6 +43,67 @@ def get_user_identifier(request: HttpRequest, use_user: bool = True) -> str:
         return f"ip:{get_client_ip(request)}"
 
 
+def get_request_cost(cost: Any, request: HttpRequest) -> int:
+    """
+    Resolve the cost of a request.
+
+    Args:
+        cost: An integer, a function taking the request, or a dotted import
+            path to such a function
+        request: The request being rate limited
+
+    Returns:
+        Units of the limit the request consumes; the limiter rejects costs
+        below 1
+    """
+    if isinstance(cost, str):
+        cost = import_string(cost)
+    if callable(cost):
+        cost = cost(request)
+    return int(cost)
+
+
+# Rate limiters shared by decorated views, keyed by their configuration
+_rate_limiters: Dict[str, BaseRateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def _get_rate_limiter(
+    algorithm: str,
+    backend: str,
+    backend_kwargs: Dict[str, Any],
+    limiter_kwargs: Dict[str, Any],
+    deny_cache_size: int,
+) -> BaseRateLimiter:
+    """
+    Return the rate limiter for a decorator configuration.
+
+    Limiters are created once and reused across requests, so in-process
+    state such as the deny cache and leased tokens outlives a request.
+    """
+    config = repr(
+        (
+            algorithm,
+            backend,
+            sorted(backend_kwargs.items()),
+            sorted(limiter_kwargs.items()),
+            deny_cache_size,
+        )
+    )
+    with _rate_limiters_lock:
+        rate_limiter = _rate_limiters.get(config)
+        if rate_limiter is None:
+            rate_limiter = get_rate_limiter(
+                algorithm=algorithm,
+                backend=get_backend(backend, **dict(backend_kwargs)),
+                **limiter_kwargs,
+            )
+            if deny_cache_size:
+                rate_limiter.deny_cache = DenyCache(deny_cache_size)
+            _rate_limiters[config] = rate_limiter
+    return rate_limiter
+
+
 def rate_limit(
     limit: int,
     window: int,
@@ -46,6 +114,8 @@ def rate_limit(
     error_response: Optional[Callable[[RateLimitExceeded], HttpResponse]] = None,
     use_user: bool = True,
     backend_kwargs: Optional[Dict[str, Any]] = None,
+    cost: Union[int, Callable[[HttpRequest], int]] = 1,
+    deny_cache_size: int = 0,
     **limiter_kwargs,
 ):
     """
@@ -55,15 +125,27 @@ def rate_limit(
         limit: Maximum number of requests allowed
         window: Time window in seconds
         algorithm: Rate limiting algorithm ("sliding_window", "token_bucket",
-            "fixed_window", "sliding_counter")
+            "fixed_window", "sliding_counter", "sliding_approx", "gcra",
+            "leaky_bucket", "concurrency", "composite", "hierarchical",
+            "count_min", "calendar", "penalty")
         backend: Storage backend ("memory", "database", "redis")
         scope: Optional scope for grouping (defaults to view name)
         key_func: Optional function to generate custom keys
         error_response: Optional function to generate custom error responses
         use_user: Whether to use authenticated user ID instead of IP
         backend_kwargs: Additional arguments for backend initialization
+        cost: Units of the limit each request consumes, or a function that
+            takes the request and returns them
+        deny_cache_size: Remember up to this many recently denied clients
+            in process and reject them without a backend call until their
+            retry_after passes (0, the default, disables the deny cache)
         **limiter_kwargs: Additional arguments for rate limiter
 
+    Requests that a shaping algorithm ("leaky_bucket") admits with a ``delay``
+    wait it out before the view runs, using ``asyncio.sleep`` for async views.
+    With "concurrency", ``limit`` counts simultaneous requests and ``window``
+    is the lease TTL; the lease is released when the view returns or raises.
+
     Example:
         @rate_limit(limit=100, window=3600, algorithm="sliding_window")
         def my_view(request):
@@ -72,18 +154,25 @@ def rate_limit(
         @rate_limit(limit=10, window=60, scope="api", backend="redis")
         def api_endpoint(request):
             return JsonResponse({"data": "some data"})
+
+        @rate_limit(limit=1000, window=3600, cost=lambda request: 50)
+        def bulk_export_view(request):
+            return JsonResponse({"data": "export"})
+
+        @rate_limit(limit=20, window=1, algorithm="leaky_bucket", max_delay=2)
+        async def internal_endpoint(request):
+            return JsonResponse({"data": "paced"})
     """
 
     def decorator(func: Callable) -> Callable:
-        @functools.wraps(func)
-        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
-            # Get backend instance
-            backend_kwargs_final = backend_kwargs or {}
-            backend_instance = get_backend(backend, **backend_kwargs_final)
-
-            # Get rate limiter instance
-            rate_limiter = get_rate_limiter(
-                algorithm=algorithm, backend=backend_instance, **limiter_kwargs
+        def check(request: HttpRequest) -> Tuple[Dict[str, Any], Callable[[], None]]:
+            # Get the shared rate limiter instance
+            rate_limiter = _get_rate_limiter(
+                algorithm,
+                backend,
+                backend_kwargs or {},
+                limiter_kwargs,
+                deny_cache_size,
             )
 
             # Generate identifier
@@ -95,56 +184,87 @@ def rate_limit(
             # Generate scope
             scope_final = scope or f"{func.__module__}.{func.__name__}"
 
-            try:
-                # Check rate limit
-                metadata = rate_limiter.enforce(identifier, limit, window, scope_final)
-
-                # Add rate limit headers to response
-                response = func(request, *args, **kwargs)
-
-                # Add rate limiting headers
-                if hasattr(
-                    response, "__setitem__"
-                ):  # Check if response supports headers
-                    response["X-RateLimit-Limit"] = str(limit)
-                    response["X-RateLimit-Remaining"] = str(
-                        metadata.get("remaining", 0)
-                    )
-                    response["X-RateLimit-Reset"] = str(
-                        int(metadata.get("reset_time", 0))
-                    )
-
-                return response
+            # Check rate limit
+            metadata = rate_limiter.enforce(
+                identifier,
+                limit,
+                window,
+                scope_final,
+                cost=get_request_cost(cost, request),
+            )
 
-            except RateLimitExceeded as e:
-                if error_response:
-                    return error_response(e)
-                else:
-                    # Default error response
-                    response_data = {
-                        "error": "Rate limit exceeded",
-                        "message": str(e),
-                        "limit": limit,
-                        "window": window,
-                    }
+            # Concurrency limiters hold a lease until the view has finished
+            release = functools.partial(
+                rate_limiter.release,
+                identifier,
+                metadata.get("lease_id"),
+                window=window,
+                scope=scope_final,
+            )
+            return metadata, release
+
+        decorator_kwargs = {"error_response": error_response}
+
+        if asyncio.iscoroutinefunction(func):
 
-                    if e.retry_after:
-                        response_data["retry_after"] = e.retry_after
+            @functools.wraps(func)
+            async def async_wrapper(
+                request: HttpRequest, *args, **kwargs
+            ) -> HttpResponse:
+                try:
+                    metadata, release = await sync_to_async(check)(request)
 
-                    response = JsonResponse(response_data, status=429)
-                    response["X-RateLimit-Limit"] = str(limit)
-                    response["X-RateLimit-Remaining"] = "0"
+                    try:
+                        # Shaping algorithms schedule the request instead of denying
+                        delay = metadata.get("delay")
+                        if delay:
+                            await asyncio.sleep(delay)
 
-                    if e.retry_after:
-                        response["Retry-After"] = str(e.retry_after)
+                        response = await func(request, *args, **kwargs)
+                    finally:
+                        await sync_to_async(release)()
 
-                    return response
+                    return _add_rate_limit_headers(response, metadata, limit)
+
+                except RateLimitExceeded as e:
+                    return _create_error_response(e, limit, window, decorator_kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(request: HttpRequest, *args, **kwargs) -> HttpResponse:
+            try:
+                metadata, release = check(request)
+
+                try:
+                    # Shaping algorithms schedule the request instead of denying
+                    delay = metadata.get("delay")
+                    if delay:
+                        time.sleep(delay)
+
+                    response = func(request, *args, **kwargs)
+                finally:
+                    release()
+
+                return _add_rate_limit_headers(response, metadata, limit)
+
+            except RateLimitExceeded as e:
+                return _create_error_response(e, limit, window, decorator_kwargs)
 
         return wrapper
 
     return decorator
 
 
+def _add_rate_limit_headers(response, metadata, limit):
+    """Add rate limiting headers to a response that supports them."""
+    if hasattr(response, "__setitem__"):  # Check if response supports headers
+        response["X-RateLimit-Limit"] = str(limit)
+        response["X-RateLimit-Remaining"] = str(metadata.get("remaining", 0))
+        response["X-RateLimit-Reset"] = str(int(metadata.get("reset_time", 0)))
+    return response
+
+
 def rate_limit_class(
     limit: int, window: int, methods: Optional[list] = None, **decorator_kwargs
 ):
@@ -223,13 +343,7 @@ def _handle_rate_limiting(
     decorator_kwargs,
 ):
     """Handle the rate limiting logic for class methods."""
-    # Get backend instance
-    backend_kwargs_final = decorator_kwargs.get("backend_kwargs", {})
-    backend_instance = get_backend(
-        decorator_kwargs.get("backend", "memory"), **backend_kwargs_final
-    )
-
-    # Get rate limiter instance
+    # Get the shared rate limiter instance
     limiter_kwargs = {
         k: v
         for k, v in decorator_kwargs.items()
@@ -241,12 +355,17 @@ def _handle_rate_limiting(
             "key_func",
             "error_response",
             "use_user",
+            "cost",
+            "algorithm",
+            "deny_cache_size",
         ]
     }
-    rate_limiter = get_rate_limiter(
-        algorithm=decorator_kwargs.get("algorithm", "sliding_window"),
-        backend=backend_instance,
-        **limiter_kwargs,
+    rate_limiter = _get_rate_limiter(
+        decorator_kwargs.get("algorithm", "sliding_window"),
+        decorator_kwargs.get("backend", "memory"),
+        decorator_kwargs.get("backend_kwargs") or {},
+        limiter_kwargs,
+        decorator_kwargs.get("deny_cache_size", 0),
     )
 
     # Generate identifier
@@ -262,18 +381,29 @@ def _handle_rate_limiting(
 
     try:
         # Check rate limit
-        metadata = rate_limiter.enforce(identifier, limit, window, scope)
-
-        # Call original method
-        response = original_method(self, request, *args, **kwargs)
+        metadata = rate_limiter.enforce(
+            identifier,
+            limit,
+            window,
+            scope,
+            cost=get_request_cost(decorator_kwargs.get("cost", 1), request),
+        )
 
-        # Add rate limiting headers
-        if hasattr(response, "__setitem__"):
-            response["X-RateLimit-Limit"] = str(limit)
-            response["X-RateLimit-Remaining"] = str(metadata.get("remaining", 0))
-            response["X-RateLimit-Reset"] = str(int(metadata.get("reset_time", 0)))
+        try:
+            # Shaping algorithms schedule the request instead of denying
+            delay = metadata.get("delay")
+            if delay:
+                time.sleep(delay)
+
+            # Call original method
+            response = original_method(self, request, *args, **kwargs)
+        finally:
+            # Concurrency limiters hold a lease until the method has finished
+            rate_limiter.release(
+                identifier, metadata.get("lease_id"), window=window, scope=scope
+            )
 
-        return response
+        return _add_rate_limit_headers(response, metadata, limit)
 
     except RateLimitExceeded as e:
         return _create_error_response(e, limit, window, decorator_kwargs)
@@ -312,7 +442,8 @@ def throttle(rate: str, algorithm: str = "token_bucket", **decorator_kwargs):
 
     Args:
         rate: Rate string in format "limit/period"
-            (e.g., "100/hour", "10/minute", "1/second")
+            (e.g., "100/hour", "10/minute", "1/second"); see
+            ``utils.parse_rate_string``
         algorithm: Rate limiting algorithm
         **decorator_kwargs: Additional arguments passed to rate_limit decorator
 
@@ -325,27 +456,7 @@ def throttle(rate: str, algorithm: str = "token_bucket", **decorator_kwargs):
         def api_endpoint(request):
             return JsonResponse({"data": "some data"})
     """
-    # Parse rate string
-    try:
-        limit_str, period_str = rate.split("/")
-        limit = int(limit_str)
-
-        period_multipliers = {
-            "second": 1,
-            "minute": 60,
-            "hour": 3600,
-            "day": 86400,
-        }
-
-        if period_str not in period_multipliers:
-            raise ValueError(f"Invalid period: {period_str}")
-
-        window = period_multipliers[period_str]
-
-    except (ValueError, TypeError) as e:
-        raise ValueError(
-            f"Invalid rate format: {rate}. Use 'limit/period' format."
-        ) from e
+    limit, window = parse_rate_string(rate)
 
     return rate_limit(
         limit=limit, window=window, algorithm=algorithm, **decorator_kwargs
@@ -3,8 +3,10 @@ Django management commands for rate limiter maintenance.
 """
 
 from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
 from django.utils import timezone
 
+from django_rate_limiter.backends import BucketedDatabaseBackend
 from django_rate_limiter.models import RateLimitEntry
 
 
@@ -19,6 +21,11 @@ class Command(BaseCommand):
             action="store_true",
             help="Show what would be deleted without actually deleting",
         )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias holding time-bucketed rate limit tables",
+        )
 
     def handle(self, *args, **options):
         dry_run = options["dry_run"]
@@ -45,3 +52,15 @@ class Command(BaseCommand):
                     f"Successfully deleted {deleted_count} expired rate limit entries"
                 )
             )
+
+        # Rotate time-bucketed tables: each expired bucket is a single DROP
+        dropped = BucketedDatabaseBackend.rotate_buckets(
+            using=options["database"], dry_run=dry_run
+        )
+        if dropped:
+            verb = "Would drop" if dry_run else "Dropped"
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{verb} {len(dropped)} expired rate limit bucket tables"
+                )
+            )
@@ -2,17 +2,141 @@
 Django middleware for automatic rate limiting.
 """
 
+import asyncio
+import functools
+import logging
 import re
+import threading
+import time
 from typing import Any, Dict, Optional
 
 from django.conf import settings
 from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.module_loading import import_string
 
-from .algorithms import get_rate_limiter
-from .backends import get_backend
-from .decorators import get_client_ip, get_user_identifier
-from .exceptions import RateLimitExceeded
+from asgiref.sync import sync_to_async
+
+from .algorithms import DenyCache, get_rate_limiter
+from .backends import BaseBackend, get_backend
+from .decorators import get_client_ip, get_request_cost, get_user_identifier
+from .exceptions import BackendError, RateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveLimit:
+    """
+    AIMD controller adjusting a rule's limit from observed view latency.
+
+    Workers record the latency and outcome of every admitted request and
+    fold them into one shared entry on the backend every ``interval``
+    seconds. Once per interval, across all workers, the shared limit is cut
+    to ``decrease`` times its value when the mean latency exceeds
+    ``target_latency`` or the error (5xx) rate exceeds ``max_error_rate``,
+    and raised by ``increase`` otherwise, always within
+    ``min_limit``..``max_limit``. Intervals with fewer than ``min_samples``
+    requests leave the limit unchanged. The first sync creates the shared
+    entry, so the first adjustment happens one interval later. Each sync also
+    refreshes the worker's copy of the shared limit. A sync the backend
+    fails is logged and its samples are kept for the next one, so the
+    response being recorded is still served.
+    """
+
+    def __init__(
+        self,
+        backend: BaseBackend,
+        scope: str,
+        limit: int,
+        min_limit: int,
+        max_limit: int,
+        target_latency: float = 1.0,
+        max_error_rate: float = 0.05,
+        increase: Optional[int] = None,
+        decrease: float = 0.7,
+        interval: float = 10.0,
+        min_samples: int = 20,
+        key_prefix: str = "rate_limit",
+    ):
+        self.backend = backend
+        self.key = f"{key_prefix}:adaptive:{scope}"
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.target_latency = target_latency
+        self.max_error_rate = max_error_rate
+        self.increase = increase or max(1, (max_limit - min_limit) // 20)
+        self.decrease = decrease
+        self.interval = interval
+        self.min_samples = min_samples
+        self.limit = self._clamp(limit)
+        self._requests = 0
+        self._latency = 0.0
+        self._errors = 0
+        self._next_sync = time.time() + interval
+        self._lock = threading.Lock()
+
+    def _clamp(self, limit: int) -> int:
+        return max(self.min_limit, min(self.max_limit, int(limit)))
+
+    def record(self, latency: float, error: bool) -> None:
+        """Record one admitted request, syncing with the backend when due."""
+        now = time.time()
+        with self._lock:
+            self._requests += 1
+            self._latency += latency
+            self._errors += int(error)
+            due = now >= self._next_sync
+        if due:
+            self.sync(now)
+
+    def sync(self, now: Optional[float] = None) -> int:
+        """Fold local samples into the shared entry and refresh the limit."""
+        now = time.time() if now is None else now
+        with self._lock:
+            requests, latency, errors = self._requests, self._latency, self._errors
+            self._requests, self._latency, self._errors = 0, 0.0, 0
+            self._next_sync = now + self.interval
+
+        def update_limit(current_data):
+            state = current_data or {
+                "limit": self.limit,
+                "updated_at": now,
+                "requests": 0,
+                "latency": 0.0,
+                "errors": 0,
+            }
+            state["requests"] += requests
+            state["latency"] += latency
+            state["errors"] += errors
+
+            if now - state["updated_at"] >= self.interval:
+                if state["requests"] >= self.min_samples:
+                    state["limit"] = self._adjust(state)
+                state.update(updated_at=now, requests=0, latency=0.0, errors=0)
+            return state
+
+        try:
+            state = self.backend.atomic_update(
+                self.key, update_limit, max(3600, int(self.interval * 10))
+            )
+        except BackendError as e:
+            logger.warning("Adaptive limit sync of %s failed: %s", self.key, e)
+            with self._lock:
+                self._requests += requests
+                self._latency += latency
+                self._errors += errors
+            return self.limit
+        if state:
+            self.limit = self._clamp(state["limit"])
+        return self.limit
+
+    def _adjust(self, state: Dict[str, Any]) -> int:
+        """Return the next limit for an interval's samples."""
+        mean_latency = state["latency"] / state["requests"]
+        error_rate = state["errors"] / state["requests"]
+        if mean_latency > self.target_latency or error_rate > self.max_error_rate:
+            return self._clamp(state["limit"] * self.decrease)
+        return self._clamp(state["limit"] + self.increase)
 
 
 class RateLimitMiddleware(MiddlewareMixin):
@@ -40,20 +164,59 @@ class RateLimitMiddleware(MiddlewareMixin):
                 'algorithm': 'fixed_window',
                 'use_user': False,  # Use IP instead of user
             },
+            {
+                'path_pattern': r'^/internal/',
+                'limit': 50,
+                'window': 1,
+                'algorithm': 'leaky_bucket',  # Delay requests instead of 429
+                'limiter_kwargs': {'max_delay': 2},
+            },
+            {
+                'path_pattern': r'^/export/',
+                'limit': 1000,
+                'window': 3600,
+                'cost': 'myapp.limits.export_cost',  # int, callable or path
+            },
+            {
+                'path_pattern': r'^/search/',
+                'limit': 200,  # Starting limit
+                'window': 60,
+                'scope': 'search',
+                # Shed load when views slow down; see AdaptiveLimit
+                'adaptive': {
+                    'min_limit': 20,
+                    'max_limit': 500,
+                    'target_latency': 0.5,
+                },
+            },
         ],
         'GLOBAL_LIMIT': 10000,  # Global limit per user/IP
         'GLOBAL_WINDOW': 3600,
+        # Check clients far below the global limit only now and then; keep
+        # the workers serving one client below 1 / sample_fraction (100)
+        'GLOBAL_LIMITER_KWARGS': {'sample_fraction': 0.01},
         'EXEMPT_PATHS': [r'^/health/$', r'^/static/'],
         'EXEMPT_IPS': ['127.0.0.1', '::1'],
         'USE_USER_ID': True,  # Use authenticated user ID when available
         'RATE_LIMIT_HEADERS': True,  # Add rate limit headers to responses
+        'DENY_CACHE_SIZE': 10000,  # Denied clients cached in process (0: off)
     }
+
+    With ``DENY_CACHE_SIZE`` set, clients denied recently are rejected from
+    an in-process deny cache, without a backend call, until their
+    ``retry_after`` passes. Requests that a shaping algorithm admits with a
+    ``delay`` wait it out before the view runs, with ``asyncio.sleep`` when
+    served over ASGI. Leases taken by the "concurrency" algorithm are
+    released in ``process_response``.
     """
 
     def __init__(self, get_response):
         super().__init__(get_response)
         self.get_response = get_response
         self.config = getattr(settings, "RATE_LIMIT_SETTINGS", {})
+        deny_cache_size = self.config.get("DENY_CACHE_SIZE", 0)
+        self.deny_cache = DenyCache(deny_cache_size) if deny_cache_size else None
+        self._rate_limiters: Dict[str, Any] = {}
         self._setup_backend()
         self._compile_patterns()
 
@@ -73,6 +236,15 @@ class RateLimitMiddleware(MiddlewareMixin):
         for rule in self.config.get("RULES", []):
             compiled_rule = rule.copy()
             compiled_rule["compiled_pattern"] = re.compile(rule["path_pattern"])
+            if isinstance(rule.get("cost"), str):
+                compiled_rule["cost"] = import_string(rule["cost"])
+            if rule.get("adaptive"):
+                compiled_rule["adaptive"] = AdaptiveLimit(
+                    self.backend,
+                    rule.get("scope", "default"),
+                    rule["limit"],
+                    **rule["adaptive"],
+                )
             self.rules.append(compiled_rule)
 
     def _is_exempt(self, request: HttpRequest) -> bool:
@@ -99,10 +271,18 @@ class RateLimitMiddleware(MiddlewareMixin):
                 return rule
         return None
 
-    def _get_rate_limiter(self, algorithm: Optional[str] = None) -> Any:
-        """Get rate limiter instance."""
+    def _get_rate_limiter(self, algorithm: Optional[str] = None, **kwargs) -> Any:
+        """Get the rate limiter instance shared by requests of one configuration."""
         algorithm = algorithm or self.config.get("DEFAULT_ALGORITHM", "sliding_window")
-        return get_rate_limiter(algorithm=algorithm, backend=self.backend)
+        config = repr((algorithm, sorted(kwargs.items())))
+        rate_limiter = self._rate_limiters.get(config)
+        if rate_limiter is None:
+            rate_limiter = get_rate_limiter(
+                algorithm=algorithm, backend=self.backend, **kwargs
+            )
+            rate_limiter.deny_cache = self.deny_cache
+            self._rate_limiters[config] = rate_limiter
+        return rate_limiter
 
     def _add_rate_limit_headers(
         self, response: HttpResponse, metadata: Dict[str, Any], limit: int
@@ -142,6 +322,34 @@ class RateLimitMiddleware(MiddlewareMixin):
 
     def process_request(self, request: HttpRequest) -> Optional[HttpResponse]:
         """Process incoming request for rate limiting."""
+        response = self._check_request(request)
+
+        delay = getattr(request, "_rate_limit_delay", None)
+        if response is None and delay:
+            time.sleep(delay)
+
+        request._rate_limit_started = time.monotonic()
+        return response
+
+    async def __acall__(self, request: HttpRequest) -> HttpResponse:
+        """Async request handling that waits out delays without a thread."""
+        response = await sync_to_async(self._check_request, thread_sensitive=True)(
+            request
+        )
+
+        if response is None:
+            delay = getattr(request, "_rate_limit_delay", None)
+            if delay:
+                await asyncio.sleep(delay)
+            request._rate_limit_started = time.monotonic()
+            response = await self.get_response(request)
+
+        return await sync_to_async(self.process_response, thread_sensitive=True)(
+            request, response
+        )
+
+    def _check_request(self, request: HttpRequest) -> Optional[HttpResponse]:
+        """Check the rate limit for a request, returning a response if denied."""
         # Skip if exempt
         if self._is_exempt(request):
             return None
@@ -163,6 +371,7 @@ class RateLimitMiddleware(MiddlewareMixin):
                 "algorithm": self.config.get("DEFAULT_ALGORITHM", "sliding_window"),
                 "scope": "global",
                 "use_user": self.config.get("USE_USER_ID", True),
+                "limiter_kwargs": self.config.get("GLOBAL_LIMITER_KWARGS", {}),
             }
 
         # Get identifier
@@ -171,20 +380,37 @@ class RateLimitMiddleware(MiddlewareMixin):
 
         # Get rate limiter
         algorithm: Optional[str] = rule.get("algorithm")
-        rate_limiter = self._get_rate_limiter(algorithm)
+        rate_limiter = self._get_rate_limiter(
+            algorithm, **rule.get("limiter_kwargs", {})
+        )
+
+        # Adaptive rules use the limit shared by the controller
+        adaptive = rule.get("adaptive")
+        limit = adaptive.limit if adaptive else rule["limit"]
 
         try:
             # Check rate limit
             metadata = rate_limiter.enforce(
                 identifier=identifier,
-                limit=rule["limit"],
+                limit=limit,
                 window=rule["window"],
                 scope=rule.get("scope", "default"),
+                cost=get_request_cost(rule.get("cost", 1), request),
             )
 
             # Store metadata for response processing
             request._rate_limit_metadata = metadata
-            request._rate_limit_limit = rule["limit"]
+            request._rate_limit_limit = limit
+            if adaptive:
+                request._rate_limit_adaptive = adaptive
+            request._rate_limit_delay = metadata.get("delay")
+            request._rate_limit_release = functools.partial(
+                rate_limiter.release,
+                identifier,
+                metadata.get("lease_id"),
+                window=rule["window"],
+                scope=rule.get("scope", "default"),
+            )
 
         except RateLimitExceeded as e:
             return self._create_error_response(e)
@@ -194,7 +420,17 @@ class RateLimitMiddleware(MiddlewareMixin):
     def process_response(
         self, request: HttpRequest, response: HttpResponse
     ) -> HttpResponse:
-        """Add rate limiting headers to response."""
+        """Release in-flight leases and add rate limiting headers to response."""
+        if hasattr(request, "_rate_limit_release"):
+            request._rate_limit_release()
+
+        if hasattr(request, "_rate_limit_adaptive"):
+            started = getattr(request, "_rate_limit_started", None)
+            if started is not None:
+                request._rate_limit_adaptive.record(
+                    time.monotonic() - started, response.status_code >= 500
+                )
+
         if hasattr(request, "_rate_limit_metadata"):
             self._add_rate_limit_headers(
                 response, request._rate_limit_metadata, request._rate_limit_limit
@@ -230,6 +466,9 @@ class PerIPRateLimitMiddleware(MiddlewareMixin):
             self.rate_limiter = get_rate_limiter(
                 algorithm=algorithm, backend=self.backend
             )
+            deny_cache_size = self.config.get("DENY_CACHE_SIZE", 0)
+            if deny_cache_size:
+                self.rate_limiter.deny_cache = DenyCache(deny_cache_size)
 
     def process_request(self, request: HttpRequest) -> Optional[HttpResponse]:
         """Process request for per-IP rate limiting."""
@@ -286,6 +525,9 @@ class PerUserRateLimitMiddleware(MiddlewareMixin):
             self.rate_limiter = get_rate_limiter(
                 algorithm=algorithm, backend=self.backend
             )
+            deny_cache_size = self.config.get("DENY_CACHE_SIZE", 0)
+            if deny_cache_size:
+                self.rate_limiter.deny_cache = DenyCache(deny_cache_size)
 
     def process_request(self, request: HttpRequest) -> Optional[HttpResponse]:
         """Process request for per-user rate limiting."""
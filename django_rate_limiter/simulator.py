@@ -0,0 +1,1064 @@
+"""
+Offline simulation of rate limiting rules over recorded traffic.
+
+Replays arrays of request timestamps, client identifiers and paths against
+``RATE_LIMIT_SETTINGS`` rules with NumPy instead of calling ``is_allowed``
+once per request, and reports how many requests each rule would have
+denied, the peak state it would keep and the backend operations it would
+make.
+
+Decisions depend on earlier decisions of the same client, so requests are
+evaluated in lockstep: every client's k-th request is decided in one
+vectorized step, and the number of steps is the request count of the
+busiest client. Fixed windows with a uniform cost need no steps at all.
+Requires NumPy (``pip install numpy``).
+"""
+
+import math
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
+
+from django.conf import settings
+
+from .algorithms import _emission_interval, get_rate_limiter
+from .backends import MemoryBackend
+from .exceptions import ConfigurationError
+
+try:
+    import numpy as np
+
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Per-client state values kept in memory at once; groups are simulated in
+# chunks that stay below it
+_STATE_BUDGET = 1 << 24
+
+# Initial epoch far enough in the past to be stale at any timestamp
+_NO_EPOCH = -(1 << 62)
+
+# A NumPy array or a sequence convertible to one
+_ArrayLike = Any
+
+# A key write as (group, epoch, time, ttl, values stored), see _peak_state
+_KeyEvents = Tuple[Any, Any, Any, Any, Any]
+
+
+class _Model:
+    """
+    Vectorized state of one algorithm for a chunk of groups.
+
+    ``check`` decides the requests of distinct groups without changing the
+    state and ``commit`` applies the decided ones, so composite limiters can
+    commit only what every tier allows. ``data`` holds per-row arrays in
+    simulation order, indexed by the ``rows`` both receive.
+    """
+
+    # Values stored per backend key, and whether denials write the key
+    state_size = 1
+    writes_on_denial = True
+
+    def __init__(
+        self,
+        limiter: Any,
+        n: int,
+        limit: int,
+        window: int,
+        data: Dict[str, Any],
+    ):
+        self.limiter = limiter
+        self.limit = limit
+        self.window = window
+        self.data = data
+
+    @classmethod
+    def groups(
+        cls,
+        limiter: Any,
+        times: Any,
+        clients: Any,
+        names: Any,
+        limit: int,
+        window: int,
+        data: Dict[str, Any],
+    ) -> Any:
+        """Return the group of each row; groups never share state."""
+        return clients
+
+    @property
+    def ttl(self) -> float:
+        """Seconds a key lives after its last write."""
+        return self.window + 10
+
+    def key_epoch(self, times: Any) -> Any:
+        """Return which key of its group each write goes to."""
+        return np.zeros(len(times), dtype=np.int64)
+
+    def check(self, g: Any, t: Any, c: Any, rows: Any) -> Any:
+        """Decide requests at times t costing c for groups g, one per group."""
+        raise NotImplementedError
+
+    def commit(self, g: Any, t: Any, c: Any, rows: Any, allowed: Any) -> None:
+        """Apply the requests just checked, consuming only the allowed ones."""
+        raise NotImplementedError
+
+    def backend_calls(self, allowed: Any) -> int:
+        """Return the backend calls ``is_allowed`` makes for these requests."""
+        return len(allowed)
+
+    def backend_writes(self, allowed: Any) -> int:
+        """Return how many of those calls write state."""
+        return len(allowed) if self.writes_on_denial else int(allowed.sum())
+
+    def key_events(self, groups: Any, times: Any, allowed: Any) -> List[_KeyEvents]:
+        """Return the key writes made while deciding the requests."""
+        written = np.ones(len(allowed), bool) if self.writes_on_denial else allowed
+        return [
+            (
+                groups[written],
+                self.key_epoch(times[written]),
+                times[written],
+                self.ttl,
+                self.state_size,
+            )
+        ]
+
+
+class _SlidingWindowModel(_Model):
+    """Ring of the ``limit`` newest admitted timestamps per client."""
+
+    def __init__(
+        self,
+        limiter: Any,
+        n: int,
+        limit: int,
+        window: int,
+        data: Dict[str, Any],
+    ):
+        super().__init__(limiter, n, limit, window, data)
+        self.state_size = limit
+        self.ring = np.full((n, limit), -np.inf)
+        self.position = np.zeros(n, dtype=np.int64)
+
+    def check(self, g: Any, t: Any, c: Any, rows: Any) -> Any:
+        # The request fits when the c oldest of the newest timestamps expired
+        slot = (self.position[g] + np.maximum(c, 1) - 1) % self.limit
+        return (c <= self.limit) & (self.ring[g, slot] <= t - self.window)
+
+    def commit(self, g: Any, t: Any, c: Any, rows: Any, allowed: Any) -> None:
+        for offset in range(int(c[allowed].max(initial=0))):
+            stamped = allowed & (c > offset)
+            self.ring[g[stamped], (self.position[g[stamped]] + offset) % self.limit] = (
+                t[stamped]
+            )
+        self.position[g] = (self.position[g] + np.where(allowed, c, 0)) % self.limit
+
+
+class _TokenBucketModel(_Model):
+    """Token count and last refill time per client."""
+
+    state_size = 2
+
+    def __init__(
+        self,
+        limiter: Any,
+        n: int,
+        limit: int,
+        window: int,
+        data: Dict[str, Any],
+    ):
+        super().__init__(limiter, n, limit, window, data)
+        self.tokens = np.full(n, float(limit))
+        self.last_refill = np.full(n, np.nan)
+
+    @property
+    def ttl(self) -> float:
+        return self.window * 2
+
+    def check(self, g: Any, t: Any, c: Any, rows: Any) -> Any:
+        last_refill = np.where(np.isnan(self.last_refill[g]), t, self.last_refill[g])
+        self._tokens = np.minimum(
+            self.limit, self.tokens[g] + (t - last_refill) * self.limit / self.window
+        )
+        return self._tokens >= c
+
+    def commit(self, g: Any, t: Any, c: Any, rows: Any, allowed: Any) -> None:
+        self.tokens[g] = self._tokens - np.where(allowed, c, 0)
+        self.last_refill[g] = t
+
+
+class _FixedWindowModel(_Model):
+    """Count and window start per client."""
+
+    state_size = 2
+
+    def __init__(
+        self,
+        limiter: Any,
+        n: int,
+        limit: int,
+        window: int,
+        data: Dict[str, Any],
+    ):
+        super().__init__(limiter, n, limit, window, data)
+        self.count = np.zeros(n, dtype=np.int64)
+        self.window_start = np.full(n, np.nan)
+
+    def key_epoch(self, times: Any) -> Any:
+        return (times // self.window).astype(np.int64)
+
+    def check(self, g: Any, t: Any, c: Any, rows: Any) -> Any:
+        self._window_start = self.key_epoch(t)
+        self._count = np.where(
+            self.window_start[g] == self._window_start, self.count[g], 0
+        )
+        return self._count + c <= self.limit
+
+    def commit(self, g: Any, t: Any, c: Any, rows: Any, allowed: Any) -> None:
+        self.count[g] = self._count + np.where(allowed, c, 0)
+        self.window_start[g] = self._window_start
+
+
+class _CalendarModel(_FixedWindowModel):
+    """Count per client and calendar period, with the bucket tiers at full size."""
+
+    writes_on_denial = False
+
+    def __init__(
+        self,
+        limiter: Any,
+        n: int,
+        limit: int,
+        window: int,
+        data: Dict[str, Any],
+    ):
+        super().__init__(limiter, n, limit, window, data)
+        bounds = data["period_bounds"]
+        longest_days = math.ceil(np.diff(bounds).max(initial=0) / 86400)
+        self.state_size = 2 * (limiter.minute_retention // 60 + 24 + longest_days)
+
+    def key_epoch(self, times: Any) -> Any:
+        return np.searchsorted(self.data["period_bounds"], times, side="right")
+
+    def key_events(self, groups: Any, times: Any, allowed: Any) -> List[_KeyEvents]:
+        # A period's key lives until the period ends
+        times = times[allowed]
+        epochs = self.key_epoch(times)
+        ends = self.data["period_bounds"][epochs]
+        return [(groups[allowed], epochs, times, ends - times + 10, self.state_size)]
+
+
+class _SlidingCounterModel(_Model):
+    """Ring of sub-window counts and the last written sub-window per client."""
+
+    def __init__(
+        self,
+        limiter: Any,
+        n: int,
+        limit: int,
+        window: int,
+        data: Dict[str, Any],
+    ):
+        super().__init__(limiter, n, limit, window, data)
+        self.num_windows = limiter.num_windows
+        self.state_size = self.num_windows + 1
+        self.counts = np.zeros((n, self.num_windows), dtype=np.int64)
+        self.epoch = np.full(n, _NO_EPOCH, dtype=np.int64)
+
+    def check(self, g: Any, t: Any, c: Any, rows: Any) -> Any:
+        num_windows = self.num_windows
+        sub_window = (t // (self.window / num_windows)).astype(np.int64)
+        epoch = self.epoch[g]
+        counts = self.counts[g]
+
+        # Zero the slots that rotated out since the last write
+        elapsed = np.minimum(sub_window - epoch, num_windows)[:, None]
+        offsets = (np.arange(num_windows)[None, :] - epoch[:, None]) % num_windows
+        counts[((offsets >= 1) & (offsets <= elapsed)) | (elapsed >= num_windows)] = 0
+
+        self._counts = counts
+        self._sub_window = sub_window
+        return counts.sum(axis=1) + c <= self.limit
+
+    def commit(self, g: Any, t: Any, c: Any, rows: Any, allowed: Any) -> None:
+        counts = self._counts
+        counts[allowed, self._sub_window[allowed] % self.num_windows] += c[allowed]
+        self.counts[g] = counts
+        self.epoch[g] = self._sub_window
+
+
+class _ApproximateSlidingWindowModel(_Model):
+    """Current and previous window counts per client."""
+
+    writes_on_denial = False
+
+    def __init__(
+        self,
+        limiter: Any,
+        n: int,
+        limit: int,
+        window: int,
+        data: Dict[str, Any],
+    ):
+        super().__init__(limiter, n, limit, window, data)
+        self.current = np.full(n, _NO_EPOCH, dtype=np.int64)
+        self.current_count = np.zeros(n, dtype=np.int64)
+        self.previous_count = np.zeros(n, dtype=np.int64)
+
+    @property
+    def ttl(self) -> float:
+        return self.window * 2 + 10
+
+    def key_epoch(self, times: Any) -> Any:
+        return (times // self.window).astype(np.int64)
+
+    def check(self, g: Any, t: Any, c: Any, rows: Any) -> Any:
+        current = (t // self.window).astype(np.int64)
+        same = self.current[g] == current
+        follows = self.current[g] == current - 1
+        self._current = current
+        self._current_count = np.where(same, self.current_count[g], 0)
+        self._previous_count = np.where(
+            same,
+            self.previous_count[g],
+            np.where(follows, self.current_count[g], 0),
+        )
+        previous_weight = (self.window - (t - current * self.window)) / self.window
+        estimate = self._previous_count * previous_weight + self._current_count
+        return estimate + c <= self.limit
+
+    def commit(self, g: Any, t: Any, c: Any, rows: Any, allowed: Any) -> None:
+        self.current[g] = self._current
+        self.current_count[g] = self._current_count + np.where(allowed, c, 0)
+        self.previous_count[g] = self._previous_count
+
+
+class _GCRAModel(_Model):
+    """Theoretical arrival time per client."""
+
+    writes_on_denial = False
+
+    def __init__(
+        self,
+        limiter: Any,
+        n: int,
+        limit: int,
+        window: int,
+        data: Dict[str, Any],
+    ):
+        super().__init__(limiter, n, limit, window, data)
+        self.emission_interval = _emission_interval(limit, window)
+        self.tat = np.full(n, -np.inf)
+
+    @property
+    def ttl(self) -> float:
+        return math.ceil(self.window) + 1
+
+    def tolerance(self, c: Any) -> Any:
+        return self.window
+
+    def check(self, g: Any, t: Any, c: Any, rows: Any) -> Any:
+        self._tat = np.maximum(self.tat[g], t) + self.emission_interval * c
+        return self._tat - t <= self.tolerance(c)
+
+    def commit(self, g: Any, t: Any, c: Any, rows: Any, allowed: Any) -> None:
+        self.tat[g] = np.where(allowed, self._tat, self.tat[g])
+
+
+class _LeakyBucketModel(_GCRAModel):
+    """Queue drain time per client, with tail or random early drops."""
+
+    def __init__(
+        self,
+        limiter: Any,
+        n: int,
+        limit: int,
+        window: int,
+        data: Dict[str, Any],
+    ):
+        super().__init__(limiter, n, limit, window, data)
+        self.max_queue = limiter._queue_size(limit, self.emission_interval)
+        self.red = limiter.drop_policy == "red"
+
+    def tolerance(self, c: Any) -> Any:
+        return (self.max_queue + c) * self.emission_interval + 1e-9
+
+    def check(self, g: Any, t: Any, c: Any, rows: Any) -> Any:
+        allowed = super().check(g, t, c, rows)
+        if not self.red:
+            return allowed
+
+        depth = np.maximum(0.0, self.tat[g] - t) / self.emission_interval
+        threshold = self.max_queue / 2
+        probability = (depth - threshold) / max(self.max_queue - threshold, 1e-9)
+        dropped = (depth >= threshold) & (self.data["random"][rows] < probability)
+        return allowed & ~dropped
+
+    def backend_calls(self, allowed: Any) -> int:
+        # Random early detection reads the queue before updating it
+        return len(allowed) * (2 if self.red else 1)
+
+
+class _ConcurrencyModel(_Model):
+    """Lease expiry times per client; leases end with their request."""
+
+    writes_on_denial = False
+
+    def __init__(
+        self,
+        limiter: Any,
+        n: int,
+        limit: int,
+        window: int,
+        data: Dict[str, Any],
+    ):
+        super().__init__(limiter, n, limit, window, data)
+        self.state_size = limit
+        self.expiry = np.full((n, limit), -np.inf)
+
+    @property
+    def ttl(self) -> float:
+        return self.window
+
+    def check(self, g: Any, t: Any, c: Any, rows: Any) -> Any:
+        self._free = self.expiry[g] <= t[:, None]
+        return self._free.sum(axis=1) >= c
+
+    def commit(self, g: Any, t: Any, c: Any, rows: Any, allowed: Any) -> None:
+        held = np.minimum(self.data["durations"][rows], self.window)
+        taken = (
+            self._free
+            & (np.cumsum(self._free, axis=1) <= c[:, None])
+            & allowed[:, None]
+        )
+        self.expiry[g] = np.where(taken, (t + held)[:, None], self.expiry[g])
+
+    def backend_calls(self, allowed: Any) -> int:
+        # Allowed requests release their lease when they finish
+        return len(allowed) + int(allowed.sum())
+
+    def backend_writes(self, allowed: Any) -> int:
+        return 2 * int(allowed.sum())
+
+
+class _CompositeModel(_Model):
+    """Every tier's state, committed only when every tier allows."""
+
+    writes_on_denial = False
+
+    def __init__(
+        self,
+        limiter: Any,
+        n: int,
+        limit: int,
+        window: int,
+        data: Dict[str, Any],
+    ):
+        super().__init__(limiter, n, limit, window, data)
+        tier_model = _MODELS[data["tier_algorithm"]]
+        self.tiers = [
+            tier_model(limiter.tier_limiter, n, tier_limit, tier_window, data)
+            for tier_limit, tier_window in [(limit, window)] + limiter.tiers
+        ]
+        self.state_size = sum(tier.state_size for tier in self.tiers)
+
+    def check(self, g: Any, t: Any, c: Any, rows: Any) -> Any:
+        allowed = np.ones(len(g), bool)
+        for tier in self.tiers:
+            allowed &= tier.check(g, t, c, rows)
+        return allowed
+
+    def commit(self, g: Any, t: Any, c: Any, rows: Any, allowed: Any) -> None:
+        for tier in self.tiers:
+            tier.commit(g, t, c, rows, allowed)
+
+    def backend_writes(self, allowed: Any) -> int:
+        # One all-or-nothing batch writes every tier or nothing
+        return len(self.tiers) * int(allowed.sum())
+
+    def key_events(self, groups: Any, times: Any, allowed: Any) -> List[_KeyEvents]:
+        events = []
+        for index, tier in enumerate(self.tiers):
+            # Denied batches write no tier; allowed ones write every tier
+            events.extend(
+                tier.key_events(
+                    groups[allowed] * len(self.tiers) + index,
+                    times[allowed],
+                    allowed[allowed],
+                )
+            )
+        return events
+
+
+class _PenaltyModel(_Model):
+    """Violations and block end per client in front of the inner state."""
+
+    def __init__(
+        self,
+        limiter: Any,
+        n: int,
+        limit: int,
+        window: int,
+        data: Dict[str, Any],
+    ):
+        super().__init__(limiter, n, limit, window, data)
+        self.inner = _MODELS[data["inner_algorithm"]](
+            limiter.inner_limiter, n, limit, window, data
+        )
+        self.state_size = self.inner.state_size
+        self.violations = np.zeros(n, dtype=np.int64)
+        self.blocked_until = np.full(n, -np.inf)
+
+    def check(self, g: Any, t: Any, c: Any, rows: Any) -> Any:
+        # Blocked requests never reach the inner state
+        self._open = t >= self.blocked_until[g]
+        allowed = np.zeros(len(g), bool)
+        open_ = self._open
+        allowed[open_] = self.inner.check(g[open_], t[open_], c[open_], rows[open_])
+        return allowed
+
+    def commit(self, g: Any, t: Any, c: Any, rows: Any, allowed: Any) -> None:
+        open_ = self._open
+        self.inner.commit(g[open_], t[open_], c[open_], rows[open_], allowed[open_])
+        violated = open_ & ~allowed
+        self.data["open"][rows] = open_
+        self.data["violated"][rows] = violated
+
+        g, t = g[violated], t[violated]
+        # Clients without violations have no block to decay from
+        last = np.where(self.violations[g] > 0, self.blocked_until[g], t)
+        forgiven = np.maximum(0.0, t - last) // self.limiter.penalty_decay
+        violations = np.minimum(
+            np.maximum(0, self.violations[g] - np.minimum(forgiven, 1 << 62)) + 1,
+            self.limiter.max_violations,
+        ).astype(np.int64)
+        penalties = [self.limiter.penalty(int(count)) for count in violations]
+        self.violations[g] = violations
+        self.blocked_until[g] = t + np.asarray(penalties, dtype=float)
+
+    def backend_writes(self, allowed: Any) -> int:
+        open_ = self.data["open"]
+        return self.inner.backend_writes(allowed[open_]) + int(
+            self.data["violated"].sum()
+        )
+
+    def key_events(self, groups: Any, times: Any, allowed: Any) -> List[_KeyEvents]:
+        open_, violated = self.data["open"], self.data["violated"]
+        return self.inner.key_events(groups[open_], times[open_], allowed[open_]) + [
+            (
+                groups[violated],
+                np.zeros(int(violated.sum()), dtype=np.int64),
+                times[violated],
+                self.limiter.penalty_ttl,
+                2,
+            )
+        ]
+
+
+class _HierarchicalModel(_Model):
+    """Fixed window counters of every level, shared by a root's clients."""
+
+    state_size = 1
+    writes_on_denial = False
+
+    def __init__(
+        self,
+        limiter: Any,
+        n: int,
+        limit: int,
+        window: int,
+        data: Dict[str, Any],
+    ):
+        super().__init__(limiter, n, limit, window, data)
+        # Levels belong to one root, so chunks of roots never share them
+        self.count = np.zeros(data["levels"], dtype=np.int64)
+        self.window_start = np.full(data["levels"], np.nan)
+
+    @classmethod
+    def groups(
+        cls,
+        limiter: Any,
+        times: Any,
+        clients: Any,
+        names: Any,
+        limit: int,
+        window: int,
+        data: Dict[str, Any],
+    ) -> Any:
+        levels: Dict[str, int] = {}
+        chains = [limiter.get_chain(str(name), limit, window) for name in names]
+        depth = max(len(chain) for chain in chains)
+        nodes = np.full((len(names), depth), -1, dtype=np.int64)
+        limits = np.zeros((len(names), depth), dtype=np.int64)
+        windows = np.ones((len(names), depth))
+        roots = np.zeros(len(names), dtype=np.int64)
+        for index, chain in enumerate(chains):
+            for level, (identifier, level_limit, level_window) in enumerate(chain):
+                nodes[index, level] = levels.setdefault(identifier, len(levels))
+                limits[index, level] = level_limit
+                windows[index, level] = level_window
+            roots[index] = levels[chain[-1][0]]
+
+        data.update(levels=len(levels), nodes=nodes, limits=limits, windows=windows)
+        return roots[clients]
+
+    def _chains(self, rows: Any) -> Tuple[Any, Any, Any]:
+        clients = self.data["clients"][rows]
+        return (
+            self.data["nodes"][clients],
+            self.data["limits"][clients],
+            self.data["windows"][clients],
+        )
+
+    def check(self, g: Any, t: Any, c: Any, rows: Any) -> Any:
+        nodes, limits, windows = self._chains(rows)
+        valid = nodes >= 0
+        self._valid = valid
+        self._nodes = np.where(valid, nodes, 0)
+        self._window_start = (t[:, None] // windows) * windows
+        self._count = np.where(
+            valid & (self.window_start[self._nodes] == self._window_start),
+            self.count[self._nodes],
+            0,
+        )
+        return (~valid | (self._count + c[:, None] <= limits)).all(axis=1)
+
+    def commit(self, g: Any, t: Any, c: Any, rows: Any, allowed: Any) -> None:
+        charged = self._valid & allowed[:, None]
+        self.count[self._nodes[charged]] = (self._count + c[:, None])[charged]
+        self.window_start[self._nodes[charged]] = self._window_start[charged]
+
+    def backend_writes(self, allowed: Any) -> int:
+        nodes = self.data["nodes"][self.data["clients"][allowed]]
+        return int((nodes >= 0).sum())
+
+    def key_events(self, groups: Any, times: Any, allowed: Any) -> List[_KeyEvents]:
+        nodes, _, windows = self._chains(np.flatnonzero(allowed))
+        valid = nodes >= 0
+        times = np.broadcast_to(times[allowed][:, None], nodes.shape)
+        return [
+            (
+                nodes[valid],
+                (times[valid] // windows[valid]).astype(np.int64),
+                times[valid],
+                windows[valid] + 10,
+                self.state_size,
+            )
+        ]
+
+
+class _CountMinSketchModel(_Model):
+    """One counter array per window, shared by every client of the scope."""
+
+    writes_on_denial = False
+
+    def __init__(
+        self,
+        limiter: Any,
+        n: int,
+        limit: int,
+        window: int,
+        data: Dict[str, Any],
+    ):
+        super().__init__(limiter, n, limit, window, data)
+        self.state_size = limiter.width * limiter.depth
+        self.counts = np.zeros((n, self.state_size), dtype=np.uint32)
+
+    @classmethod
+    def groups(
+        cls,
+        limiter: Any,
+        times: Any,
+        clients: Any,
+        names: Any,
+        limit: int,
+        window: int,
+        data: Dict[str, Any],
+    ) -> Any:
+        data["indexes"] = np.array(
+            [limiter._indexes(str(name)) for name in names], dtype=np.int64
+        )
+        return np.unique(times // window, return_inverse=True)[1].reshape(-1)
+
+    def check(self, g: Any, t: Any, c: Any, rows: Any) -> Any:
+        self._indexes = self.data["indexes"][self.data["clients"][rows]]
+        self._counters = self.counts[g[:, None], self._indexes]
+        self._estimate = self._counters.min(axis=1).astype(np.int64)
+        return self._estimate + c <= self.limit
+
+    def commit(self, g: Any, t: Any, c: Any, rows: Any, allowed: Any) -> None:
+        target = (self._estimate + c)[:, None]
+        self.counts[g[:, None], self._indexes] = np.where(
+            allowed[:, None], np.maximum(self._counters, target), self._counters
+        )
+
+
+_MODELS: Dict[str, Type[_Model]] = {
+    "sliding_window": _SlidingWindowModel,
+    "token_bucket": _TokenBucketModel,
+    "fixed_window": _FixedWindowModel,
+    "sliding_counter": _SlidingCounterModel,
+    "sliding_approx": _ApproximateSlidingWindowModel,
+    "gcra": _GCRAModel,
+    "leaky_bucket": _LeakyBucketModel,
+    "concurrency": _ConcurrencyModel,
+    "composite": _CompositeModel,
+    "hierarchical": _HierarchicalModel,
+    "count_min": _CountMinSketchModel,
+    "calendar": _CalendarModel,
+    "penalty": _PenaltyModel,
+}
+
+
+def _period_bounds(limiter: Any, times: Any, window: int) -> Any:
+    """Return the calendar period boundaries spanning times, in order."""
+    period = limiter.get_period(window)
+    if not len(times):
+        return np.zeros(1)
+    start, end = limiter.period_bounds(times.min(), period)
+    bounds = [start, end]
+    while end <= times.max():
+        end = limiter.period_bounds(end, period)[1]
+        bounds.append(end)
+    return np.asarray(bounds, dtype=float)
+
+
+def _lockstep(
+    make_model: Callable[[int], _Model],
+    groups: Any,
+    n_groups: int,
+    times: Any,
+    costs: Any,
+    state_size: int,
+) -> Any:
+    """
+    Decide rows sorted by group and time, one request per group per step.
+
+    Groups are simulated in chunks whose state fits ``_STATE_BUDGET``. In
+    step k every group with more than k requests decides its k-th one, so
+    the steps of a chunk equal the request count of its largest group.
+    """
+    allowed = np.zeros(len(groups), bool)
+    sizes = np.bincount(groups, minlength=n_groups)
+    starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+
+    chunk = max(1, _STATE_BUDGET // max(state_size, 1))
+    for first in range(0, n_groups, chunk):
+        chunk_sizes = sizes[first : first + chunk]
+        model = make_model(len(chunk_sizes))
+        # Largest groups first, so the active ones are always a prefix
+        by_size = np.argsort(-chunk_sizes, kind="stable")
+        descending = chunk_sizes[by_size]
+        chunk_starts = starts[first : first + chunk][by_size]
+        steps = int(descending[0]) if len(descending) else 0
+        # Groups still active at each step
+        active_counts = np.searchsorted(-descending, -np.arange(steps), side="left")
+
+        for step, active in enumerate(active_counts.tolist()):
+            g = by_size[:active]
+            rows = chunk_starts[:active] + step
+            t = times[rows]
+            c = costs[rows]
+            decided = model.check(g, t, c, rows)
+            model.commit(g, t, c, rows, decided)
+            allowed[rows] = decided
+    return allowed
+
+
+def _peak_state(events: List[_KeyEvents]) -> Tuple[int, int]:
+    """
+    Return the peak number of live keys and of values stored in them.
+
+    A key lives from its first write until ``ttl`` seconds after its last
+    one; a write after it expired starts a new lifetime.
+    """
+    events = [event for event in events if len(event[0])]
+    if not events:
+        return 0, 0
+
+    def column(index: int, dtype: Any) -> Any:
+        return np.concatenate(
+            [
+                np.broadcast_to(np.asarray(event[index], dtype=dtype), event[0].shape)
+                for event in events
+            ]
+        )
+
+    # Keys of different event lists never coincide
+    source = np.concatenate(
+        [np.full(len(event[0]), index) for index, event in enumerate(events)]
+    )
+    groups, epochs = column(0, np.int64), column(1, np.int64)
+    times, ttls, sizes = column(2, float), column(3, float), column(4, np.int64)
+
+    order = np.lexsort((times, epochs, groups, source))
+    source, groups, epochs = source[order], groups[order], epochs[order]
+    times, ttls, sizes = times[order], ttls[order], sizes[order]
+
+    begins = np.ones(len(times), bool)
+    begins[1:] = (
+        (source[1:] != source[:-1])
+        | (groups[1:] != groups[:-1])
+        | (epochs[1:] != epochs[:-1])
+        | (times[1:] > times[:-1] + ttls[:-1])
+    )
+    first = np.flatnonzero(begins)
+    last = np.append(first[1:] - 1, len(times) - 1)
+
+    moments = np.concatenate((times[first], times[last] + ttls[last]))
+    keys = np.concatenate((np.ones(len(first)), -np.ones(len(first))))
+    values = keys * np.concatenate((sizes[first], sizes[first]))
+    # Count keys created and expiring at the same moment as overlapping
+    order = np.lexsort((-keys, moments))
+    return (
+        int(np.cumsum(keys[order]).max()),
+        int(np.cumsum(values[order]).max()),
+    )
+
+
+def simulate(
+    algorithm: str,
+    timestamps: _ArrayLike,
+    identifiers: _ArrayLike,
+    limit: int,
+    window: int,
+    costs: Optional[_ArrayLike] = None,
+    durations: Optional[_ArrayLike] = None,
+    seed: Optional[int] = 0,
+    **limiter_kwargs,
+) -> Dict[str, Any]:
+    """
+    Simulate one limit over recorded requests.
+
+    Decisions match what the algorithm's ``is_allowed`` would return for
+    the requests in time order, with these exceptions: sliding windows are
+    simulated as exact logs at every limit (the bucketed histogram admits at
+    most as much), local token leasing, sampled checks, split counters and
+    the deny cache are not simulated, the leaky bucket's random early drops
+    use a seeded generator, and rolling calendar windows are not supported.
+
+    Args:
+        algorithm: Rate limiting algorithm, as for ``get_rate_limiter``
+        timestamps: Request times in seconds
+        identifiers: Client identifier of each request
+        limit: Maximum number of requests allowed
+        window: Time window in seconds
+        costs: Cost of each request (default 1)
+        durations: Seconds each request runs, required by "concurrency"
+        seed: Seed for random early drops
+        **limiter_kwargs: Additional arguments of the rate limiter
+
+    Returns:
+        Dictionary with ``allowed`` (a boolean array in input order),
+        ``requests``, ``denied``, ``peak_keys`` and ``peak_state_size`` (live
+        backend keys and values stored in them, counting a sliding log or a
+        lease set at its full size), ``backend_calls`` and
+        ``backend_writes``
+
+    Raises:
+        ConfigurationError: If NumPy is missing or inputs are inconsistent
+    """
+    if not NUMPY_AVAILABLE:
+        raise ConfigurationError("The simulator requires NumPy. Install numpy.")
+
+    limiter = get_rate_limiter(algorithm, backend=MemoryBackend(), **limiter_kwargs)
+    times = np.asarray(timestamps, dtype=float)
+    names, clients = np.unique(np.asarray(identifiers), return_inverse=True)
+    clients = clients.reshape(-1)
+    request_costs = (
+        np.ones(len(times), dtype=np.int64)
+        if costs is None
+        else np.asarray(costs, dtype=np.int64)
+    )
+    if not len(clients) == len(request_costs) == len(times):
+        raise ConfigurationError("Timestamps, identifiers and costs differ in length")
+
+    data: Dict[str, Any] = {}
+    if algorithm == "concurrency":
+        if durations is None:
+            raise ConfigurationError("Simulating concurrency requires durations")
+        data["durations"] = np.asarray(durations, dtype=float)
+    # Penalties wrap the inner algorithm's state, which may need data too
+    inner_algorithm = None
+    if algorithm == "penalty":
+        inner_algorithm = limiter_kwargs.get("inner_algorithm", "sliding_window")
+        data["inner_algorithm"] = inner_algorithm
+        data["open"] = np.ones(len(times), bool)
+        data["violated"] = np.zeros(len(times), bool)
+    if "leaky_bucket" in (algorithm, inner_algorithm):
+        data["random"] = np.random.default_rng(seed).random(len(times))
+    if algorithm == "composite":
+        data["tier_algorithm"] = limiter_kwargs.get("tier_algorithm", "sliding_window")
+        if data["tier_algorithm"] in (
+            "hierarchical",
+            "count_min",
+            "calendar",
+            "penalty",
+        ):
+            raise ConfigurationError(
+                f"Composite tiers using {data['tier_algorithm']} can't be simulated"
+            )
+    if "calendar" in (algorithm, inner_algorithm):
+        if limiter_kwargs.get("rolling"):
+            raise ConfigurationError("Rolling calendar windows can't be simulated")
+        calendar = getattr(limiter, "inner_limiter", limiter)
+        data["period_bounds"] = _period_bounds(calendar, times, window)
+
+    model_type = _MODELS[algorithm]
+    groups = model_type.groups(limiter, times, clients, names, limit, window, data)
+    order = np.lexsort((times, groups))
+    groups, times = groups[order], times[order]
+    request_costs = request_costs[order]
+    data["clients"] = clients[order]
+    for key in ("durations", "random"):
+        if key in data:
+            data[key] = data[key][order]
+    n_groups = int(groups.max()) + 1 if len(groups) else 0
+
+    def make_model(n: int) -> _Model:
+        return model_type(limiter, n, limit, window, data)
+
+    model = make_model(0)
+    uniform = len(times) and (request_costs == request_costs[0]).all()
+    if algorithm in ("fixed_window", "calendar") and uniform:
+        # The first requests of every window fit, in order
+        epochs = model.key_epoch(times)
+        begins = np.ones(len(times), bool)
+        begins[1:] = (groups[1:] != groups[:-1]) | (epochs[1:] != epochs[:-1])
+        first = np.maximum.accumulate(np.where(begins, np.arange(len(times)), 0))
+        decided = (np.arange(len(times)) - first + 1) * request_costs[0] <= limit
+    else:
+        decided = _lockstep(
+            make_model, groups, n_groups, times, request_costs, model.state_size
+        )
+
+    allowed = np.empty(len(times), bool)
+    allowed[order] = decided
+    peak_keys, peak_state_size = _peak_state(model.key_events(groups, times, decided))
+    return {
+        "algorithm": algorithm,
+        "allowed": allowed,
+        "requests": len(times),
+        "denied": int(len(times) - decided.sum()),
+        "peak_keys": peak_keys,
+        "peak_state_size": peak_state_size,
+        "backend_calls": model.backend_calls(decided),
+        "backend_writes": model.backend_writes(decided),
+    }
+
+
+def simulate_rules(
+    timestamps: _ArrayLike,
+    identifiers: _ArrayLike,
+    paths: _ArrayLike,
+    config: Optional[Dict[str, Any]] = None,
+    costs: Optional[_ArrayLike] = None,
+    durations: Optional[_ArrayLike] = None,
+    seed: Optional[int] = 0,
+) -> Dict[str, Any]:
+    """
+    Simulate ``RateLimitMiddleware`` rules over recorded requests.
+
+    Requests are matched like the middleware matches them: exempt paths are
+    skipped, the first rule whose pattern matches applies, and the global
+    limit covers the rest. Identifiers are the middleware's client
+    identifiers (e.g. ``"user:42"`` or ``"ip:10.0.0.1"``); filter out
+    ``EXEMPT_IPS`` beforehand. Every rule is simulated with its own state,
+    at its configured ``limit`` for adaptive rules.
+
+    Args:
+        timestamps: Request times in seconds
+        identifiers: Client identifier of each request
+        paths: Request path of each request
+        config: Settings to simulate (default: ``RATE_LIMIT_SETTINGS``)
+        costs: Cost of each request, required for rules with a cost callable
+        durations: Seconds each request runs, required by "concurrency"
+        seed: Seed for random early drops
+
+    Returns:
+        Dictionary with ``rules`` (one ``simulate`` result per rule, plus its
+        ``path_pattern`` and ``scope``, without ``allowed``), ``global``
+        (likewise, or None), ``exempt`` (requests skipped) and ``allowed``
+        (a boolean array over all requests)
+
+    Raises:
+        ConfigurationError: If NumPy is missing or a rule can't be simulated
+    """
+    if not NUMPY_AVAILABLE:
+        raise ConfigurationError("The simulator requires NumPy. Install numpy.")
+
+    if config is None:
+        config = getattr(settings, "RATE_LIMIT_SETTINGS", {})
+    rules = list(config.get("RULES", []))
+    if config.get("GLOBAL_LIMIT") and config.get("GLOBAL_WINDOW"):
+        rules.append(
+            {
+                "limit": config["GLOBAL_LIMIT"],
+                "window": config["GLOBAL_WINDOW"],
+                "scope": "global",
+                "limiter_kwargs": config.get("GLOBAL_LIMITER_KWARGS", {}),
+                "global": True,
+            }
+        )
+
+    # Match every distinct path once
+    exempt_patterns = [
+        re.compile(pattern) for pattern in config.get("EXEMPT_PATHS", [])
+    ]
+    patterns = [
+        re.compile(rule["path_pattern"]) if "path_pattern" in rule else None
+        for rule in rules
+    ]
+    unique_paths, path_index = np.unique(np.asarray(paths), return_inverse=True)
+    matches = np.full(len(unique_paths), -1, dtype=np.int64)
+    for index, path in enumerate(unique_paths):
+        if any(pattern.match(path) for pattern in exempt_patterns):
+            matches[index] = -2
+            continue
+        for rule_index, pattern in enumerate(patterns):
+            if pattern is None or pattern.match(path):
+                matches[index] = rule_index
+                break
+    matched = matches[path_index.reshape(-1)]
+
+    times = np.asarray(timestamps, dtype=float)
+    clients = np.asarray(identifiers)
+    allowed = np.ones(len(times), bool)
+    results: List[Dict[str, Any]] = []
+    for rule_index, rule in enumerate(rules):
+        rows = np.flatnonzero(matched == rule_index)
+        rule_cost = rule.get("cost", 1)
+        if costs is not None:
+            rule_costs = np.asarray(costs)[rows]
+        elif isinstance(rule_cost, int):
+            rule_costs = np.full(len(rows), rule_cost, dtype=np.int64)
+        else:
+            raise ConfigurationError(
+                f"Rule {rule.get('path_pattern')} has a cost callable; pass costs"
+            )
+
+        result = simulate(
+            rule.get("algorithm") or config.get("DEFAULT_ALGORITHM", "sliding_window"),
+            times[rows],
+            clients[rows],
+            rule["limit"],
+            rule["window"],
+            costs=rule_costs,
+            durations=None if durations is None else np.asarray(durations)[rows],
+            seed=seed,
+            **rule.get("limiter_kwargs", {}),
+        )
+        allowed[rows] = result.pop("allowed")
+        result.update(
+            path_pattern=rule.get("path_pattern"), scope=rule.get("scope", "default")
+        )
+        results.append(result)
+
+    has_global = bool(rules) and rules[-1].get("global", False)
+    return {
+        "rules": results[:-1] if has_global else results,
+        "global": results[-1] if has_global else None,
+        "exempt": int((matched == -2).sum()),
+        "allowed": allowed,
+    }
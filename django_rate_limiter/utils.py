@@ -4,11 +4,11 @@ Utility functions for Django Rate Limiter.
 
 import hashlib
 import time
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Sequence, Tuple
 
 from django.conf import settings
 
-from .algorithms import get_rate_limiter
+from .algorithms import discard_denials, get_rate_limiter
 from .backends import get_backend
 from .exceptions import RateLimitExceeded
 
@@ -20,6 +20,7 @@ def check_rate_limit(
     algorithm: str = "sliding_window",
     backend: str = "memory",
     scope: str = "default",
+    cost: int = 1,
     **kwargs,
 ) -> Dict[str, Any]:
     """
@@ -32,6 +33,7 @@ def check_rate_limit(
         algorithm: Rate limiting algorithm
         backend: Storage backend
         scope: Scope for grouping
+        cost: Units of the limit the request consumes
         **kwargs: Additional arguments
 
     Returns:
@@ -39,11 +41,14 @@ def check_rate_limit(
 
     Raises:
         RateLimitExceeded: If rate limit is exceeded
+        ValueError: If the cost is less than 1
     """
     backend_instance = get_backend(backend)
     rate_limiter = get_rate_limiter(algorithm=algorithm, backend=backend_instance)
 
-    allowed, metadata = rate_limiter.is_allowed(identifier, limit, window, scope)
+    allowed, metadata = rate_limiter.is_allowed(
+        identifier, limit, window, scope, cost=cost
+    )
 
     if not allowed:
         raise RateLimitExceeded(
@@ -56,6 +61,36 @@ def check_rate_limit(
     return metadata
 
 
+def check_rate_limit_many(
+    checks: Sequence[Tuple[Any, ...]],
+    algorithm: str = "sliding_window",
+    backend: str = "memory",
+    all_or_nothing: bool = False,
+) -> List[Tuple[bool, Dict[str, Any]]]:
+    """
+    Utility function to check several rate limits in one backend interaction.
+
+    Args:
+        checks: Tuples of (identifier, limit, window[, scope[, cost]]); scope
+            defaults to "default" as in ``check_rate_limit``
+        algorithm: Rate limiting algorithm
+        backend: Storage backend
+        all_or_nothing: Admit the checks only if all of them are allowed
+
+    Returns:
+        List of (is_allowed, metadata), one per check
+    """
+    backend_instance = get_backend(backend)
+    rate_limiter = get_rate_limiter(algorithm=algorithm, backend=backend_instance)
+
+    normalized = []
+    for identifier, limit, window, *rest in checks:
+        scope = rest[0] if len(rest) > 0 else "default"
+        normalized.append((identifier, limit, window, scope, *rest[1:]))
+
+    return rate_limiter.is_allowed_many(normalized, all_or_nothing=all_or_nothing)
+
+
 def is_rate_limited(
     identifier: str,
     limit: int,
@@ -106,40 +141,66 @@ def get_rate_limit_status(
         algorithm: Rate limiting algorithm
         backend: Storage backend
         scope: Scope for grouping
-        **kwargs: Additional arguments
+        **kwargs: Additional arguments passed to the rate limiter constructor
 
     Returns:
         Dictionary containing rate limit status
     """
-    backend_instance = get_backend(backend)
-    rate_limiter = get_rate_limiter(algorithm=algorithm, backend=backend_instance)
+    return get_rate_limit_status_many(
+        [(identifier, limit, window, scope)], algorithm, backend, **kwargs
+    )[0]
 
-    # Get current status without incrementing
-    key = rate_limiter._get_key(identifier, scope)
-    current_data = backend_instance.get(key)
 
-    if current_data is None:
-        return {
-            "current_count": 0,
-            "remaining": limit,
+def get_rate_limit_status_many(
+    checks: Sequence[Tuple[Any, ...]],
+    algorithm: str = "sliding_window",
+    backend: str = "memory",
+    **kwargs,
+) -> List[Dict[str, Any]]:
+    """
+    Get the rate limit status of several clients with one batched read.
+
+    Statuses come from the limiter's ``peek_many``: nothing is consumed,
+    written or locked, so status pages can poll many keys cheaply.
+
+    Args:
+        checks: Tuples of (identifier, limit, window[, scope[, cost]]); scope
+            defaults to "default" as in ``get_rate_limit_status``
+        algorithm: Rate limiting algorithm
+        backend: Storage backend
+        **kwargs: Additional arguments passed to the rate limiter constructor
+
+    Returns:
+        List of status dictionaries, one per check
+    """
+    backend_instance = get_backend(backend)
+    rate_limiter = get_rate_limiter(
+        algorithm=algorithm, backend=backend_instance, **kwargs
+    )
+
+    normalized = []
+    for identifier, limit, window, *rest in checks:
+        scope = rest[0] if len(rest) > 0 else "default"
+        normalized.append((identifier, limit, window, scope, *rest[1:]))
+
+    statuses = []
+    for (_, limit, window, *_), (allowed, metadata) in zip(
+        normalized, rate_limiter.peek_many(normalized)
+    ):
+        # Token buckets count what is left rather than what was used
+        remaining = metadata.get("remaining", metadata.get("remaining_tokens", 0))
+        status = {
+            "current_count": metadata.get("current_count", limit - remaining),
+            "remaining": remaining,
             "limit": limit,
             "window": window,
-            "reset_time": time.time() + window,
-            "is_limited": False,
+            "reset_time": metadata.get("reset_time", time.time() + window),
+            "is_limited": not allowed,
         }
-
-    # This is simplified - actual implementation depends on algorithm
-    current_count = current_data.get("count", 0)
-    remaining = max(0, limit - current_count)
-
-    return {
-        "current_count": current_count,
-        "remaining": remaining,
-        "limit": limit,
-        "window": window,
-        "reset_time": time.time() + window,
-        "is_limited": current_count >= limit,
-    }
+        if not allowed:
+            status["retry_after"] = metadata.get("retry_after")
+        statuses.append(status)
+    return statuses
 
 
 def clear_rate_limit(
@@ -151,6 +212,9 @@ def clear_rate_limit(
     """
     Clear rate limit data for a specific identifier.
 
+    Denials of the identifier cached by deny caches in this process are
+    forgotten as well.
+
     Args:
         identifier: Unique identifier for the client
         scope: Scope for grouping
@@ -161,6 +225,7 @@ def clear_rate_limit(
     rate_limiter = get_rate_limiter(algorithm=algorithm, backend=backend_instance)
     key = rate_limiter._get_key(identifier, scope)
     backend_instance.delete(key)
+    discard_denials(key)
 
 
 def generate_api_key_hash(api_key: str) -> str:
@@ -222,7 +287,8 @@ def parse_rate_string(rate_string: str) -> tuple:
             "hour": 3600,
             "day": 86400,
             "week": 604800,
-            "month": 2592000,  # 30 days
+            # 30 days, or a calendar month for the "calendar" algorithm
+            "month": 2592000,
         }
 
         if period_str not in period_multipliers:
@@ -261,6 +327,20 @@ def get_rate_limit_config() -> Dict[str, Any]:
     return getattr(settings, "RATE_LIMIT_SETTINGS", {})
 
 
+# Keyword arguments of middleware.AdaptiveLimit a rule's "adaptive" block sets
+ADAPTIVE_OPTIONS = (
+    "min_limit",
+    "max_limit",
+    "target_latency",
+    "max_error_rate",
+    "increase",
+    "decrease",
+    "interval",
+    "min_samples",
+    "key_prefix",
+)
+
+
 def validate_rate_limit_config(config: Dict[str, Any]) -> List[str]:
     """
     Validate rate limiting configuration.
@@ -275,7 +355,15 @@ def validate_rate_limit_config(config: Dict[str, Any]) -> List[str]:
 
     # Check backend
     backend = config.get("BACKEND", "memory")
-    if backend not in ["memory", "database", "redis"]:
+    if backend not in [
+        "memory",
+        "database",
+        "bucketed_database",
+        "sqlite",
+        "cache",
+        "redis",
+        "two_tier",
+    ]:
         errors.append(f"Invalid backend: {backend}")
 
     # Check rules
@@ -295,7 +383,29 @@ def validate_rate_limit_config(config: Dict[str, Any]) -> List[str]:
             "token_bucket",
             "fixed_window",
             "sliding_counter",
+            "sliding_approx",
+            "gcra",
+            "leaky_bucket",
+            "concurrency",
+            "composite",
+            "hierarchical",
+            "count_min",
+            "calendar",
+            "penalty",
         ]:
             errors.append(f"Rule {i}: invalid algorithm '{algorithm}'")
+        elif algorithm == "count_min" and backend not in ["memory", "redis"]:
+            errors.append(f"Rule {i}: count_min needs the memory or redis backend")
+
+        # Validate adaptive bounds
+        adaptive = rule.get("adaptive")
+        if adaptive:
+            unknown = sorted(set(adaptive) - set(ADAPTIVE_OPTIONS))
+            if unknown:
+                errors.append(f"Rule {i}: unknown adaptive options {unknown}")
+            if "min_limit" not in adaptive or "max_limit" not in adaptive:
+                errors.append(f"Rule {i}: adaptive needs 'min_limit' and 'max_limit'")
+            elif adaptive["min_limit"] > adaptive["max_limit"]:
+                errors.append(f"Rule {i}: adaptive 'min_limit' exceeds 'max_limit'")
 
     return errors
@@ -2,19 +2,34 @@
 Tests for Django Rate Limiter algorithms.
 """
 
+import random
 import threading
 import time
-from unittest import TestCase
+from unittest import TestCase, mock, skipUnless
 
 from django_rate_limiter.algorithms import (
+    ZONEINFO_AVAILABLE,
+    ApproximateSlidingWindowRateLimiter,
+    CalendarRateLimiter,
+    CompositeRateLimiter,
+    ConcurrencyRateLimiter,
+    CountMinSketchRateLimiter,
+    DenyCache,
     FixedWindowRateLimiter,
+    GCRARateLimiter,
+    HierarchicalRateLimiter,
+    LeakyBucketRateLimiter,
+    PenaltyRateLimiter,
     SlidingWindowCounterRateLimiter,
     SlidingWindowRateLimiter,
     TokenBucketRateLimiter,
+    discard_denials,
     get_rate_limiter,
 )
-from django_rate_limiter.backends import MemoryBackend
-from django_rate_limiter.exceptions import RateLimitExceeded
+from django_rate_limiter.backends import CacheBackend, MemoryBackend
+from django_rate_limiter.exceptions import ConfigurationError, RateLimitExceeded
+from django_rate_limiter.simulator import NUMPY_AVAILABLE, simulate, simulate_rules
+from django_rate_limiter.utils import check_rate_limit_many, get_rate_limit_status
 
 
 class TestSlidingWindowRateLimiter(TestCase):
@@ -93,6 +108,63 @@ class TestSlidingWindowRateLimiter(TestCase):
         successful = sum(results)
         self.assertEqual(successful, 10)
 
+    def test_large_limit_uses_bounded_histogram(self):
+        """Test that limits above the threshold keep a bucketed histogram."""
+        limiter = SlidingWindowRateLimiter(
+            backend=self.backend, histogram_threshold=10, histogram_buckets=10
+        )
+        key = "rate_limit:slidingwindowratelimiter:test_user"
+
+        with mock.patch("django_rate_limiter.algorithms.time.time") as now:
+            # 100-second window in 10-second buckets
+            for second in range(0, 100, 5):
+                now.return_value = 1000.0 + second
+                self.assertTrue(limiter.is_allowed("test_user", 20, 100)[0])
+
+            now.return_value = 1099.0
+            allowed, metadata = limiter.is_allowed("test_user", 20, 100)
+            self.assertFalse(allowed)
+            # The oldest bucket [1000, 1010) is released at 1110
+            self.assertEqual(metadata["retry_after"], 11)
+
+            state = self.backend.get(key)
+            self.assertEqual(state["bucket_size"], 10.0)
+            self.assertEqual(len(state["buckets"]), 10)
+
+            # The exact log would admit at 1100.5; the histogram is conservative
+            now.return_value = 1100.5
+            self.assertFalse(limiter.is_allowed("test_user", 20, 100)[0])
+            now.return_value = 1110.0
+            self.assertTrue(limiter.is_allowed("test_user", 20, 100)[0])
+
+    def test_representation_follows_threshold(self):
+        """Test that state converts when a limit crosses the threshold."""
+        limiter = SlidingWindowRateLimiter(
+            backend=self.backend, histogram_threshold=10, histogram_buckets=10
+        )
+        key = "rate_limit:slidingwindowratelimiter:test_user"
+
+        with mock.patch("django_rate_limiter.algorithms.time.time") as now:
+            for second in (1000.0, 1001.0, 1012.0):
+                now.return_value = second
+                self.assertTrue(limiter.is_allowed("test_user", 5, 100)[0])
+            self.assertEqual(len(self.backend.get(key)["requests"]), 3)
+
+            now.return_value = 1013.0
+            allowed, metadata = limiter.is_allowed("test_user", 50, 100)
+            self.assertTrue(allowed)
+            self.assertEqual(metadata["current_count"], 4)
+            self.assertEqual(self.backend.get(key)["buckets"], [[100, 2], [101, 2]])
+
+            now.return_value = 1014.0
+            allowed, metadata = limiter.is_allowed("test_user", 5, 100)
+            self.assertTrue(allowed)
+            self.assertEqual(metadata["current_count"], 5)
+            self.assertEqual(
+                self.backend.get(key)["requests"],
+                [1010.0, 1010.0, 1014.0, 1014.0, 1014.0],
+            )
+
 
 class TestTokenBucketRateLimiter(TestCase):
     """Test token bucket rate limiter."""
@@ -208,6 +280,1329 @@ class TestSlidingWindowCounterRateLimiter(TestCase):
         allowed, _ = self.limiter.is_allowed(identifier, limit, window)
         self.assertFalse(allowed)
 
+    def is_allowed_at(self, timestamp, limit=10, window=5):
+        with mock.patch("django_rate_limiter.algorithms.time.time") as now:
+            now.return_value = timestamp
+            return self.limiter.is_allowed("test_user", limit, window)
+
+    def state_at(self, timestamp):
+        with mock.patch("django_rate_limiter.algorithms.time.time") as now:
+            now.return_value = timestamp
+            return self.backend.get(
+                "rate_limit:slidingwindowcounterratelimiter:test_user"
+            )
+
+    def test_ring_layout_rotates_sub_windows(self):
+        """Test that counts live in a fixed-length ring keyed by an epoch."""
+        for _ in range(3):
+            self.assertTrue(self.is_allowed_at(1000.5)[0])
+        for _ in range(7):
+            self.assertTrue(self.is_allowed_at(1002.5)[0])
+
+        state = self.state_at(1002.5)
+        self.assertEqual(state["epoch"], 1002)
+        self.assertEqual(state["counts"], [3, 0, 7, 0, 0])
+
+        # The oldest 3 expire once sub-window 1005 begins
+        allowed, metadata = self.is_allowed_at(1003.2)
+        self.assertFalse(allowed)
+        self.assertEqual(metadata["retry_after"], 2)
+
+        allowed, metadata = self.is_allowed_at(1005.0)
+        self.assertTrue(allowed)
+        self.assertEqual(metadata["current_count"], 8)
+        state = self.state_at(1005.0)
+        self.assertEqual(state["counts"], [1, 0, 7, 0, 0])
+
+    def test_legacy_windows_layout_is_migrated(self):
+        """Test that state from the dict-of-windows layout keeps counting."""
+        self.backend.set(
+            "rate_limit:slidingwindowcounterratelimiter:test_user",
+            {"windows": {"995": 4, "1001": 2, "1002": 3}, "last_cleanup": 1002.0},
+            60,
+        )
+
+        allowed, metadata = self.is_allowed_at(1002.5)
+        self.assertTrue(allowed)
+        self.assertEqual(metadata["current_count"], 6)
+        state = self.state_at(1002.5)
+        self.assertEqual(state["counts"], [0, 2, 4, 0, 0])
+
+
+class TestApproximateSlidingWindowRateLimiter(TestCase):
+    """Test two-window weighted sliding window limiter."""
+
+    def setUp(self):
+        self.backend = MemoryBackend()
+        self.limiter = ApproximateSlidingWindowRateLimiter(backend=self.backend)
+
+    def is_allowed_at(self, timestamp, limit=10, window=60):
+        with mock.patch("django_rate_limiter.algorithms.time.time") as now:
+            now.return_value = timestamp
+            return self.limiter.is_allowed("test_user", limit, window)
+
+    def test_previous_window_is_weighted(self):
+        """Test that the previous window counts by its remaining overlap."""
+        for _ in range(10):
+            self.assertTrue(self.is_allowed_at(6000.0)[0])
+        self.assertFalse(self.is_allowed_at(6030.0)[0])
+
+        # A quarter into the next window, 75% of the previous 10 still count
+        allowed, metadata = self.is_allowed_at(6075.0)
+        self.assertTrue(allowed)
+        self.assertEqual(metadata["current_count"], 9)
+        self.assertTrue(self.is_allowed_at(6075.0)[0])
+
+        allowed, metadata = self.is_allowed_at(6075.0)
+        self.assertFalse(allowed)
+        # Needs the previous weight to drop to 0.7, 3 seconds later
+        self.assertEqual(metadata["retry_after"], 3)
+
+    def test_constant_state(self):
+        """Test that state is two integer counters."""
+        for i in range(5):
+            self.is_allowed_at(6000.0 + i)
+        key = self.limiter._get_key("test_user")
+        with mock.patch("django_rate_limiter.algorithms.time.time") as now:
+            now.return_value = 6005.0
+            self.assertEqual(self.backend.get(f"{key}:6000"), 5)
+
+
+class TestGCRARateLimiter(TestCase):
+    """Test generic cell rate algorithm limiter."""
+
+    def setUp(self):
+        self.backend = MemoryBackend()
+        self.limiter = GCRARateLimiter(backend=self.backend)
+
+    def test_exact_remaining_and_retry_after(self):
+        """Test remaining counts down exactly and retry_after is exact."""
+        for i in range(5):
+            allowed, metadata = self.limiter.is_allowed("test_user", 5, 10)
+            self.assertTrue(allowed)
+            self.assertEqual(metadata["remaining"], 4 - i)
+
+        allowed, metadata = self.limiter.is_allowed("test_user", 5, 10)
+        self.assertFalse(allowed)
+        # One request is emitted every 2 seconds
+        self.assertEqual(metadata["retry_after"], 2)
+
+    def test_single_value_state(self):
+        """Test that the state is one number and denials don't write."""
+        self.limiter.is_allowed("test_user", 2, 10)
+        key = self.limiter._get_key("test_user")
+        tat = self.backend.get(key)
+        self.assertIsInstance(tat, float)
+
+        self.limiter.is_allowed("test_user", 2, 10)
+        stored = self.backend.get(key)
+        self.limiter.is_allowed("test_user", 2, 10)
+        self.assertEqual(self.backend.get(key), stored)
+
+    def test_replenishment(self):
+        """Test that capacity comes back at the emission rate."""
+        for _ in range(2):
+            self.assertTrue(self.limiter.is_allowed("test_user", 2, 1)[0])
+        self.assertFalse(self.limiter.is_allowed("test_user", 2, 1)[0])
+
+        time.sleep(0.6)
+        self.assertTrue(self.limiter.is_allowed("test_user", 2, 1)[0])
+
+    def test_rejects_limit_below_one(self):
+        """Test that a zero limit raises instead of dividing by zero."""
+        for limiter in (self.limiter, LeakyBucketRateLimiter(backend=self.backend)):
+            with self.subTest(limiter=type(limiter).__name__):
+                with self.assertRaises(ValueError):
+                    limiter.is_allowed("test_user", 0, 10)
+                with self.assertRaises(ValueError):
+                    limiter.is_allowed_many([("test_user", 0, 10)])
+                with self.assertRaises(ValueError):
+                    limiter.peek("test_user", 0, 10)
+
+
+class TestLeakyBucketRateLimiter(TestCase):
+    """Test leaky bucket traffic shaping limiter."""
+
+    def setUp(self):
+        self.backend = MemoryBackend()
+
+    def is_allowed_at(self, limiter, timestamp, limit=10, window=10):
+        with mock.patch("django_rate_limiter.algorithms.time.time") as now:
+            now.return_value = timestamp
+            return limiter.is_allowed("test_user", limit, window)
+
+    def test_requests_are_delayed_then_dropped(self):
+        """Test that bursts are scheduled one interval apart up to the queue."""
+        limiter = LeakyBucketRateLimiter(
+            backend=self.backend, max_queue=3, max_delay=None
+        )
+
+        for depth in range(4):
+            allowed, metadata = self.is_allowed_at(limiter, 1000.0)
+            self.assertTrue(allowed)
+            self.assertAlmostEqual(metadata["delay"], float(depth))
+            self.assertEqual(metadata["queue_depth"], depth)
+            self.assertEqual(metadata["remaining"], 3 - depth)
+
+        allowed, metadata = self.is_allowed_at(limiter, 1000.0)
+        self.assertFalse(allowed)
+        self.assertEqual(metadata["retry_after"], 1)
+
+        # One request leaks out every second
+        allowed, metadata = self.is_allowed_at(limiter, 1001.0)
+        self.assertTrue(allowed)
+        self.assertAlmostEqual(metadata["delay"], 3.0)
+
+    def test_max_delay_caps_queue(self):
+        """Test that max_delay bounds how long a request may wait."""
+        limiter = LeakyBucketRateLimiter(backend=self.backend, max_delay=1.5)
+
+        self.assertTrue(self.is_allowed_at(limiter, 1000.0)[0])
+        self.assertTrue(self.is_allowed_at(limiter, 1000.0)[0])
+        self.assertFalse(self.is_allowed_at(limiter, 1000.0)[0])
+
+    def test_default_max_delay(self):
+        """Test that requests wait at most two seconds by default."""
+        limiter = LeakyBucketRateLimiter(backend=self.backend)
+
+        delays = [self.is_allowed_at(limiter, 1000.0, limit=100, window=100)]
+        while delays[-1][0]:
+            delays.append(self.is_allowed_at(limiter, 1000.0, limit=100, window=100))
+        self.assertEqual(len(delays), 4)
+        self.assertAlmostEqual(delays[-2][1]["delay"], 2.0)
+
+    def test_red_drops_early(self):
+        """Test that random early detection drops before the queue is full."""
+        limiter = LeakyBucketRateLimiter(
+            backend=self.backend, max_queue=4, max_delay=None, drop_policy="red"
+        )
+
+        with mock.patch("django_rate_limiter.algorithms.random.random") as rand:
+            rand.return_value = 0.6
+            for _ in range(3):
+                self.assertTrue(self.is_allowed_at(limiter, 1000.0)[0])
+
+            # Depth 3 of 4: drop probability (3 - 2) / 2
+            allowed, metadata = self.is_allowed_at(limiter, 1000.0)
+            self.assertTrue(allowed)
+            self.assertEqual(metadata["queue_depth"], 3)
+
+            rand.return_value = 0.4
+            allowed, metadata = self.is_allowed_at(limiter, 1000.0)
+            self.assertFalse(allowed)
+
+    def test_invalid_drop_policy(self):
+        """Test that unknown drop policies are rejected."""
+        with self.assertRaises(ValueError):
+            LeakyBucketRateLimiter(backend=self.backend, drop_policy="head")
+
+
+class TestConcurrencyRateLimiter(TestCase):
+    """Test concurrency (in-flight) limiter."""
+
+    def setUp(self):
+        self.backend = MemoryBackend()
+        self.limiter = ConcurrencyRateLimiter(backend=self.backend)
+
+    def test_leases_limit_in_flight_requests(self):
+        """Test that only `limit` requests hold a lease at the same time."""
+        allowed, first = self.limiter.is_allowed("test_user", 2, 30)
+        self.assertTrue(allowed)
+        self.assertEqual(first["remaining"], 1)
+        allowed, second = self.limiter.is_allowed("test_user", 2, 30)
+        self.assertTrue(allowed)
+        self.assertNotEqual(first["lease_id"], second["lease_id"])
+
+        allowed, metadata = self.limiter.is_allowed("test_user", 2, 30)
+        self.assertFalse(allowed)
+        self.assertEqual(metadata["retry_after"], 1)
+
+        self.limiter.release("test_user", first["lease_id"], window=30)
+        self.assertTrue(self.limiter.is_allowed("test_user", 2, 30)[0])
+
+    def test_abandoned_lease_expires(self):
+        """Test that a lease never released frees its slot after the TTL."""
+        self.assertTrue(self.limiter.is_allowed("test_user", 1, 1)[0])
+        self.assertFalse(self.limiter.is_allowed("test_user", 1, 1)[0])
+
+        time.sleep(1.1)
+        self.assertTrue(self.limiter.is_allowed("test_user", 1, 1)[0])
+
+    def test_release_is_noop_for_rate_limiters(self):
+        """Test that limiters without leases accept release calls."""
+        limiter = GCRARateLimiter(backend=self.backend)
+        limiter.release("test_user", None, window=30)
+
+
+class TestCompositeRateLimiter(TestCase):
+    """Test burst plus sustained tiers in one check."""
+
+    def setUp(self):
+        self.limiter = CompositeRateLimiter(
+            backend=MemoryBackend(), tiers=[(3, 60)], tier_algorithm="fixed_window"
+        )
+
+    def test_every_tier_must_allow(self):
+        """Test that the tightest tier denies and reports its retry_after."""
+        with mock.patch("time.time", return_value=1200.0):
+            self.assertTrue(self.limiter.is_allowed("test_user", 2, 1)[0])
+            self.assertTrue(self.limiter.is_allowed("test_user", 2, 1)[0])
+
+            # The burst tier is exhausted
+            allowed, metadata = self.limiter.is_allowed("test_user", 2, 1)
+            self.assertFalse(allowed)
+            self.assertEqual(metadata["retry_after"], 1)
+            self.assertEqual(len(metadata["tiers"]), 2)
+
+        with mock.patch("time.time", return_value=1201.0):
+            self.assertTrue(self.limiter.is_allowed("test_user", 2, 1)[0])
+            # The sustained tier is exhausted until the minute ends
+            allowed, metadata = self.limiter.is_allowed("test_user", 2, 1)
+            self.assertFalse(allowed)
+            self.assertEqual(metadata["retry_after"], 59)
+
+    def test_denied_tier_leaks_no_quota(self):
+        """Test that a denial consumes nothing from the tiers that allowed."""
+        with mock.patch("time.time", return_value=1200.0):
+            self.assertFalse(self.limiter.is_allowed("test_user", 2, 1, cost=4)[0])
+            for _ in range(2):
+                self.assertTrue(self.limiter.is_allowed("test_user", 2, 1)[0])
+
+    def test_allowing_tier_is_unchanged_by_denial(self):
+        """Test that a tier that would allow keeps its quota when another denies."""
+        tier_limiter = self.limiter.tier_limiter
+
+        def remaining(identifier, limit, window):
+            scope = f"{limit}/{window}"
+            return tier_limiter.peek(identifier, limit, window, scope)[1]["remaining"]
+
+        with mock.patch("time.time", return_value=1200.0):
+            # The burst tier denies a cost of 3, the sustained tier would allow
+            self.assertFalse(self.limiter.is_allowed("burst", 2, 1, cost=3)[0])
+            self.assertEqual(remaining("burst", 3, 60), 3)
+
+            for _ in range(2):
+                self.assertTrue(self.limiter.is_allowed("sustained", 2, 1)[0])
+
+        with mock.patch("time.time", return_value=1201.0):
+            # The burst tier would allow a cost of 2, the sustained tier denies
+            self.assertFalse(self.limiter.is_allowed("sustained", 2, 1, cost=2)[0])
+            self.assertEqual(remaining("sustained", 2, 1), 2)
+            self.assertEqual(remaining("sustained", 3, 60), 1)
+
+    def test_tiers_need_a_batched_algorithm(self):
+        """Test that tiers checked one by one are rejected."""
+        for algorithm in ("concurrency", "composite", "hierarchical", "count_min"):
+            with self.subTest(algorithm=algorithm):
+                with self.assertRaises(ValueError):
+                    CompositeRateLimiter(tiers=[(10, 60)], tier_algorithm=algorithm)
+
+    def test_denial_leaves_every_tier_algorithm_unchanged(self):
+        """Test that no tier algorithm leaks quota when another tier denies."""
+        for algorithm in (
+            "sliding_window",
+            "token_bucket",
+            "fixed_window",
+            "sliding_counter",
+            "sliding_approx",
+            "gcra",
+            "calendar",
+            "penalty",
+        ):
+            with self.subTest(algorithm=algorithm), mock.patch(
+                "time.time", return_value=1200.0
+            ):
+                limiter = CompositeRateLimiter(
+                    backend=MemoryBackend(), tiers=[(10, 60)], tier_algorithm=algorithm
+                )
+                self.assertTrue(limiter.is_allowed("test_user", 1, 3600)[0])
+                self.assertFalse(limiter.is_allowed("test_user", 1, 3600)[0])
+                _, status = limiter.tier_limiter.peek("test_user", 10, 60, "10/60")
+                self.assertEqual(
+                    status.get("remaining", status.get("remaining_tokens")), 9
+                )
+
+
+class TestHierarchicalRateLimiter(TestCase):
+    """Test quotas charged up a chain of parents."""
+
+    PARENTS = {
+        "key:abc": ("user:42", 3, 60),
+        "user:42": ("org:acme", 4, 60),
+        "user:7": ("org:acme", 4, 60),
+    }
+
+    def setUp(self):
+        self.get_parent = mock.Mock(side_effect=self.PARENTS.get)
+        self.limiter = HierarchicalRateLimiter(
+            backend=MemoryBackend(), get_parent=self.get_parent
+        )
+
+    def test_denies_at_first_exhausted_level(self):
+        """Test that each level's quota applies and denials charge nothing."""
+        with mock.patch("time.time", return_value=1200.0):
+            for _ in range(3):
+                self.assertTrue(self.limiter.is_allowed("key:abc", 10, 60)[0])
+
+            allowed, metadata = self.limiter.is_allowed("key:abc", 10, 60)
+            self.assertFalse(allowed)
+            self.assertEqual(metadata["exhausted_level"], "user:42")
+            self.assertEqual(metadata["retry_after"], 60)
+
+            # The organization still has one request left for another user
+            self.assertTrue(self.limiter.is_allowed("user:7", 10, 60)[0])
+            allowed, metadata = self.limiter.is_allowed("user:7", 10, 60)
+            self.assertFalse(allowed)
+            self.assertEqual(metadata["exhausted_level"], "org:acme")
+
+            allowed, metadata = self.limiter.is_allowed("key:abc", 10, 60)
+            self.assertEqual(metadata["exhausted_level"], "user:42")
+            self.assertEqual(
+                [level["current_count"] for level in metadata["levels"]], [3, 3, 4]
+            )
+
+    def test_parents_are_cached(self):
+        """Test that parent lookups are cached until invalidated."""
+        self.limiter.is_allowed("key:abc", 10, 60)
+        self.limiter.is_allowed("key:abc", 10, 60)
+        self.assertEqual(self.get_parent.call_count, 3)
+
+        self.limiter.invalidate_parents("key:abc")
+        self.limiter.is_allowed("key:abc", 10, 60)
+        self.assertEqual(self.get_parent.call_count, 4)
+
+    def test_parent_cache_is_bounded(self):
+        """Test that the least recently used parents are evicted."""
+        self.limiter.max_cached_parents = 2
+        for identifier in ("user:1", "user:2", "user:3"):
+            self.limiter.is_allowed(identifier, 10, 60)
+        self.assertEqual(list(self.limiter._parents), ["user:2", "user:3"])
+
+        self.limiter.is_allowed("user:2", 10, 60)
+        self.limiter.is_allowed("key:abc", 10, 60)
+        self.assertEqual(len(self.limiter._parents), 2)
+        self.assertNotIn("user:3", self.limiter._parents)
+
+    def test_keys_share_the_root_hash_tag(self):
+        """Test that every key of a chain carries the root identifier."""
+        with mock.patch.object(
+            self.limiter.backend, "chain_increment", return_value=(True, [1, 1, 1])
+        ) as chain_increment:
+            self.limiter.is_allowed("key:abc", 10, 60)
+        keys = chain_increment.call_args[0][0]
+        self.assertEqual(len(keys), 3)
+        self.assertTrue(all("{org:acme}" in key for key in keys))
+
+
+class TestLocalTokenLeasing(TestCase):
+    """Test spending tokens leased in blocks from the shared backend."""
+
+    def run_workers(self, limiter_class, requests, step=0.0001):
+        """Alternate requests between two workers sharing one backend."""
+        backend = MemoryBackend()
+        workers = [
+            limiter_class(backend=backend, local_lease=True, max_lease_size=100)
+            for _ in range(2)
+        ]
+        allowed = 0
+        with mock.patch.object(
+            backend, "atomic_update", wraps=backend.atomic_update
+        ) as atomic_update:
+            for i in range(requests):
+                with mock.patch("time.time", return_value=1200.0 + i * step):
+                    allowed += workers[i % 2].is_allowed("service", 1000, 60)[0]
+        return workers, backend, allowed, atomic_update.call_count
+
+    def test_global_limit_holds_with_few_backend_calls(self):
+        """Test that leased blocks keep the limit with far fewer round trips."""
+        for limiter_class in (FixedWindowRateLimiter, TokenBucketRateLimiter):
+            with self.subTest(limiter=limiter_class.__name__):
+                _, _, allowed, calls = self.run_workers(limiter_class, 900)
+                self.assertEqual(allowed, 900)
+                self.assertLess(calls, 50)
+
+                # Tokens stranded in the other worker's lease may be denied
+                _, _, allowed, _ = self.run_workers(limiter_class, 1200)
+                self.assertGreater(allowed, 900)
+                self.assertLessEqual(allowed, 1001)
+
+    def test_unused_tokens_are_returned(self):
+        """Test that return_leases and idle leases give tokens back."""
+        workers, backend, _, _ = self.run_workers(FixedWindowRateLimiter, 30)
+        key = "rate_limit:fixedwindowratelimiter:service:1200"
+
+        with mock.patch("time.time", return_value=1202.0):
+            self.assertGreater(backend.get(key)["count"], 30)
+            workers[0].return_leases()
+            # The other worker's lease has been idle for lease_ttl
+            self.assertTrue(workers[1].is_allowed("other", 1000, 60)[0])
+            self.assertEqual(backend.get(key)["count"], 30)
+
+    def test_lease_metadata(self):
+        """Test that locally served requests report leased tokens."""
+        limiter = FixedWindowRateLimiter(backend=MemoryBackend(), local_lease=True)
+        with mock.patch("time.time", return_value=1200.0):
+            limiter.is_allowed("service", 100, 60)
+            allowed, metadata = limiter.is_allowed("service", 100, 60)
+        self.assertTrue(allowed)
+        self.assertIn("leased_tokens", metadata)
+        self.assertEqual(metadata["remaining"], 98)
+
+
+class TestSampledChecks(TestCase):
+    """Test checking clients far below their limit once every N requests."""
+
+    LIMITERS = (
+        SlidingWindowRateLimiter,
+        FixedWindowRateLimiter,
+        SlidingWindowCounterRateLimiter,
+        ApproximateSlidingWindowRateLimiter,
+    )
+
+    def test_backend_is_checked_once_per_sample(self):
+        """Test that skipped requests are charged together on the next check."""
+        for limiter_class in self.LIMITERS:
+            with self.subTest(limiter=limiter_class.__name__), mock.patch(
+                "time.time", return_value=1200.0
+            ):
+                limiter = limiter_class(backend=MemoryBackend(), sample_fraction=0.01)
+                with mock.patch.object(
+                    limiter, "_exact_is_allowed", wraps=limiter._exact_is_allowed
+                ) as exact:
+                    for _ in range(1000):
+                        allowed, metadata = limiter.is_allowed("client", 10000, 3600)
+                        self.assertTrue(allowed)
+
+                # N starts at 99 and shrinks with what remains
+                self.assertEqual(exact.call_count, 11)
+                self.assertEqual(metadata["sample_rate"], 90)
+                self.assertEqual(metadata["remaining"], 9000)
+                # The last 45 requests are charged on the next check
+                _, status = limiter.peek("client", 10000, 3600)
+                self.assertEqual(status["remaining"], 9045)
+
+    def test_checks_become_exact_near_the_limit(self):
+        """Test that the limit holds once the sample rate drops to 1."""
+        for limiter_class in self.LIMITERS:
+            with self.subTest(limiter=limiter_class.__name__), mock.patch(
+                "time.time", return_value=1200.0
+            ):
+                limiter = limiter_class(backend=MemoryBackend(), sample_fraction=0.01)
+                results = [limiter.is_allowed("client", 300, 3600) for _ in range(400)]
+                self.assertEqual(sum(allowed for allowed, _ in results), 300)
+                allowed, metadata = results[-1]
+                self.assertFalse(allowed)
+                self.assertEqual(metadata["sample_rate"], 1)
+
+    def test_workers_share_the_limit(self):
+        """Test that uncounted requests of several workers stay bounded."""
+        backend = MemoryBackend()
+        workers = [
+            FixedWindowRateLimiter(backend=backend, sample_fraction=0.01)
+            for _ in range(4)
+        ]
+        with mock.patch("time.time", return_value=1200.0):
+            allowed = sum(
+                workers[i % 4].is_allowed("client", 1000, 3600)[0] for i in range(2000)
+            )
+        self.assertGreaterEqual(allowed, 1000)
+        self.assertLessEqual(allowed, 1010)
+
+    def test_denied_catch_up_charges_skipped_requests(self):
+        """Test that served requests are charged even when the check is denied."""
+        for limiter_class in self.LIMITERS:
+            with self.subTest(limiter=limiter_class.__name__), mock.patch(
+                "time.time", return_value=1200.0
+            ):
+                backend = MemoryBackend()
+                sampled = limiter_class(backend=backend, sample_fraction=0.01)
+                exact = limiter_class(backend=backend)
+                # One check, then eight requests allowed locally
+                for _ in range(9):
+                    self.assertTrue(sampled.is_allowed("client", 1000, 3600)[0])
+                self.assertTrue(exact.is_allowed("client", 1000, 3600, cost=995)[0])
+
+                # Nine units don't fit in the four left; four are charged
+                self.assertFalse(sampled.is_allowed("client", 1000, 3600)[0])
+                self.assertFalse(exact.is_allowed("client", 1000, 3600)[0])
+                _, status = exact.peek("client", 1000, 3600)
+                self.assertEqual(status["remaining"], 0)
+
+    def test_invalid_configuration(self):
+        """Test that sampling rejects bad fractions, rates and leasing."""
+        with self.assertRaises(ValueError):
+            FixedWindowRateLimiter(sample_fraction=1.5)
+        with self.assertRaises(ValueError):
+            FixedWindowRateLimiter(sample_fraction=0.01, max_sample_rate=0)
+        with self.assertRaises(ValueError):
+            FixedWindowRateLimiter(local_lease=True, sample_fraction=0.01)
+
+
+class TestSplitCounters(TestCase):
+    """Test spreading the counters of hot keys across sub-keys."""
+
+    KEY = "rate_limit:fixedwindowratelimiter:service:1200"
+
+    def test_configured_hot_key_is_split(self):
+        """Test that a hot key writes to sub-keys and keeps its limit."""
+        backend = MemoryBackend()
+        limiter = FixedWindowRateLimiter(
+            backend=backend, split_counters=4, hot_keys=["service"]
+        )
+        with mock.patch("time.time", return_value=1200.0):
+            results = [limiter.is_allowed("service", 100, 60) for _ in range(150)]
+            self.assertEqual(sum(allowed for allowed, _ in results), 100)
+            self.assertEqual(results[99][1]["remaining"], 0)
+            self.assertEqual(results[-1][1]["current_count"], 100)
+
+            self.assertTrue(backend.get(self.KEY)["split"])
+            counts = backend.get_many(limiter._split_keys(self.KEY))
+            self.assertGreater(len(counts), 1)
+            self.assertEqual(sum(value["count"] for value in counts.values()), 100)
+            self.assertEqual(limiter.peek("service", 100, 60)[1]["current_count"], 100)
+
+    def test_workers_follow_a_detected_split(self):
+        """Test that a worker finding the flag sums the sub-keys as well."""
+        backend = MemoryBackend()
+        detecting = FixedWindowRateLimiter(
+            backend=backend, split_counters=4, hot_key_rate=5, split_cache_ttl=0
+        )
+        other = FixedWindowRateLimiter(
+            backend=backend, split_counters=4, split_cache_ttl=0
+        )
+        allowed = 0
+        with mock.patch("time.time", return_value=1200.0):
+            for i in range(100):
+                worker = detecting if i < 10 or i % 2 else other
+                allowed += worker.is_allowed("service", 50, 60)[0]
+            self.assertEqual(allowed, 50)
+            self.assertTrue(other._is_split(self.KEY))
+            # Five requests were counted before the split
+            self.assertEqual(backend.get(self.KEY)["count"], 5)
+
+        # The next window starts unsplit
+        with mock.patch("time.time", return_value=1260.0):
+            other.is_allowed("service", 50, 60)
+            next_window = backend.get("rate_limit:fixedwindowratelimiter:service:1260")
+            self.assertEqual(next_window["count"], 1)
+            self.assertNotIn("split", next_window)
+
+    def test_sub_keys_use_distinct_cluster_slots(self):
+        """Test that the sub-keys of a key hash to different slots."""
+        limiter = FixedWindowRateLimiter(split_counters=16)
+        slots = {_key_slot(key) for key in limiter._split_keys(self.KEY)}
+        self.assertEqual(len(slots), 16)
+
+        # Shard i of every hot key must not share one slot
+        other_slots = {
+            _key_slot(key)
+            for key in limiter._split_keys(self.KEY.replace("service", "other"))
+        }
+        self.assertLessEqual(len(slots & other_slots), 1)
+
+    def test_batched_limiters_reject_split_counters(self):
+        """Test that tiers and penalties can't run over split windows."""
+        with self.assertRaises(ValueError):
+            CompositeRateLimiter(
+                tiers=[(2, 3600)],
+                tier_algorithm="fixed_window",
+                split_counters=4,
+                hot_keys=["u"],
+            )
+        with self.assertRaises(ValueError):
+            PenaltyRateLimiter(inner_algorithm="fixed_window", split_counters=4)
+
+
+def _key_slot(key):
+    """Return the Redis Cluster slot of a key."""
+    if "{" in key:
+        start = key.index("{") + 1
+        end = key.find("}", start)
+        if end > start:
+            key = key[start:end]
+    crc = 0
+    for byte in key.encode():
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021 if crc & 0x8000 else crc << 1) & 0xFFFF
+    return crc % 16384
+
+
+class TestCountMinSketchRateLimiter(TestCase):
+    """Test the count-min sketch limiter."""
+
+    def setUp(self):
+        self.backend = MemoryBackend()
+        self.limiter = CountMinSketchRateLimiter(
+            backend=self.backend, width=64, depth=3
+        )
+
+    def test_limits_each_identifier(self):
+        """Test that each identifier gets its own limit."""
+        with mock.patch("time.time", return_value=1200.0):
+            for _ in range(3):
+                self.assertTrue(self.limiter.is_allowed("1.2.3.4", 3, 60)[0])
+            allowed, metadata = self.limiter.is_allowed("1.2.3.4", 3, 60)
+            self.assertFalse(allowed)
+            self.assertEqual(metadata["retry_after"], 60)
+            self.assertTrue(self.limiter.is_allowed("5.6.7.8", 3, 60)[0])
+
+    def test_constant_state_and_no_undercount(self):
+        """Test one fixed-size entry per window that never undercounts."""
+        with mock.patch("time.time", return_value=1200.0):
+            admitted = {}
+            for i in range(2000):
+                identifier = f"10.0.{i % 500 // 256}.{i % 256}"
+                if self.limiter.is_allowed(identifier, 3, 60)[0]:
+                    admitted[identifier] = admitted.get(identifier, 0) + 1
+            self.assertLessEqual(max(admitted.values()), 3)
+            self.assertEqual(len(self.backend._data), 1)
+            self.assertEqual(
+                len(self.backend.get("rate_limit:countminsketchratelimiter:1200")),
+                64 * 3,
+            )
+
+    def test_invalid_dimensions(self):
+        """Test that the sketch needs at least one counter."""
+        with self.assertRaises(ValueError):
+            CountMinSketchRateLimiter(width=0)
+
+
+class TestCalendarRateLimiter(TestCase):
+    """Test calendar-aligned quotas and their bucket rollups."""
+
+    def setUp(self):
+        self.backend = MemoryBackend()
+
+    @skipUnless(ZONEINFO_AVAILABLE, "zoneinfo is not available")
+    def test_month_resets_at_local_midnight(self):
+        """Test that a monthly quota resets on the first in its time zone."""
+        limiter = CalendarRateLimiter(backend=self.backend, timezone="America/New_York")
+        # 2026-01-31 23:00 and 2026-02-01 00:00 in New York (UTC-5)
+        with mock.patch("time.time", return_value=1769918400.0):
+            self.assertTrue(limiter.is_allowed("user", 2, 2592000)[0])
+            self.assertTrue(limiter.is_allowed("user", 2, 2592000)[0])
+            allowed, metadata = limiter.is_allowed("user", 2, 2592000)
+        self.assertFalse(allowed)
+        self.assertEqual(metadata["retry_after"], 3600)
+        self.assertEqual(metadata["window_start"], 1767243600)
+
+        with mock.patch("time.time", return_value=1769922000.0):
+            allowed, metadata = limiter.is_allowed("user", 2, 2592000)
+        self.assertTrue(allowed)
+        self.assertEqual(metadata["remaining"], 1)
+        self.assertEqual(metadata["reset_time"], 1772341200)
+
+    @skipUnless(ZONEINFO_AVAILABLE, "zoneinfo is not available")
+    def test_periods_follow_the_wall_clock(self):
+        """Test week and day bounds across a daylight saving change."""
+        limiter = CalendarRateLimiter(timezone="America/New_York", week_start=6)
+        # Noon on Tuesday 2026-03-10; clocks moved forward on Sunday 03-08
+        start, end = limiter.period_bounds(1773158400, "week")
+        self.assertEqual((start, end), (1772946000, 1773547200))
+        self.assertEqual(end - start, 7 * 86400 - 3600)
+        self.assertEqual(
+            limiter.period_bounds(1772946000, "day")[1] - 1772946000, 82800
+        )
+
+    def test_rolling_window_keeps_bounded_state(self):
+        """Test that old buckets roll up and the count never undercounts."""
+        limiter = CalendarRateLimiter(backend=self.backend, rolling=True)
+        key = "rate_limit:calendarratelimiter:user:172800"
+        for minute in range(3 * 1440):
+            with mock.patch("time.time", return_value=1000.0 + minute * 60):
+                _, metadata = limiter.is_allowed("user", 10**6, 172800)
+                stored = self.backend.get(key)
+        self.assertLessEqual(len(stored["minutes"]), 61)
+        self.assertLessEqual(len(stored["hours"]), 24)
+        self.assertLessEqual(len(stored["days"]), 3)
+        # Two days of one request a minute, plus at most the edge day bucket
+        self.assertGreaterEqual(metadata["current_count"], 2880)
+        self.assertLessEqual(metadata["current_count"], 2880 + 1440)
+
+    def test_rolling_denial_waits_for_the_oldest_bucket(self):
+        """Test retry_after of a rolling window at minute resolution."""
+        limiter = CalendarRateLimiter(backend=self.backend, rolling=True)
+        with mock.patch("time.time", return_value=1210.0):
+            for _ in range(3):
+                self.assertTrue(limiter.is_allowed("user", 3, 600)[0])
+        with mock.patch("time.time", return_value=1500.0):
+            allowed, metadata = limiter.is_allowed("user", 3, 600)
+        self.assertFalse(allowed)
+        # The bucket of minute 1200-1260 leaves the window at 1860
+        self.assertEqual(metadata["retry_after"], 360)
+        with mock.patch("time.time", return_value=1860.0):
+            self.assertTrue(limiter.is_allowed("user", 3, 600)[0])
+
+    def test_invalid_configuration(self):
+        """Test rejected periods, windows and time zones."""
+        with self.assertRaises(ValueError):
+            CalendarRateLimiter(period="year")
+        with self.assertRaises(ValueError):
+            CalendarRateLimiter(period="day", rolling=True)
+        with self.assertRaises(ValueError):
+            CalendarRateLimiter(week_start=7)
+        with self.assertRaises(ValueError):
+            CalendarRateLimiter(timezone="Not/AZone")
+        with self.assertRaises(ValueError):
+            CalendarRateLimiter().is_allowed("user", 10, 1000)
+
+
+class TestPenaltyRateLimiter(TestCase):
+    """Test escalating blocks for repeat offenders."""
+
+    PENALTY_KEY = "rate_limit:penaltyratelimiter:bot:penalty"
+
+    def setUp(self):
+        self.backend = MemoryBackend()
+        self.limiter = PenaltyRateLimiter(
+            backend=self.backend,
+            inner_algorithm="fixed_window",
+            base_penalty=100,
+            max_penalty=1000,
+            penalty_threshold=1,
+            penalty_decay=3600,
+        )
+
+    def _exhaust(self, now):
+        """Use up a window at now and return the denied request's metadata."""
+        with mock.patch("time.time", return_value=now):
+            self.assertTrue(self.limiter.is_allowed("bot", 2, 60)[0])
+            self.assertTrue(self.limiter.is_allowed("bot", 2, 60)[0])
+            allowed, metadata = self.limiter.is_allowed("bot", 2, 60)
+        self.assertFalse(allowed)
+        return metadata
+
+    def test_blocks_escalate_and_decay(self):
+        """Test that every violation past the threshold doubles the block."""
+        now = 1200.0
+        retry_afters = []
+        for _ in range(6):
+            metadata = self._exhaust(now)
+            retry_afters.append(metadata["retry_after"])
+            now += metadata["retry_after"]
+        # The first violation only waits for the window; the cap is 1000
+        self.assertEqual(retry_afters, [60, 100, 200, 400, 800, 1000])
+        self.assertEqual(metadata["violations"], 6)
+        with mock.patch("time.time", return_value=now):
+            self.assertEqual(
+                self.backend.get(self.PENALTY_KEY),
+                {"violations": 6, "blocked_until": now},
+            )
+
+        # Two decay periods forgive two violations
+        metadata = self._exhaust(now + 7200)
+        self.assertEqual(metadata["violations"], 5)
+        self.assertEqual(metadata["retry_after"], 800)
+
+    def test_blocked_requests_skip_the_inner_limiter(self):
+        """Test that a block denies in one batch without touching the window."""
+        self._exhaust(1200.0)
+        metadata = self._exhaust(1260.0)
+        self.assertEqual(metadata["blocked_until"], 1360.0)
+
+        with mock.patch("time.time", return_value=1320.0), mock.patch.object(
+            self.backend, "atomic_update_many", wraps=self.backend.atomic_update_many
+        ) as atomic_update_many:
+            allowed, metadata = self.limiter.is_allowed("bot", 2, 60)
+            self.assertIsNone(
+                self.backend.get("rate_limit:fixedwindowratelimiter:bot:1320")
+            )
+        self.assertFalse(allowed)
+        self.assertEqual(metadata["retry_after"], 40)
+        self.assertEqual(metadata["violations"], 2)
+        atomic_update_many.assert_called_once()
+
+        with mock.patch("time.time", return_value=1360.0):
+            self.assertTrue(self.limiter.is_allowed("bot", 2, 60)[0])
+            self.assertTrue(self.limiter.is_allowed("other", 2, 60)[0])
+            self.assertIsNone(
+                self.backend.get("rate_limit:penaltyratelimiter:other:penalty")
+            )
+
+    def test_invalid_configuration(self):
+        """Test rejected penalties and inner algorithms."""
+        with self.assertRaises(ValueError):
+            PenaltyRateLimiter(base_penalty=0)
+        with self.assertRaises(ValueError):
+            PenaltyRateLimiter(penalty_factor=0.5)
+        with self.assertRaises(ValueError):
+            PenaltyRateLimiter(penalty_decay=0)
+        with self.assertRaises(ValueError):
+            PenaltyRateLimiter(inner_algorithm="concurrency")
+
+
+class TestDenyCache(TestCase):
+    """Test the in-process deny cache consulted by enforce."""
+
+    def setUp(self):
+        self.backend = MemoryBackend()
+        self.limiter = FixedWindowRateLimiter(backend=self.backend)
+        self.limiter.deny_cache = DenyCache(max_size=2)
+
+    def test_denied_clients_skip_the_backend(self):
+        """Test that repeated denials are answered without a backend call."""
+        with mock.patch("time.time", return_value=1200.0):
+            self.limiter.enforce("test_user", 1, 60)
+            with mock.patch.object(
+                self.backend, "atomic_update", wraps=self.backend.atomic_update
+            ) as atomic_update:
+                for _ in range(5):
+                    with self.assertRaises(RateLimitExceeded) as raised:
+                        self.limiter.enforce("test_user", 1, 60)
+                    self.assertEqual(raised.exception.retry_after, 60)
+            self.assertEqual(atomic_update.call_count, 1)
+            self.assertEqual(self.limiter.deny_cache.hits, 4)
+
+        # The denial expires with retry_after
+        with mock.patch("time.time", return_value=1260.0):
+            self.limiter.enforce("test_user", 1, 60)
+
+    def test_cheaper_requests_and_size_bound(self):
+        """Test that cached denials respect cost and the size bound."""
+        cache = DenyCache(max_size=2)
+        with mock.patch("time.time", return_value=1200.0):
+            cache.add("a", 5, {"retry_after": 10})
+            self.assertIsNone(cache.get("a", cost=1))
+            self.assertEqual(cache.get("a", cost=5)["retry_after"], 10)
+
+            cache.add("b", 1, {"retry_after": 10})
+            cache.add("c", 1, {"retry_after": 10})
+            self.assertIsNone(cache.get("a", cost=5))
+            self.assertIsNotNone(cache.get("c"))
+
+    def test_concurrency_denials_are_not_cached(self):
+        """Test that in-flight denials always ask the backend."""
+        limiter = ConcurrencyRateLimiter(backend=MemoryBackend())
+        limiter.deny_cache = DenyCache()
+        metadata = limiter.enforce("test_user", 1, 30)
+        with self.assertRaises(RateLimitExceeded):
+            limiter.enforce("test_user", 1, 30)
+
+        limiter.release("test_user", metadata["lease_id"], window=30)
+        limiter.enforce("test_user", 1, 30)
+
+    def test_contended_denials_are_not_cached(self):
+        """Test that a denial from a contended lock always asks again."""
+        backend = CacheBackend(lock_timeout=0.01)
+        backend.cache.clear()
+        limiter = FixedWindowRateLimiter(backend=backend)
+        limiter.deny_cache = DenyCache()
+        key = f"{limiter._get_key('test_user')}:{int(time.time() // 3600) * 3600}"
+
+        backend.cache.add(f"{key}:lock", "other-worker", 5)
+        with self.assertRaises(RateLimitExceeded):
+            limiter.enforce("test_user", 100, 3600)
+        backend.cache.delete(f"{key}:lock")
+
+        limiter.enforce("test_user", 100, 3600)
+        self.assertEqual(limiter.deny_cache.hits, 0)
+
+    def test_discard_denials(self):
+        """Test forgetting a key's denials in every deny cache."""
+        caches = [DenyCache(), DenyCache()]
+        for cache in caches:
+            cache.add("rl:user", 1, {"retry_after": 60})
+            cache.add("rl:user:1/60", 1, {"retry_after": 60})
+            cache.add("rl:user2:1/60", 1, {"retry_after": 60})
+
+        discard_denials("rl:user")
+        for cache in caches:
+            self.assertIsNotNone(cache.get("rl:user"))
+            self.assertIsNone(cache.get("rl:user:1/60"))
+            self.assertIsNotNone(cache.get("rl:user2:1/60"))
+
+
+class TestRequestCost(TestCase):
+    """Test weighted request cost across algorithms."""
+
+    def test_cost_is_charged_by_every_algorithm(self):
+        """Test that a request of cost n consumes n units of the limit."""
+        for algorithm in (
+            "sliding_window",
+            "token_bucket",
+            "fixed_window",
+            "sliding_counter",
+            "sliding_approx",
+            "gcra",
+            "concurrency",
+        ):
+            with self.subTest(algorithm=algorithm):
+                limiter = get_rate_limiter(algorithm, backend=MemoryBackend())
+                self.assertTrue(limiter.is_allowed("test_user", 10, 60, cost=4)[0])
+                self.assertTrue(limiter.is_allowed("test_user", 10, 60, cost=4)[0])
+
+                allowed, metadata = limiter.is_allowed("test_user", 10, 60, cost=4)
+                self.assertFalse(allowed)
+                self.assertGreaterEqual(metadata["retry_after"], 1)
+
+                self.assertTrue(limiter.is_allowed("test_user", 10, 60, cost=2)[0])
+                self.assertFalse(limiter.is_allowed("test_user", 10, 60)[0])
+
+    def test_histogram_sliding_log_charges_cost(self):
+        """Test that the bucketed sliding log also counts cost."""
+        limiter = SlidingWindowRateLimiter(
+            backend=MemoryBackend(), histogram_threshold=10
+        )
+        self.assertTrue(limiter.is_allowed("test_user", 100, 60, cost=60)[0])
+        self.assertFalse(limiter.is_allowed("test_user", 100, 60, cost=41)[0])
+        self.assertTrue(limiter.is_allowed("test_user", 100, 60, cost=40)[0])
+
+    def test_enforce_passes_cost(self):
+        """Test that enforce charges the cost."""
+        limiter = FixedWindowRateLimiter(backend=MemoryBackend())
+        metadata = limiter.enforce("test_user", 10, 60, cost=7)
+        self.assertEqual(metadata["remaining"], 3)
+        with self.assertRaises(RateLimitExceeded):
+            limiter.enforce("test_user", 10, 60, cost=4)
+
+    def test_rejects_cost_below_one(self):
+        """Test that zero and negative costs can't skip or refund the limit."""
+        for algorithm in (
+            "sliding_window",
+            "token_bucket",
+            "fixed_window",
+            "sliding_counter",
+            "sliding_approx",
+            "gcra",
+            "leaky_bucket",
+            "concurrency",
+            "calendar",
+            "penalty",
+            "count_min",
+        ):
+            limiter = get_rate_limiter(algorithm, backend=MemoryBackend())
+            for cost in (0, -10):
+                with self.subTest(algorithm=algorithm, cost=cost):
+                    with self.assertRaises(ValueError):
+                        limiter.is_allowed("test_user", 3, 60, cost=cost)
+                    with self.assertRaises(ValueError):
+                        limiter.enforce("test_user", 3, 60, cost=cost)
+                    with self.assertRaises(ValueError):
+                        limiter.is_allowed_many([("test_user", 3, 60, "", cost)])
+                    with self.assertRaises(ValueError):
+                        limiter.peek("test_user", 3, 60, cost=cost)
+
+        limiter = FixedWindowRateLimiter(backend=MemoryBackend())
+        self.assertTrue(limiter.is_allowed("test_user", 3, 60)[0])
+        self.assertEqual(limiter.peek("test_user", 3, 60)[1]["remaining"], 2)
+
+
+class TestBatchEvaluation(TestCase):
+    """Test evaluating several checks with is_allowed_many."""
+
+    ALGORITHMS = (
+        "sliding_window",
+        "token_bucket",
+        "fixed_window",
+        "sliding_counter",
+        "sliding_approx",
+        "gcra",
+        "concurrency",
+        "calendar",
+        "penalty",
+    )
+
+    def test_batch_matches_sequential_checks(self):
+        """Test that checks run in order and repeated keys see earlier ones."""
+        for algorithm in self.ALGORITHMS:
+            with self.subTest(algorithm=algorithm):
+                limiter = get_rate_limiter(algorithm, backend=MemoryBackend())
+                results = limiter.is_allowed_many(
+                    [
+                        ("user_a", 2, 60),
+                        ("user_a", 2, 60),
+                        ("user_a", 2, 60),
+                        ("user_b", 2, 60, "search", 2),
+                    ]
+                )
+                self.assertEqual(
+                    [allowed for allowed, _ in results], [True, True, False, True]
+                )
+                self.assertGreaterEqual(results[2][1]["retry_after"], 1)
+                self.assertFalse(limiter.is_allowed("user_b", 2, 60, "search")[0])
+
+    def test_all_or_nothing_consumes_nothing_when_denied(self):
+        """Test that a denied all-or-nothing batch leaves state untouched."""
+        for algorithm in self.ALGORITHMS:
+            with self.subTest(algorithm=algorithm):
+                limiter = get_rate_limiter(algorithm, backend=MemoryBackend())
+                limiter.is_allowed("user_b", 1, 60)
+                results = limiter.is_allowed_many(
+                    [("user_a", 1, 60), ("user_b", 1, 60)], all_or_nothing=True
+                )
+                self.assertEqual([allowed for allowed, _ in results], [False, False])
+                self.assertGreaterEqual(results[0][1]["retry_after"], 1)
+                self.assertTrue(limiter.is_allowed("user_a", 1, 60)[0])
+
+                results = limiter.is_allowed_many(
+                    [("user_c", 1, 60), ("user_d", 1, 60)], all_or_nothing=True
+                )
+                self.assertEqual([allowed for allowed, _ in results], [True, True])
+
+    def test_all_or_nothing_needs_a_batch(self):
+        """Test that limiters that can't batch or release refuse all or nothing."""
+        for limiter in (
+            CountMinSketchRateLimiter(backend=MemoryBackend()),
+            HierarchicalRateLimiter(backend=MemoryBackend()),
+            FixedWindowRateLimiter(
+                backend=MemoryBackend(), split_counters=4, hot_keys=["a", "b"]
+            ),
+        ):
+            with self.subTest(limiter=limiter.__class__.__name__), mock.patch(
+                "time.time", return_value=1200.0
+            ):
+                limiter.is_allowed("a", 5, 60)
+                with self.assertRaises(ValueError):
+                    limiter.is_allowed_many(
+                        [("a", 5, 60), ("b", 1, 60), ("b", 1, 60)],
+                        all_or_nothing=True,
+                    )
+                self.assertEqual(limiter.peek("a", 5, 60)[1]["remaining"], 4)
+                self.assertEqual(limiter.peek("b", 1, 60)[1]["remaining"], 1)
+
+                # Without all or nothing the checks still run one by one
+                results = limiter.is_allowed_many([("b", 1, 60), ("b", 1, 60)])
+                self.assertEqual([allowed for allowed, _ in results], [True, False])
+
+    def test_batches_on_cache_backend(self):
+        """Test that batches lock every key on the Django cache backend."""
+        backend = CacheBackend()
+        backend.cache.clear()
+        for algorithm in self.ALGORITHMS:
+            with self.subTest(algorithm=algorithm):
+                limiter = get_rate_limiter(
+                    algorithm, backend=backend, key_prefix=algorithm
+                )
+                limiter.is_allowed("user_b", 1, 60)
+                results = limiter.is_allowed_many(
+                    [("user_a", 1, 60), ("user_b", 1, 60)], all_or_nothing=True
+                )
+                self.assertEqual([allowed for allowed, _ in results], [False, False])
+                self.assertTrue(limiter.is_allowed("user_a", 1, 60)[0])
+
+    def test_decision_comes_from_backend_results(self):
+        """Test that a check whose update was not written is denied."""
+        for limiter in (
+            GCRARateLimiter(backend=MemoryBackend()),
+            LeakyBucketRateLimiter(backend=MemoryBackend()),
+            ApproximateSlidingWindowRateLimiter(backend=MemoryBackend()),
+        ):
+            with self.subTest(limiter=limiter.__class__.__name__):
+                updates, finish = limiter._prepare("user", 5, 60, "", 1)
+                # The updaters admit the request, but the backend gave up
+                self.assertTrue(
+                    limiter._dry_run(updates, finish, {})[0],
+                )
+                allowed, metadata = finish([None] * len(updates))
+                self.assertFalse(allowed)
+                self.assertGreaterEqual(metadata["retry_after"], 1)
+
+    def test_leaky_bucket_batch_schedules_in_order(self):
+        """Test that batched leaky bucket checks queue behind each other."""
+        limiter = LeakyBucketRateLimiter(backend=MemoryBackend(), max_queue=1)
+        results = limiter.is_allowed_many([("test_user", 10, 10)] * 3)
+        self.assertEqual([allowed for allowed, _ in results], [True, True, False])
+        self.assertAlmostEqual(results[1][1]["delay"], 1.0, places=2)
+
+    def test_check_rate_limit_many_helper(self):
+        """Test the module-level helper with the default scope."""
+        with mock.patch(
+            "django_rate_limiter.utils.get_backend", return_value=MemoryBackend()
+        ):
+            results = check_rate_limit_many(
+                [("user_a", 1, 60), ("user_a", 1, 60), ("user_a", 1, 60, "other")],
+                algorithm="fixed_window",
+            )
+        self.assertEqual([allowed for allowed, _ in results], [True, False, True])
+
+
+class TestPeek(TestCase):
+    """Test reading client status with peek and peek_many."""
+
+    ALGORITHMS = {
+        "sliding_window": {},
+        "token_bucket": {},
+        "fixed_window": {},
+        "sliding_counter": {},
+        "sliding_approx": {},
+        "gcra": {},
+        "leaky_bucket": {"max_delay": None},
+        "concurrency": {},
+        "composite": {"tiers": [(10, 3600)]},
+        "hierarchical": {},
+        "count_min": {},
+        "calendar": {},
+        "penalty": {},
+    }
+
+    def test_peek_reports_status_without_consuming(self):
+        """Test that peeking matches is_allowed and leaves state untouched."""
+        for algorithm, kwargs in self.ALGORITHMS.items():
+            with self.subTest(algorithm=algorithm), mock.patch(
+                "time.time", return_value=1000.0
+            ):
+                limiter = get_rate_limiter(algorithm, backend=MemoryBackend(), **kwargs)
+                field = (
+                    "remaining_tokens" if algorithm == "token_bucket" else "remaining"
+                )
+                for _ in range(3):
+                    _, metadata = limiter.is_allowed("user", 5, 60)
+
+                for _ in range(2):
+                    allowed, status = limiter.peek("user", 5, 60)
+                    self.assertTrue(allowed)
+                    self.assertEqual(status[field], metadata[field])
+                    self.assertNotIn("retry_after", status)
+                left = status[field]
+                if algorithm != "leaky_bucket":
+                    # More than what is left would be denied; leaky buckets
+                    # queue a costly request while its first slot is free
+                    allowed, status = limiter.peek("user", 5, 60, cost=left + 1)
+                    self.assertFalse(allowed)
+                    self.assertGreaterEqual(status["retry_after"], 1)
+
+                for _ in range(left):
+                    self.assertTrue(limiter.is_allowed("user", 5, 60)[0])
+                allowed, status = limiter.peek("user", 5, 60)
+                self.assertFalse(allowed)
+                self.assertEqual(status[field], 0)
+                self.assertGreaterEqual(status["retry_after"], 1)
+                self.assertFalse(limiter.is_allowed("user", 5, 60)[0])
+
+    def test_peek_many_reads_in_one_batch(self):
+        """Test that peek_many fetches all keys at once and writes nothing."""
+        backend = MemoryBackend()
+        limiter = FixedWindowRateLimiter(backend=backend)
+        limiter.is_allowed("user_a", 2, 60)
+        with mock.patch.object(
+            backend, "get_many", wraps=backend.get_many
+        ) as get_many, mock.patch.object(backend, "atomic_update") as atomic_update:
+            results = limiter.peek_many(
+                [("user_a", 2, 60), ("user_b", 2, 60), ("user_a", 2, 60, "", 2)]
+            )
+        get_many.assert_called_once()
+        atomic_update.assert_not_called()
+        self.assertEqual(
+            [(allowed, status["remaining"]) for allowed, status in results],
+            [(True, 1), (True, 2), (False, 0)],
+        )
+
+    def test_get_rate_limit_status_uses_algorithm_state(self):
+        """Test the status helper on the per-window keys of a fixed window."""
+        backend = MemoryBackend()
+        FixedWindowRateLimiter(backend=backend).is_allowed("user", 3, 60, "default")
+        with mock.patch("django_rate_limiter.utils.get_backend", return_value=backend):
+            status = get_rate_limit_status("user", 3, 60, algorithm="fixed_window")
+        self.assertEqual(status["current_count"], 1)
+        self.assertEqual(status["remaining"], 2)
+        self.assertFalse(status["is_limited"])
+
+
+@skipUnless(NUMPY_AVAILABLE, "NumPy is not installed")
+class TestSimulator(TestCase):
+    """Test replaying recorded traffic offline."""
+
+    ALGORITHMS = {
+        "sliding_window": {},
+        "token_bucket": {},
+        "fixed_window": {},
+        "sliding_counter": {},
+        "sliding_approx": {},
+        "gcra": {},
+        "leaky_bucket": {"max_queue": 3},
+        "composite": {"tiers": [(20, 120)]},
+        "hierarchical": {"get_parent": {"a": ("org", 15, 120)}.get},
+        "count_min": {"width": 64, "depth": 2},
+        "calendar": {"period": "minute"},
+        "penalty": {"penalty_threshold": 1, "base_penalty": 20},
+    }
+
+    def setUp(self):
+        rng = random.Random(7)
+        self.times = sorted(rng.uniform(1000, 1200) for _ in range(300))
+        self.identifiers = [rng.choice("aabbc") for _ in self.times]
+        self.costs = [rng.choice([1, 1, 2, 3]) for _ in self.times]
+
+    def test_matches_is_allowed(self):
+        """Test that every algorithm decides like its limiter would."""
+        for algorithm, kwargs in self.ALGORITHMS.items():
+            for costs in (None, self.costs):
+                with self.subTest(algorithm=algorithm, costs=costs is not None):
+                    limiter = get_rate_limiter(
+                        algorithm, backend=MemoryBackend(), **kwargs
+                    )
+                    expected = []
+                    for index, (now, identifier) in enumerate(
+                        zip(self.times, self.identifiers)
+                    ):
+                        cost = 1 if costs is None else costs[index]
+                        with mock.patch("time.time", return_value=now):
+                            allowed, _ = limiter.is_allowed(
+                                identifier, 8, 30, cost=cost
+                            )
+                        expected.append(allowed)
+
+                    result = simulate(
+                        algorithm,
+                        self.times,
+                        self.identifiers,
+                        8,
+                        30,
+                        costs=costs,
+                        **kwargs,
+                    )
+                    self.assertEqual(result["allowed"].tolist(), expected)
+                    self.assertEqual(result["denied"], expected.count(False))
+                    self.assertGreater(result["peak_keys"], 0)
+
+    def test_concurrency_uses_durations(self):
+        """Test that leases are held for each request's duration."""
+        result = simulate(
+            "concurrency",
+            [0, 1, 2, 11, 12],
+            ["a"] * 5,
+            2,
+            60,
+            durations=[10, 10, 1, 1, 1],
+        )
+        self.assertEqual(result["allowed"].tolist(), [True, True, False, True, True])
+        self.assertEqual(result["backend_calls"], 9)
+
+        with self.assertRaises(ConfigurationError):
+            simulate("concurrency", [0], ["a"], 2, 60)
+
+    def test_simulate_rules_matches_like_the_middleware(self):
+        """Test exempt paths, first-match rules and the global limit."""
+        config = {
+            "RULES": [
+                {"path_pattern": r"^/api/", "limit": 1, "window": 60},
+                {"path_pattern": r"^/api/search", "limit": 10, "window": 60},
+            ],
+            "EXEMPT_PATHS": [r"^/health"],
+            "GLOBAL_LIMIT": 2,
+            "GLOBAL_WINDOW": 60,
+        }
+        result = simulate_rules(
+            [0, 1, 2, 3, 4, 5],
+            ["ip:1"] * 6,
+            ["/api/search", "/api/a", "/health", "/", "/about", "/"],
+            config=config,
+        )
+        self.assertEqual(
+            result["allowed"].tolist(), [True, False, True, True, True, False]
+        )
+        self.assertEqual(result["exempt"], 1)
+        self.assertEqual(len(result["rules"]), 2)
+        self.assertEqual(result["rules"][0]["denied"], 1)
+        self.assertEqual(result["rules"][1]["requests"], 0)
+        self.assertEqual(result["global"]["scope"], "global")
+        self.assertEqual(result["global"]["denied"], 1)
+
+        config["RULES"][0]["cost"] = lambda request: 2
+        with self.assertRaises(ConfigurationError):
+            simulate_rules([0], ["ip:1"], ["/api/a"], config=config)
+
 
 class TestRateLimiterFactory(TestCase):
     """Test rate limiter factory function."""
@@ -229,6 +1624,24 @@ class TestRateLimiterFactory(TestCase):
         sliding_counter = get_rate_limiter("sliding_counter", backend=backend)
         self.assertIsInstance(sliding_counter, SlidingWindowCounterRateLimiter)
 
+        approx = get_rate_limiter("sliding_approx", backend=backend)
+        self.assertIsInstance(approx, ApproximateSlidingWindowRateLimiter)
+
+        gcra = get_rate_limiter("gcra", backend=backend)
+        self.assertIsInstance(gcra, GCRARateLimiter)
+
+        leaky = get_rate_limiter("leaky_bucket", backend=backend)
+        self.assertIsInstance(leaky, LeakyBucketRateLimiter)
+
+        concurrency = get_rate_limiter("concurrency", backend=backend)
+        self.assertIsInstance(concurrency, ConcurrencyRateLimiter)
+
+        calendar = get_rate_limiter("calendar", backend=backend)
+        self.assertIsInstance(calendar, CalendarRateLimiter)
+
+        penalty = get_rate_limiter("penalty", backend=backend)
+        self.assertIsInstance(penalty, PenaltyRateLimiter)
+
         # Test invalid algorithm
         with self.assertRaises(ValueError):
             get_rate_limiter("invalid_algorithm", backend=backend)
@@ -2,12 +2,53 @@
 Tests for Django Rate Limiter backends.
 """
 
+import os
+import tempfile
 import threading
 import time
-from unittest import TestCase
+from unittest import TestCase, mock, skipUnless
+
+from django.db import connection
+from django.test import TestCase as DatabaseTestCase
+from django.utils import timezone
+
+from django_rate_limiter.algorithms import get_rate_limiter
+from django_rate_limiter.backends import (
+    BaseBackend,
+    BucketedDatabaseBackend,
+    CacheBackend,
+    DatabaseBackend,
+    MemoryBackend,
+    RedisBackend,
+    SQLiteBackend,
+    TwoTierBackend,
+    _BucketConflict,
+    _with_headroom,
+    get_backend,
+)
+from django_rate_limiter.exceptions import BackendError, ConfigurationError
+from django_rate_limiter.models import RateLimitEntry
+
+try:
+    import redis
+
+    redis.Redis(socket_connect_timeout=0.2).ping()
+    REDIS_RUNNING = True
+except Exception:
+    REDIS_RUNNING = False
+
+
+class TestBaseBackend(TestCase):
+    """Test defaults shared by all backends."""
+
+    def test_batches_need_backend_support(self):
+        """Test that a backend without atomic batches fails loudly."""
+
+        class PlainBackend(MemoryBackend):
+            atomic_update_many = BaseBackend.atomic_update_many
 
-from django_rate_limiter.backends import MemoryBackend, get_backend
-from django_rate_limiter.exceptions import BackendError
+        with self.assertRaises(BackendError):
+            PlainBackend().atomic_update_many([("a", lambda data: {"count": 1}, 60)])
 
 
 class TestMemoryBackend(TestCase):
@@ -141,6 +182,756 @@ class TestMemoryBackend(TestCase):
         self.assertIsNone(self.backend.get("key1"))  # Should trigger cleanup
         self.assertIsNotNone(self.backend.get("key2"))  # Should still exist
 
+    def test_leases_expire_and_release(self):
+        """Test in-flight leases are bounded, released and expire."""
+        now = time.time()
+        self.assertEqual(self.backend.acquire_lease("k", "a", 2, now, 10), (True, 1))
+        self.assertEqual(self.backend.acquire_lease("k", "b", 2, now, 10), (True, 2))
+        self.assertEqual(self.backend.acquire_lease("k", "c", 2, now, 10), (False, 2))
+
+        self.backend.release_lease("k", "a", 10)
+        self.assertEqual(self.backend.acquire_lease("k", "c", 2, now, 10), (True, 2))
+
+        # A crashed worker's lease expires on its own
+        self.assertEqual(
+            self.backend.acquire_lease("k", "d", 2, now + 11, 10), (True, 1)
+        )
+
+    def test_atomic_update_many(self):
+        """Test batched updates see earlier writes and honor commit."""
+
+        def add_one(data):
+            return {"count": (data or {"count": 0})["count"] + 1}
+
+        results = self.backend.atomic_update_many(
+            [("a", add_one, 60), ("b", add_one, 60), ("a", add_one, 60)]
+        )
+        self.assertEqual(results, [{"count": 1}, {"count": 1}, {"count": 2}])
+        self.assertEqual(self.backend.get("a"), {"count": 2})
+
+        # A rejected batch writes nothing
+        results = self.backend.atomic_update_many(
+            [("a", add_one, 60), ("b", add_one, 60)], commit=lambda _: False
+        )
+        self.assertEqual(results, [{"count": 3}, {"count": 2}])
+        self.assertEqual(self.backend.get("a"), {"count": 2})
+        self.assertEqual(self.backend.get("b"), {"count": 1})
+
+    def test_chain_increment(self):
+        """Test that a chain of counters is charged all or nothing."""
+        self.assertEqual(
+            self.backend.chain_increment(["a", "b"], [2, 3], 2), (True, [2, 2])
+        )
+        self.assertEqual(
+            self.backend.chain_increment(["a", "b"], [2, 3], 1), (False, [2, 2])
+        )
+        self.assertEqual(self.backend.get("b"), 2)
+
+    def test_sketch_update(self):
+        """Test conservative sketch updates on an integer array."""
+        self.assertEqual(self.backend.sketch_update("s", [0, 4], 8, 3, 2), (True, 2))
+        self.assertEqual(self.backend.sketch_update("s", [1, 4], 8, 3, 1), (True, 1))
+        # Counter 4 was already 2, so it is left alone
+        self.assertEqual(list(self.backend.get("s")), [2, 1, 0, 0, 2, 0, 0, 0])
+        self.assertEqual(self.backend.sketch_update("s", [0, 4], 8, 3, 2), (False, 2))
+
+
+class TestDatabaseBackendLockPolicies(DatabaseTestCase):
+    """Test row lock contention policies of the database backend."""
+
+    def test_policies_update_entries(self):
+        """Test that every policy performs normal updates."""
+        for policy in DatabaseBackend.LOCK_POLICIES:
+            backend = DatabaseBackend(lock_policy=policy)
+            key = f"key:{policy}"
+            self.assertEqual(backend.increment(key, 1, 60), 1)
+            result = backend.atomic_update(
+                key, lambda data: {"count": data["count"] + 1}, 60
+            )
+            self.assertEqual(result, {"count": 2})
+            self.assertEqual(backend.contended_locks, 0)
+
+    def test_contended_lock_denies(self):
+        """Test that a contended lock skips the update and is counted."""
+        backend = DatabaseBackend(lock_policy="nowait")
+        updater = mock.Mock(return_value={"count": 1})
+
+        with mock.patch.object(backend, "_lock_entry", return_value=(None, True)):
+            self.assertIsNone(backend.atomic_update("key", updater, 60))
+            with self.assertRaises(BackendError):
+                backend.increment("key", 1, 60)
+
+        updater.assert_not_called()
+        self.assertEqual(backend.contended_locks, 2)
+
+    def test_invalid_policy(self):
+        """Test unknown lock policy."""
+        with self.assertRaises(ConfigurationError):
+            DatabaseBackend(lock_policy="spin")
+
+
+class TestDatabaseBackendLeases(DatabaseTestCase):
+    """Test in-flight leases on the database backend."""
+
+    def test_acquire_and_release(self):
+        """Test that leases are stored in one row and released."""
+        backend = DatabaseBackend()
+        now = time.time()
+        self.assertEqual(backend.acquire_lease("k", "a", 1, now, 10), (True, 1))
+        self.assertEqual(backend.acquire_lease("k", "b", 1, now, 10), (False, 1))
+
+        backend.release_lease("k", "a", 10)
+        self.assertEqual(backend.get("k"), {"leases": {}})
+        self.assertEqual(backend.acquire_lease("k", "b", 1, now, 10), (True, 1))
+
+
+class TestDatabaseBackendBatches(DatabaseTestCase):
+    """Test batched updates on the database backend."""
+
+    def test_atomic_update_many(self):
+        """Test that every policy runs a batch in one transaction."""
+
+        def add_one(data):
+            return {"count": (data or {"count": 0})["count"] + 1}
+
+        for policy in DatabaseBackend.LOCK_POLICIES:
+            backend = DatabaseBackend(lock_policy=policy)
+            a, b = f"a:{policy}", f"b:{policy}"
+            results = backend.atomic_update_many(
+                [(a, add_one, 60), (b, add_one, 60), (a, add_one, 60)]
+            )
+            self.assertEqual(results, [{"count": 1}, {"count": 1}, {"count": 2}])
+
+            backend.atomic_update_many([(a, add_one, 60)], commit=lambda _: False)
+            self.assertEqual(backend.get(a), {"count": 2})
+
+    def test_get_many(self):
+        """Test that batched reads skip missing and expired keys."""
+        backend = DatabaseBackend()
+        backend.set("live", {"count": 1}, 60)
+        backend.set("expired", {"count": 2}, 60)
+        RateLimitEntry.objects.filter(key="expired").update(
+            expires_at=timezone.now() - timezone.timedelta(seconds=1)
+        )
+        self.assertEqual(
+            backend.get_many(["live", "expired", "missing"]), {"live": {"count": 1}}
+        )
+
+    def test_contended_batch_denies(self):
+        """Test that one contended row skips the whole batch."""
+        backend = DatabaseBackend(lock_policy="nowait")
+        updater = mock.Mock(return_value={"count": 1})
+
+        with mock.patch.object(backend, "_lock_entry", return_value=(None, True)):
+            results = backend.atomic_update_many(
+                [("a", updater, 60), ("b", updater, 60)]
+            )
+
+        self.assertEqual(results, [None, None])
+        updater.assert_not_called()
+        self.assertEqual(backend.contended_locks, 1)
+
+
+class TestBucketedDatabaseBackend(DatabaseTestCase):
+    """Test time-bucketed database storage backend."""
+
+    def setUp(self):
+        self.backend = BucketedDatabaseBackend(bucket_seconds=60, max_ttl=300)
+
+    def test_basic_operations(self):
+        """Test get/set/delete across buckets."""
+        self.assertIsNone(self.backend.get("key"))
+
+        self.backend.set("key", {"count": 1}, 30)
+        self.assertEqual(self.backend.get("key"), {"count": 1})
+
+        # Rewriting with a longer TTL moves the entry to a later bucket
+        self.backend.set("key", {"count": 2}, 200)
+        self.assertEqual(self.backend.get("key"), {"count": 2})
+
+        self.backend.delete("key")
+        self.assertIsNone(self.backend.get("key"))
+
+    def test_atomic_update_and_increment(self):
+        """Test atomic update and increment operations."""
+
+        def updater(current_data):
+            current_data = current_data or {"count": 0}
+            current_data["count"] += 1
+            return current_data
+
+        self.assertEqual(self.backend.atomic_update("key", updater, 60)["count"], 1)
+        self.assertEqual(self.backend.atomic_update("key", updater, 60)["count"], 2)
+        self.assertEqual(self.backend.increment("key", 5, 60), 7)
+
+    def test_atomic_update_many(self):
+        """Test batched updates in one transaction across buckets."""
+
+        def add_one(data):
+            return {"count": (data or {"count": 0})["count"] + 1}
+
+        self.backend.set("b", {"count": 5}, 200)
+        results = self.backend.atomic_update_many(
+            [("a", add_one, 60), ("b", add_one, 60), ("a", add_one, 60)]
+        )
+        self.assertEqual(results, [{"count": 1}, {"count": 6}, {"count": 2}])
+        self.assertEqual(self.backend.get("b"), {"count": 6})
+
+        self.backend.atomic_update_many([("a", add_one, 60)], commit=lambda _: False)
+        self.assertEqual(self.backend.get("a"), {"count": 2})
+
+    def test_updates_search_their_own_buckets_first(self):
+        """Test that an update reads later buckets only when its own miss."""
+        self.backend.set("short", {"count": 1}, 30)
+        self.backend.set("long", {"count": 1}, 250)
+
+        with mock.patch.object(
+            self.backend, "_select", wraps=self.backend._select
+        ) as select:
+            self.assertEqual(self.backend.increment("short", 1, 30), 2)
+            self.assertEqual(select.call_count, 1)
+            self.assertLessEqual(len(select.call_args[0][2]), 2)
+
+            select.reset_mock()
+            # An entry written with a longer TTL is still found
+            self.assertEqual(self.backend.increment("long", 1, 30), 2)
+            self.assertEqual(select.call_count, 2)
+        self.assertEqual(self.backend.get("long"), {"count": 2})
+
+    def test_late_writes_find_their_bucket(self):
+        """Test that the last live bucket follows the clock within a period."""
+        backend = BucketedDatabaseBackend(bucket_seconds=3600, max_ttl=5000)
+        period_start = 3600 * 1000000
+        with mock.patch("time.time", return_value=period_start + 10.0):
+            self.assertIsNone(backend.get("key"))
+        # max_ttl reaches one bucket further late in the same period
+        with mock.patch("time.time", return_value=period_start + 3500.0):
+            backend.set("key", {"count": 1}, 5000)
+            self.assertEqual(backend.get("key"), {"count": 1})
+
+    def test_conflicts_give_up_after_max_retries(self):
+        """Test that endless write conflicts raise instead of spinning."""
+        backend = BucketedDatabaseBackend(bucket_seconds=60, max_ttl=300, max_retries=3)
+        backend.set("key", {"count": 1}, 60)
+
+        with mock.patch.object(backend, "_write", side_effect=_BucketConflict) as write:
+            with self.assertRaises(BackendError):
+                backend.increment("key", 1, 60)
+            self.assertEqual(write.call_count, 3)
+
+            write.reset_mock()
+            with self.assertRaises(BackendError):
+                backend.atomic_update_many([("key", lambda data: data, 60)])
+            self.assertEqual(write.call_count, 3)
+
+        with self.assertRaises(ConfigurationError):
+            BucketedDatabaseBackend(max_retries=0)
+
+    def test_ttl_above_max_ttl(self):
+        """Test that entries may not outlive max_ttl."""
+        with self.assertRaises(BackendError):
+            self.backend.set("key", {"count": 1}, 301)
+
+    def test_rotate_buckets(self):
+        """Test that rotation drops whole expired bucket tables."""
+        self.backend.set("key", {"count": 1}, 30)
+        tables = [
+            table
+            for table in connection.introspection.table_names()
+            if table.startswith(BucketedDatabaseBackend.TABLE_PREFIX)
+        ]
+        self.assertTrue(tables)
+
+        # Nothing has expired yet
+        self.assertEqual(BucketedDatabaseBackend.rotate_buckets(), [])
+
+        future = time.time() + 1000
+        self.assertEqual(
+            BucketedDatabaseBackend.rotate_buckets(dry_run=True, now=future),
+            sorted(tables),
+        )
+        BucketedDatabaseBackend.rotate_buckets(now=future)
+        remaining = [
+            table
+            for table in connection.introspection.table_names()
+            if table.startswith(BucketedDatabaseBackend.TABLE_PREFIX)
+        ]
+        self.assertEqual(remaining, [])
+
+
+class TestSQLiteBackend(TestCase):
+    """Test single-host SQLite storage backend."""
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".sqlite3")
+        os.close(fd)
+        self.backend = SQLiteBackend(path=self.path)
+
+    def tearDown(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+    def test_basic_operations(self):
+        """Test get/set/delete and expiry."""
+        self.assertIsNone(self.backend.get("key"))
+        self.backend.set("key", {"count": 3}, 60)
+        self.assertEqual(self.backend.get("key"), {"count": 3})
+
+        self.backend.delete("key")
+        self.assertIsNone(self.backend.get("key"))
+
+        self.backend.set("short", {"count": 1}, 1)
+        time.sleep(1.1)
+        self.assertIsNone(self.backend.get("short"))
+        self.assertEqual(self.backend.cleanup_expired(), 1)
+
+    def test_shared_between_instances(self):
+        """Test that separate connections to one file share state."""
+        other = SQLiteBackend(path=self.path)
+        self.backend.increment("counter", 2, 60)
+        self.assertEqual(other.increment("counter", 3, 60), 5)
+
+    def test_thread_safety(self):
+        """Test concurrent increments from threads with their own connections."""
+
+        def increment_counter():
+            for _ in range(20):
+                self.backend.increment("counter", 1, 60)
+
+        threads = [threading.Thread(target=increment_counter) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.backend.get("counter")["count"], 100)
+
+    def test_atomic_update_many(self):
+        """Test batched updates in one write transaction."""
+
+        def add_one(data):
+            return {"count": (data or {"count": 0})["count"] + 1}
+
+        results = self.backend.atomic_update_many(
+            [("a", add_one, 60), ("a", add_one, 60), ("b", add_one, 60)]
+        )
+        self.assertEqual(results, [{"count": 1}, {"count": 2}, {"count": 1}])
+
+        self.backend.atomic_update_many([("a", add_one, 60)], commit=lambda _: False)
+        self.assertEqual(SQLiteBackend(path=self.path).get("a"), {"count": 2})
+
+    def test_sketch_update_is_unsupported(self):
+        """Test that sketches aren't emulated with JSON counter lists."""
+        self.assertFalse(self.backend.supports_sketch)
+        with self.assertRaises(BackendError):
+            self.backend.sketch_update("s", [0, 4], 8, 3, 2)
+        with self.assertRaises(ValueError):
+            get_rate_limiter("count_min", backend=self.backend)
+
+
+class TestCacheBackend(TestCase):
+    """Test Django cache framework backend (locmem in tests)."""
+
+    def setUp(self):
+        self.backend = CacheBackend()
+        self.backend.cache.clear()
+
+    def test_basic_operations(self):
+        """Test get/set/delete and batch access."""
+        self.assertIsNone(self.backend.get("key"))
+        self.backend.set("key", {"count": 2}, 60)
+        self.backend.set_many({"a": {"count": 1}, "b": {"count": 4}}, 60)
+
+        self.assertEqual(self.backend.get("key"), {"count": 2})
+        self.assertEqual(
+            self.backend.get_many(["a", "b", "missing"]),
+            {"a": {"count": 1}, "b": {"count": 4}},
+        )
+
+        self.backend.delete("key")
+        self.assertIsNone(self.backend.get("key"))
+
+    def test_increment(self):
+        """Test add/incr counters and increments of dict values."""
+        self.assertEqual(self.backend.increment("counter", 1, 60), 1)
+        self.assertEqual(self.backend.increment("counter", 4, 60), 5)
+        self.assertEqual(self.backend.get("counter"), {"count": 5})
+
+        self.backend.set("dict", {"count": 2, "window_start": 0}, 60)
+        self.assertEqual(self.backend.increment("dict", 1, 60), 3)
+
+    def test_atomic_update_thread_safety(self):
+        """Test that add-based locking serializes concurrent updates."""
+
+        def updater(current_data):
+            current_data = current_data or {"count": 0}
+            current_data["count"] += 1
+            return current_data
+
+        def update():
+            for _ in range(10):
+                self.backend.atomic_update("key", updater, 60)
+
+        threads = [threading.Thread(target=update) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.backend.get("key")["count"], 50)
+        self.assertIsNone(self.backend.get("key:lock"))
+
+    def test_lock_contention(self):
+        """Test that a held lock denies after lock_timeout."""
+        backend = CacheBackend(lock_timeout=0.05)
+        backend.cache.add("key:lock", "other-worker", 5)
+
+        self.assertIsNone(backend.atomic_update("key", lambda data: {"count": 1}))
+        self.assertEqual(backend.contended_locks, 1)
+
+    def test_atomic_update_many(self):
+        """Test batched updates under the locks of every key."""
+
+        def add_one(data):
+            return {"count": (data or {"count": 0})["count"] + 1}
+
+        results = self.backend.atomic_update_many(
+            [("a", add_one, 60), ("b", add_one, 60), ("a", add_one, 60)]
+        )
+        self.assertEqual(results, [{"count": 1}, {"count": 1}, {"count": 2}])
+        self.assertEqual(self.backend.get("a"), {"count": 2})
+        self.assertIsNone(self.backend.get("a:lock"))
+
+        self.backend.atomic_update_many([("a", add_one, 60)], commit=lambda _: False)
+        self.assertEqual(self.backend.get("a"), {"count": 2})
+
+    def test_contended_batch_denies(self):
+        """Test that a held lock makes the whole batch give up."""
+        backend = CacheBackend(lock_timeout=0.05)
+        backend.cache.add("b:lock", "other-worker", 5)
+        updater = mock.Mock(return_value={"count": 1})
+
+        results = backend.atomic_update_many([("a", updater, 60), ("b", updater, 60)])
+        self.assertEqual(results, [None, None])
+        updater.assert_not_called()
+        self.assertIsNone(backend.get("a"))
+        self.assertIsNone(backend.get("a:lock"))
+        self.assertEqual(backend.contended_locks, 1)
+
+
+class TestTwoTierBackend(TestCase):
+    """Test in-process tier in front of a shared backend."""
+
+    def setUp(self):
+        self.shared = MemoryBackend()
+        self.backend = TwoTierBackend(self.shared, staleness=60, slack=3)
+
+    def tearDown(self):
+        self.backend.close()
+
+    @staticmethod
+    def counter(limit, calls=None):
+        def update(current_data):
+            if calls is not None:
+                calls.append(current_data)
+            current_data = current_data or {"count": 0}
+            allowed = current_data["count"] < limit
+            if allowed:
+                current_data["count"] += 1
+            current_data["allowed"] = allowed
+            return current_data
+
+        return _with_headroom(update, lambda state: limit - state["count"])
+
+    def test_far_from_limit_is_absorbed_locally(self):
+        """Test that requests with headroom skip the shared tier."""
+        with mock.patch.object(
+            self.shared, "atomic_update", wraps=self.shared.atomic_update
+        ) as shared_update:
+            for _ in range(10):
+                self.backend.atomic_update("key", self.counter(100), 60)
+            # Each shared update is followed by a budget of `slack` local ones
+            self.assertEqual(shared_update.call_count, 3)
+            self.assertEqual(len(self.backend._entries["key"].pending), 1)
+
+            self.backend.flush()
+            self.assertEqual(shared_update.call_count, 4)
+
+        self.assertEqual(self.shared.get("key")["count"], 10)
+
+    def test_workers_overshoot_by_at_most_their_budgets(self):
+        """Test that the shared tier bounds what many workers absorb."""
+        workers = [TwoTierBackend(self.shared, staleness=60) for _ in range(10)]
+        try:
+            with mock.patch("time.time", return_value=1000.0):
+                limiters = [
+                    get_rate_limiter("fixed_window", backend=worker)
+                    for worker in workers
+                ]
+                admitted = sum(
+                    limiters[i % 10].is_allowed("user", 100, 60)[0] for i in range(1000)
+                )
+        finally:
+            for worker in workers:
+                worker.close()
+        self.assertGreaterEqual(admitted, 100)
+        # Ten workers with a budget of five unsynced admissions each
+        self.assertLessEqual(admitted, 100 + 10 * 5)
+
+    def test_near_limit_is_authoritative(self):
+        """Test that the shared tier decides once headroom runs out."""
+        allowed = [
+            self.backend.atomic_update("key", self.counter(5), 60)["allowed"]
+            for _ in range(8)
+        ]
+        self.assertEqual(allowed, [True] * 5 + [False] * 3)
+
+        self.backend.flush()
+        self.assertEqual(self.shared.get("key")["count"], 5)
+
+    def test_atomic_update_many_syncs_pending_updates(self):
+        """Test that batches run on the shared tier after absorbed updates."""
+        for _ in range(3):
+            self.backend.atomic_update("key", self.counter(100), 60)
+        self.assertEqual(self.shared.get("key")["count"], 1)
+
+        results = self.backend.atomic_update_many(
+            [("key", self.counter(100), 60), ("other", self.counter(100), 60)]
+        )
+        self.assertEqual([result["count"] for result in results], [4, 1])
+        self.assertEqual(self.shared.get("key")["count"], 4)
+        # The next update starts from the shared state again
+        self.assertEqual(
+            self.backend.atomic_update("key", self.counter(100), 60)["count"], 5
+        )
+
+    def test_set_and_delete_discard_local_state(self):
+        """Test that writes bypass the local tier."""
+        self.backend.atomic_update("key", self.counter(100), 60)
+        self.backend.set("key", {"count": 42}, 60)
+        self.assertEqual(self.backend.get("key"), {"count": 42})
+
+        self.backend.delete("key")
+        self.assertIsNone(self.backend.get("key"))
+
+    def test_bundled_algorithms_are_absorbed(self):
+        """Test that limiter updaters carry headroom and stay exact."""
+        for algorithm in (
+            "sliding_window",
+            "token_bucket",
+            "fixed_window",
+            "sliding_counter",
+        ):
+            with self.subTest(algorithm=algorithm), mock.patch(
+                "time.time", return_value=1000.0
+            ):
+                limiter = get_rate_limiter(
+                    algorithm, backend=self.backend, key_prefix=algorithm
+                )
+                with mock.patch.object(
+                    self.shared, "atomic_update", wraps=self.shared.atomic_update
+                ) as shared_update:
+                    allowed = [limiter.is_allowed("user", 10, 60)[0] for _ in range(12)]
+                self.assertEqual(allowed, [True] * 10 + [False] * 2)
+                self.assertLess(shared_update.call_count, 12)
+
+    def test_absorbed_updaters_run_once(self):
+        """Test that headroom is probed without rerunning the updater."""
+        self.backend.atomic_update("key", self.counter(100), 60)
+        calls = []
+        self.backend.atomic_update("key", self.counter(100, calls), 60)
+        self.assertEqual(len(calls), 1)
+
+        # Updaters without a headroom function always go to the shared tier
+        def plain(current_data):
+            calls.append(current_data)
+            return {"count": 1, "allowed": True}
+
+        self.backend.atomic_update("other", plain, 60)
+        self.backend.atomic_update("other", plain, 60)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(self.backend._entries["other"].pending, [])
+
+    def test_failed_sync_keeps_pending_updates(self):
+        """Test that absorbed updates survive a failing shared backend."""
+        for _ in range(3):
+            self.backend.atomic_update("key", self.counter(100), 60)
+
+        with mock.patch.object(
+            self.shared, "atomic_update", side_effect=BackendError("down")
+        ):
+            for write in (
+                lambda: self.backend.atomic_update("key", self.counter(1), 60),
+                lambda: self.backend.increment("key", 1, 60),
+                lambda: self.backend.set("key", {"count": 0}, 60),
+                lambda: self.backend.delete("key"),
+            ):
+                with self.assertRaises(BackendError):
+                    write()
+                self.assertEqual(len(self.backend._entries["key"].pending), 2)
+
+        self.backend.flush()
+        self.assertEqual(self.shared.get("key")["count"], 3)
+
+    def test_writes_sync_pending_updates_first(self):
+        """Test that set, increment and delete apply absorbed updates first."""
+        for _ in range(3):
+            self.backend.atomic_update("key", self.counter(100), 60)
+
+        with mock.patch.object(
+            self.shared, "atomic_update", wraps=self.shared.atomic_update
+        ) as shared_update:
+            self.backend.set("key", {"count": 42}, 60)
+        shared_update.assert_called_once()
+        self.assertNotIn("key", self.backend._entries)
+        self.assertEqual(self.shared.get("key"), {"count": 42})
+
+
+@skipUnless(REDIS_RUNNING, "Redis server not available on localhost:6379")
+class TestRedisBackend(TestCase):
+    """Test Redis backend and its server-side fast paths."""
+
+    def setUp(self):
+        self.backend = RedisBackend(db=15)
+        self.backend.redis.flushdb()
+
+    def tearDown(self):
+        self.backend.redis.flushdb()
+
+    def test_basic_operations(self):
+        """Test get/set/delete/atomic update."""
+        self.backend.set("key", {"count": 1}, 60)
+        self.assertEqual(self.backend.get("key"), {"count": 1})
+        result = self.backend.atomic_update(
+            "key", lambda data: {"count": data["count"] + 1}, 60
+        )
+        self.assertEqual(result, {"count": 2})
+        self.backend.delete("key")
+        self.assertIsNone(self.backend.get("key"))
+
+    def test_increment_is_atomic(self):
+        """Test that increments from many threads are all counted."""
+        self.backend.set("entry", {"count": 1, "window_start": 60}, 60)
+
+        def worker():
+            for _ in range(50):
+                self.backend.increment("entry", ttl=60)
+                self.backend.increment("plain", 2, ttl=60)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(self.backend.get("entry"), {"count": 201, "window_start": 60})
+        self.assertEqual(self.backend.get("plain"), {"count": 400})
+        self.assertGreater(self.backend.redis.ttl("plain"), 0)
+
+    def test_gcra_matches_generic_implementation(self):
+        """Test that the GCRA script agrees with the generic version."""
+        memory = MemoryBackend()
+        now = time.time()
+        for i in range(4):
+            allowed, tat = self.backend.gcra_update("gcra", now + i * 0.1, 1.0, 3.0)
+            expected_allowed, expected_tat = memory.gcra_update(
+                "gcra", now + i * 0.1, 1.0, 3.0
+            )
+            self.assertEqual(allowed, expected_allowed)
+            self.assertAlmostEqual(tat, expected_tat, places=5)
+        # The stored state is a bare number readable by get()
+        self.assertIsInstance(self.backend.get("gcra"), float)
+
+    def test_batched_reads(self):
+        """Test MGET reads and the read-only sketch and lease counts."""
+        self.backend.set("a", {"count": 1}, 60)
+        self.backend.redis.set("b", 2)
+        self.assertEqual(
+            self.backend.get_many(["a", "b", "missing"]), {"a": {"count": 1}, "b": 2}
+        )
+
+        self.backend.sketch_update("sketch", [1, 5], 8, 10, 3, 60)
+        self.assertEqual(self.backend.sketch_estimate("sketch", [1, 5]), 3)
+        self.assertEqual(self.backend.sketch_estimate("sketch", [1, 6]), 0)
+
+        now = time.time()
+        self.backend.acquire_lease("leases", "a", 5, now - 10, 5)
+        self.backend.acquire_lease("leases", "b", 5, now, 60, 2)
+        self.assertEqual(self.backend.count_leases("leases", now), 2)
+
+    def test_weighted_window_uses_integer_counters(self):
+        """Test that the weighted window script keeps plain counters."""
+        self.backend.redis.set("previous", 10)
+        results = [
+            self.backend.weighted_window_update("current", "previous", 0.5, 10, 1, 60)
+            for _ in range(6)
+        ]
+        self.assertEqual([allowed for allowed, _, _ in results], [True] * 5 + [False])
+        self.assertEqual(self.backend.get("current"), 5)
+        self.assertEqual(
+            MemoryBackend().weighted_window_update("current", "previous", 0, 1, 1, 60),
+            (True, 1, 0),
+        )
+
+    def test_leases_use_sorted_set(self):
+        """Test that leases live in a sorted set scored by expiry."""
+        now = time.time()
+        self.assertEqual(self.backend.acquire_lease("k", "a", 2, now, 10), (True, 1))
+        self.assertEqual(self.backend.acquire_lease("k", "b", 2, now, 10), (True, 2))
+        self.assertEqual(self.backend.acquire_lease("k", "c", 2, now, 10), (False, 2))
+        self.assertEqual(self.backend.redis.zscore("k", "a"), now + 10)
+        self.assertGreater(self.backend.redis.ttl("k"), 0)
+
+        self.backend.release_lease("k", "a")
+        self.assertEqual(self.backend.acquire_lease("k", "c", 2, now, 10), (True, 2))
+        self.assertEqual(
+            self.backend.acquire_lease("k", "e", 4, now, 10, quantity=2), (True, 4)
+        )
+        self.backend.release_lease("k", "e", quantity=2)
+        self.assertEqual(self.backend.redis.zcard("k"), 2)
+        self.assertEqual(
+            self.backend.acquire_lease("k", "d", 2, now + 11, 10), (True, 1)
+        )
+
+    def test_atomic_update_many(self):
+        """Test batched updates in one MULTI/EXEC."""
+
+        def add_one(data):
+            return {"count": (data or {"count": 0})["count"] + 1}
+
+        results = self.backend.atomic_update_many(
+            [("a", add_one, 60), ("b", add_one, 60), ("a", add_one, 60)]
+        )
+        self.assertEqual(results, [{"count": 1}, {"count": 1}, {"count": 2}])
+        self.assertGreater(self.backend.redis.ttl("a"), 0)
+
+        self.backend.atomic_update_many([("a", add_one, 60)], commit=lambda _: False)
+        self.assertEqual(self.backend.get("a"), {"count": 2})
+
+    def test_chain_increment_script(self):
+        """Test that the chain script charges plain counters all or nothing."""
+        keys = ["{org}:a", "{org}:b"]
+        self.assertEqual(
+            self.backend.chain_increment(keys, [2, 3], 2, [60, 60]), (True, [2, 2])
+        )
+        self.assertEqual(
+            self.backend.chain_increment(keys, [3, 3], 2, [60, 60]), (False, [2, 2])
+        )
+        self.assertEqual(self.backend.get("{org}:b"), 2)
+        self.assertGreater(self.backend.redis.ttl("{org}:a"), 0)
+
+    def test_sketch_script_matches_memory(self):
+        """Test that the BITFIELD sketch agrees with the in-memory array."""
+        memory = MemoryBackend()
+        for indexes, quantity in [([0, 9], 2), ([1, 9], 1), ([0, 9], 2), ([3, 4], 3)]:
+            self.assertEqual(
+                self.backend.sketch_update("s", indexes, 16, 3, quantity, 60),
+                memory.sketch_update("s", indexes, 16, 3, quantity, 60),
+            )
+        self.assertEqual(len(self.backend.redis.get("s")), 10 * 4)
+        self.assertGreater(self.backend.redis.ttl("s"), 0)
+
 
 class TestBackendFactory(TestCase):
     """Test backend factory function."""
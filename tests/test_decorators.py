@@ -0,0 +1,102 @@
+"""
+Tests for Django Rate Limiter decorators.
+"""
+
+import asyncio
+from unittest import mock
+
+from django.http import JsonResponse
+from django.test import RequestFactory, SimpleTestCase
+
+from django_rate_limiter.decorators import _get_rate_limiter, rate_limit
+from django_rate_limiter.utils import check_rate_limit, clear_rate_limit
+
+
+def view(request):
+    return JsonResponse({"message": "ok"})
+
+
+async def async_view(request):
+    return JsonResponse({"message": "ok"})
+
+
+class TestRateLimitDecorator(SimpleTestCase):
+    """Test the rate_limit view decorator."""
+
+    def setUp(self):
+        self.request = RequestFactory().get("/", REMOTE_ADDR="10.0.0.1")
+
+    def test_denies_over_limit(self):
+        """Test that requests over the limit get a 429 with Retry-After."""
+        limited = rate_limit(limit=1, window=60, scope="decorator-basic")(view)
+        self.assertEqual(limited(self.request).status_code, 200)
+
+        response = limited(self.request)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+
+    def test_rejects_cost_below_one(self):
+        """Test that a cost function can't return a free or refunding cost."""
+        for cost in (0, -10, lambda request: 0):
+            with self.subTest(cost=cost):
+                limited = rate_limit(
+                    limit=5, window=60, scope="decorator-cost", cost=cost
+                )(view)
+                with self.assertRaises(ValueError):
+                    limited(self.request)
+
+        with self.assertRaises(ValueError):
+            check_rate_limit("decorator-cost", 5, 60, cost=-10)
+
+    def test_deny_cache_is_opt_in(self):
+        """Test that the deny cache is off unless given a size."""
+        rate_limit(limit=1, window=60, scope="decorator-default")(view)(self.request)
+        limiter = _get_rate_limiter("sliding_window", "memory", {}, {}, 0)
+        self.assertIsNone(limiter.deny_cache)
+
+    def test_clear_rate_limit_forgets_cached_denial(self):
+        """Test that clearing a client also drops its cached denial."""
+        limited = rate_limit(
+            limit=1, window=60, scope="decorator-cached", deny_cache_size=10
+        )(view)
+        limited(self.request)
+        self.assertEqual(limited(self.request).status_code, 429)
+
+        clear_rate_limit("ip:10.0.0.1", "decorator-cached")
+        self.assertEqual(limited(self.request).status_code, 200)
+
+    def test_waits_out_leaky_bucket_delay(self):
+        """Test that shaped requests sleep for their delay, at most max_delay."""
+        limited = rate_limit(
+            limit=10, window=10, algorithm="leaky_bucket", scope="decorator-delay"
+        )(view)
+        with mock.patch("django_rate_limiter.decorators.time.sleep") as sleep:
+            statuses = [limited(self.request).status_code for _ in range(4)]
+
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        delays = [call.args[0] for call in sleep.call_args_list]
+        self.assertEqual(len(delays), 2)
+        self.assertAlmostEqual(delays[0], 1.0, places=1)
+        self.assertLessEqual(max(delays), 2.0)
+
+    def test_async_view_waits_without_blocking(self):
+        """Test that async views wait out delays with asyncio.sleep."""
+        limited = rate_limit(
+            limit=10,
+            window=10,
+            algorithm="leaky_bucket",
+            scope="decorator-async-delay",
+        )(async_view)
+
+        async def run():
+            return [(await limited(self.request)).status_code for _ in range(4)]
+
+        with mock.patch(
+            "django_rate_limiter.decorators.asyncio.sleep", new=mock.AsyncMock()
+        ) as sleep, mock.patch("django_rate_limiter.decorators.time.sleep") as block:
+            statuses = asyncio.run(run())
+
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        self.assertEqual(sleep.await_count, 2)
+        self.assertLessEqual(max(call.args[0] for call in sleep.await_args_list), 2.0)
+        block.assert_not_called()
@@ -0,0 +1,275 @@
+"""
+Tests for Django Rate Limiter middleware.
+"""
+
+import asyncio
+from unittest import TestCase, mock
+
+from django.http import JsonResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from django_rate_limiter.backends import MemoryBackend
+from django_rate_limiter.exceptions import BackendError
+from django_rate_limiter.middleware import AdaptiveLimit, RateLimitMiddleware
+from django_rate_limiter.utils import clear_rate_limit, validate_rate_limit_config
+
+
+def view(request):
+    return JsonResponse({"message": "ok"})
+
+
+async def async_view(request):
+    return JsonResponse({"message": "ok"})
+
+
+def middleware_settings(**overrides):
+    """RATE_LIMIT_SETTINGS with one rule for /api/ and no global limit."""
+    rule = {"path_pattern": r"^/api/", "limit": 1, "window": 60, "scope": "api"}
+    rule.update(overrides.pop("rule", {}))
+    return {"BACKEND": "memory", "RULES": [rule], **overrides}
+
+
+class TestRateLimitMiddleware(SimpleTestCase):
+    """Test rule matching and limiting in RateLimitMiddleware."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def request(self, middleware, path="/api/items/", ip="10.0.0.2"):
+        return middleware(self.factory.get(path, REMOTE_ADDR=ip))
+
+    @override_settings(RATE_LIMIT_SETTINGS=middleware_settings(rule={"scope": "mw-1"}))
+    def test_denies_over_limit(self):
+        """Test that a rule limits matching paths and adds headers."""
+        middleware = RateLimitMiddleware(view)
+        response = self.request(middleware)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-RateLimit-Limit"], "1")
+
+        self.assertEqual(self.request(middleware).status_code, 429)
+        self.assertEqual(self.request(middleware, "/other/").status_code, 200)
+
+    @override_settings(RATE_LIMIT_SETTINGS=middleware_settings(rule={"scope": "mw-2"}))
+    def test_deny_cache_is_opt_in(self):
+        """Test that the deny cache is off unless DENY_CACHE_SIZE is set."""
+        self.assertIsNone(RateLimitMiddleware(view).deny_cache)
+
+    @override_settings(
+        RATE_LIMIT_SETTINGS=middleware_settings(
+            rule={"scope": "mw-3"}, DENY_CACHE_SIZE=10
+        )
+    )
+    def test_clear_rate_limit_forgets_cached_denial(self):
+        """Test that clearing a client also drops its cached denial."""
+        middleware = RateLimitMiddleware(view)
+        self.request(middleware)
+        self.assertEqual(self.request(middleware).status_code, 429)
+        self.assertEqual(self.request(middleware).status_code, 429)
+        self.assertEqual(middleware.deny_cache.hits, 1)
+
+        clear_rate_limit("ip:10.0.0.2", "mw-3")
+        self.assertEqual(self.request(middleware).status_code, 200)
+
+    @override_settings(
+        RATE_LIMIT_SETTINGS=middleware_settings(
+            rule={
+                "scope": "mw-delay",
+                "limit": 10,
+                "window": 10,
+                "algorithm": "leaky_bucket",
+            }
+        )
+    )
+    def test_waits_out_leaky_bucket_delay(self):
+        """Test that process_request sleeps for the delay, at most max_delay."""
+        middleware = RateLimitMiddleware(view)
+        with mock.patch("django_rate_limiter.middleware.time.sleep") as sleep:
+            statuses = [self.request(middleware).status_code for _ in range(4)]
+
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        delays = [call.args[0] for call in sleep.call_args_list]
+        self.assertEqual(len(delays), 2)
+        self.assertLessEqual(max(delays), 2.0)
+
+    @override_settings(
+        RATE_LIMIT_SETTINGS=middleware_settings(
+            rule={
+                "scope": "mw-async-delay",
+                "limit": 10,
+                "window": 10,
+                "algorithm": "leaky_bucket",
+            }
+        )
+    )
+    def test_async_waits_without_blocking(self):
+        """Test that __acall__ waits out delays with asyncio.sleep."""
+        middleware = RateLimitMiddleware(async_view)
+
+        async def run():
+            return [(await self.request(middleware)).status_code for _ in range(4)]
+
+        with mock.patch(
+            "django_rate_limiter.middleware.asyncio.sleep", new=mock.AsyncMock()
+        ) as sleep, mock.patch("django_rate_limiter.middleware.time.sleep") as block:
+            statuses = asyncio.run(run())
+
+        self.assertEqual(statuses, [200, 200, 200, 429])
+        self.assertEqual(sleep.await_count, 2)
+        self.assertLessEqual(max(call.args[0] for call in sleep.await_args_list), 2.0)
+        block.assert_not_called()
+
+    @override_settings(
+        RATE_LIMIT_SETTINGS=middleware_settings(
+            rule={
+                "scope": "mw-adaptive",
+                "limit": 5,
+                "adaptive": {"min_limit": 2, "max_limit": 10, "interval": 10},
+            }
+        )
+    )
+    def test_adaptive_rule(self):
+        """Test that adaptive rules enforce and feed the shared limit."""
+        middleware = RateLimitMiddleware(view)
+        adaptive = middleware.rules[0]["adaptive"]
+        adaptive.limit = 2
+
+        statuses = [self.request(middleware).status_code for _ in range(3)]
+        self.assertEqual(statuses, [200, 200, 429])
+        self.assertEqual(adaptive._requests, 2)
+
+    @override_settings(
+        RATE_LIMIT_SETTINGS=middleware_settings(
+            rule={
+                "scope": "mw-adaptive-down",
+                "limit": 5,
+                "adaptive": {"min_limit": 2, "max_limit": 10, "interval": 0},
+            }
+        )
+    )
+    def test_adaptive_sync_failure_keeps_response(self):
+        """Test that a failing backend does not turn a served view into a 500."""
+        middleware = RateLimitMiddleware(view)
+        adaptive = middleware.rules[0]["adaptive"]
+        atomic_update = adaptive.backend.atomic_update
+
+        def fail_adaptive_sync(key, *args):
+            if key == adaptive.key:
+                raise BackendError("down")
+            return atomic_update(key, *args)
+
+        with mock.patch.object(
+            adaptive.backend, "atomic_update", side_effect=fail_adaptive_sync
+        ), self.assertLogs("django_rate_limiter.middleware", "WARNING"):
+            response = self.request(middleware)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(adaptive._requests, 1)
+
+
+class TestValidateConfig(TestCase):
+    """Test validation of RATE_LIMIT_SETTINGS."""
+
+    def test_unknown_adaptive_options(self):
+        """Test that typos in an adaptive block are reported."""
+        config = middleware_settings(
+            rule={"adaptive": {"min_limit": 1, "max_limit": 5, "target_latncy": 1}}
+        )
+        self.assertEqual(
+            validate_rate_limit_config(config),
+            ["Rule 0: unknown adaptive options ['target_latncy']"],
+        )
+        del config["RULES"][0]["adaptive"]["target_latncy"]
+        self.assertEqual(validate_rate_limit_config(config), [])
+
+    def test_backends(self):
+        """Test that every backend get_backend builds is accepted."""
+        for backend in ("memory", "database", "redis", "two_tier"):
+            with self.subTest(backend=backend):
+                config = middleware_settings(BACKEND=backend)
+                self.assertEqual(validate_rate_limit_config(config), [])
+        self.assertEqual(
+            validate_rate_limit_config(middleware_settings(BACKEND="mongo")),
+            ["Invalid backend: mongo"],
+        )
+
+    def test_count_min_needs_a_sketch_backend(self):
+        """Test that count_min rules are rejected on backends without sketches."""
+        config = middleware_settings(
+            BACKEND="database", rule={"algorithm": "count_min"}
+        )
+        self.assertEqual(
+            validate_rate_limit_config(config),
+            ["Rule 0: count_min needs the memory or redis backend"],
+        )
+        config["BACKEND"] = "redis"
+        self.assertEqual(validate_rate_limit_config(config), [])
+
+
+class TestAdaptiveLimit(TestCase):
+    """Test the latency-driven limit controller of middleware rules."""
+
+    def setUp(self):
+        backend = MemoryBackend()
+        self.workers = [
+            AdaptiveLimit(
+                backend,
+                "search",
+                100,
+                min_limit=20,
+                max_limit=110,
+                target_latency=0.5,
+                increase=5,
+                decrease=0.5,
+                interval=10,
+                min_samples=4,
+            )
+            for _ in range(2)
+        ]
+
+    def run_interval(self, start, latency, error=False):
+        """Record four requests on the first worker and sync at the end."""
+        worker = self.workers[0]
+        with mock.patch("time.time", return_value=start):
+            for _ in range(4):
+                worker.record(latency, error)
+        with mock.patch("time.time", return_value=start + 10):
+            return worker.sync()
+
+    def test_aimd_within_bounds(self):
+        """Test decrease on slow views, increase on fast ones, within bounds."""
+        # The first sync creates the shared entry
+        self.assertEqual(self.run_interval(1000, latency=2.0), 100)
+        self.assertEqual(self.run_interval(1010, latency=2.0), 50)
+        self.assertEqual(self.run_interval(1020, latency=2.0), 25)
+        self.assertEqual(self.run_interval(1030, latency=2.0), 20)
+        self.assertEqual(self.run_interval(1040, latency=0.1), 25)
+        self.assertEqual(self.run_interval(1050, latency=0.1, error=True), 20)
+
+    def test_limit_is_shared_by_workers(self):
+        """Test that other workers pick up the adjusted limit when syncing."""
+        self.run_interval(1000, latency=2.0)
+        self.run_interval(1010, latency=2.0)
+        with mock.patch("time.time", return_value=1021):
+            self.assertEqual(self.workers[1].sync(), 50)
+
+    def test_too_few_samples_keep_the_limit(self):
+        """Test that a quiet interval does not move the limit."""
+        with mock.patch("time.time", return_value=1000):
+            self.workers[0].sync()
+            self.workers[0].record(5.0, True)
+        with mock.patch("time.time", return_value=1010):
+            self.assertEqual(self.workers[0].sync(), 100)
+
+    def test_failed_sync_keeps_samples(self):
+        """Test that samples survive a sync the backend fails."""
+        worker = self.workers[0]
+        with mock.patch("time.time", return_value=1000):
+            worker.sync()
+            for _ in range(4):
+                worker.record(2.0, False)
+        with mock.patch("time.time", return_value=1010), mock.patch.object(
+            worker.backend, "atomic_update", side_effect=BackendError("down")
+        ), self.assertLogs("django_rate_limiter.middleware", "WARNING"):
+            self.assertEqual(worker.sync(), 100)
+        with mock.patch("time.time", return_value=1011):
+            self.assertEqual(worker.sync(), 50)